@@ -9,6 +9,7 @@ from api.v1.health import router as health_router
 from api.v1.user import router as user_router
 from api.v1.workout import router as workout_router
 from api.v1.ai_chat import router as ai_chat_router
+from api.v1.admin import router as admin_router
 
 
 router = APIRouter()
@@ -16,3 +17,4 @@ router.include_router(health_router, tags=["health"])
 router.include_router(user_router, tags=["user"])
 router.include_router(workout_router, tags=["workout"])
 router.include_router(ai_chat_router, tags=["ai chat"])
+router.include_router(admin_router, tags=["admin"])
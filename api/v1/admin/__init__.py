@@ -0,0 +1,7 @@
+# v1/admin/__init__.py
+
+from fastapi import APIRouter
+from .admin import router as admin_router
+
+router = APIRouter()
+router.include_router(admin_router, prefix="/admin", tags=["Admin"])
@@ -0,0 +1,82 @@
+"""
+Admin Routes
+
+Operational endpoints, restricted to users with the 'admin' role.
+
+@Date: 2026-10-16
+"""
+from datetime import datetime
+from typing import Literal
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from daos.audit.audit_logs_dao import AUDIT_QUERY_MAX_LIMIT, AsyncAuditLogsDAO
+from daos.command_monitor import SNAPSHOT_SORT_KEYS, command_monitor
+from services.container import get_audit_logs_dao, get_auth_service
+from services.user.auth_service import AuthService, requires_admin
+from utils.decorators import handle_response
+
+router = APIRouter()
+
+
+@router.get('/db/commands')
+@handle_response
+@requires_admin
+async def db_command_stats(request: Request, sort: Literal[SNAPSHOT_SORT_KEYS] = "p99", limit: int = 50):
+    """Mongo command latency per (collection, command, query shape), slowest first"""
+    return {
+        "slow_threshold_ms": command_monitor.slow_ms,
+        "dropped_shapes": command_monitor.dropped_shapes,
+        "shapes": command_monitor.snapshot(sort=sort, limit=limit),
+    }
+
+
+@router.get('/db/slow')
+@handle_response
+@requires_admin
+async def db_slow_commands(request: Request):
+    """Recent Mongo commands slower than the threshold, newest first"""
+    return {"slow_threshold_ms": command_monitor.slow_ms, "commands": command_monitor.slow_commands()}
+
+
+@router.post('/db/commands/reset')
+@handle_response
+@requires_admin
+async def reset_db_command_stats(request: Request):
+    command_monitor.reset()
+    return {"message": "Command statistics reset"}
+
+
+@router.get('/audit')
+@handle_response
+@requires_admin
+async def query_audit_logs(request: Request,
+                           user_id: str = None,
+                           resource: str = None,
+                           action: str = None,
+                           status: str = None,
+                           since: datetime = None,
+                           until: datetime = None,
+                           cursor: str = None,
+                           limit: int = Query(50, ge=1, le=AUDIT_QUERY_MAX_LIMIT),
+                           dao: AsyncAuditLogsDAO = Depends(get_audit_logs_dao)):
+    """
+    Audit records, newest first. Pass next_cursor back as `cursor` for the next page.
+    Records reach the collection in batches, up to AUDIT_FLUSH_SECONDS after the action.
+    """
+    try:
+        records, next_cursor = await dao.find_audits(user_id=user_id, resource=resource, action=action,
+                                                     status=status, since=since, until=until, cursor=cursor,
+                                                     limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"audits": records, "next_cursor": next_cursor,
+            "sink": request.app.state.container.audit_sink.stats()}
+
+
+@router.post('/users/{user_id}/revoke-tokens')
+@handle_response
+@requires_admin
+async def revoke_user_tokens(request: Request, user_id: str,
+                             auth_service: AuthService = Depends(get_auth_service)):
+    """Revoke every token issued to a user so far; the user has to log in again"""
+    await auth_service.revoke_user_tokens(user_id)
+    return {"message": "User tokens revoked", "user_id": user_id}
@@ -3,16 +3,15 @@
 @Auth ： Adam Lyu
 """
 from pydantic import BaseModel, Field
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Request
 from utils.logger import Logger
 from utils.decorators import handle_response
 from services.ai_chat.ai_chat_service import AIChatService
-from services.user.auth_service import AuthService
+from services.container import get_ai_chat_service
+from services.user.auth_service import requires_auth
 
 logger = Logger(__name__)
 router = APIRouter()
-service = AIChatService()
-auth_service = AuthService()
 
 
 # Request body definition
@@ -25,8 +24,9 @@ class ChatQueryRequest(BaseModel):
 
 @router.post("/query")
 @handle_response
-@auth_service.requires_auth
-async def query_ai_chat(request: Request, body: ChatQueryRequest):
+@requires_auth
+async def query_ai_chat(request: Request, body: ChatQueryRequest,
+                        service: AIChatService = Depends(get_ai_chat_service)):
     """
     Generate a personalized response based on the user's input query and user information.
     """
@@ -35,7 +35,7 @@ async def query_ai_chat(request: Request, body: ChatQueryRequest):
 
     try:
         # Call the service to get a response
-        response = service.retrieve_answer(user_id=user_id, query=body.query)
+        response = await service.retrieve_answer(user_id=user_id, query=body.query)
 
         # Return the response
         return {"status": "success", "data": response}
@@ -48,8 +48,8 @@ async def query_ai_chat(request: Request, body: ChatQueryRequest):
 
 
 @router.get("/test")
-@auth_service.requires_auth
-async def test_ai_chat(request: Request):
+@requires_auth
+async def test_ai_chat(request: Request, service: AIChatService = Depends(get_ai_chat_service)):
     """
     Test endpoint to check if the service is working as expected.
     """
@@ -61,7 +61,7 @@ async def test_ai_chat(request: Request):
         test_query = "What is the best exercise for weight loss?"
 
         # Call the service to get a test response
-        response = service.retrieve_answer(user_id=user_id, query=test_query)
+        response = await service.retrieve_answer(user_id=user_id, query=test_query)
         logger.info("AIChatService test completed successfully.")
 
         # Return the test result
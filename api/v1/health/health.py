@@ -2,9 +2,10 @@
 @Time ： 2024-10-05
 @Auth ： Adam Lyu
 """
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
 from fastapi.responses import JSONResponse
 from bson import ObjectId
+from utils.cache import get_cache_stats
 from utils.decorators import handle_response
 
 router = APIRouter()
@@ -15,6 +16,21 @@ async def health_check():
     return JSONResponse(content={"status": "ok"}, status_code=200)
 
 
+@router.get('/db')
+async def db_health_check(request: Request):
+    result = await request.app.state.container.db_client.health_check()
+    status_code = 200 if result["status"] == "ok" else 503
+    return JSONResponse(content=result, status_code=status_code)
+
+
+@router.get('/cache')
+async def cache_stats(request: Request):
+    stats = get_cache_stats()
+    stats["email_filter"] = request.app.state.container.email_filter.stats()
+    stats["token_denylist"] = request.app.state.container.token_denylist.stats()
+    return JSONResponse(content=stats, status_code=200)
+
+
 @router.get('/test_encoder')
 @handle_response
 async def test_encoder():
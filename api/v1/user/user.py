@@ -2,34 +2,41 @@
 @Time ： 2024-11-23
 @Auth ： Adam Lyu
 """
-from fastapi import APIRouter, Body, Request, HTTPException
+from fastapi import APIRouter, Body, Depends, Request, HTTPException
+from marshmallow import ValidationError
+from daos.user.users_dao import AsyncUserDAO
 from services.user.user_service import UserService
 from utils.logger import Logger
-from services.user.auth_service import AuthService
+from services.user.auth_service import AuthService, bearer_token, requires_auth
+from services.container import get_auth_service, get_user_dao, get_user_service
 from utils.decorators import handle_response
 from services.user.validation import RegistrationValidationSchema, LoginValidationSchema, UserProfileUpdateSchema
 
 logger = Logger(__name__)
 router = APIRouter()
-auth_service = AuthService()
-user_service = UserService()
 
 
 # User registration route
 @router.post('/register')
 @handle_response
-async def register(data: dict = Body(...)):
-    schema = RegistrationValidationSchema()
+async def register(data: dict = Body(...),
+                   user_dao: AsyncUserDAO = Depends(get_user_dao),
+                   auth_service: AuthService = Depends(get_auth_service)):
+    schema = RegistrationValidationSchema(user_dao=user_dao)
     # Validate data using marshmallow
     validated_data = schema.load(data)
+    await schema.validate_email(validated_data['email'])
 
     # Extract fields from validated data
     username = validated_data['username']
     email = validated_data['email']
     password = validated_data['password']
 
-    # Register user
-    user_id = auth_service.register_user(username, email, password)
+    # Register user; the unique email index still catches a concurrent registration
+    try:
+        user_id = await auth_service.register_user(username, email, password)
+    except ValueError as e:
+        raise ValidationError(str(e), field_name="email")
     logger.info(f"User registered successfully: {user_id}")
     return {"message": "Registration successful", "user_id": user_id}
 
@@ -37,7 +44,7 @@ async def register(data: dict = Body(...)):
 # User login route
 @router.post('/login')
 @handle_response
-async def login(data: dict = Body(...)):
+async def login(data: dict = Body(...), auth_service: AuthService = Depends(get_auth_service)):
     schema = LoginValidationSchema()
     # Validate data using marshmallow
     validated_data = schema.load(data)
@@ -47,7 +54,7 @@ async def login(data: dict = Body(...)):
     password = validated_data['password']
 
     # User login
-    result = auth_service.login_user(email, password)
+    result = await auth_service.login_user(email, password)
     logger.info(f"User logged in successfully: {result['user_id']}")
     return {
         "message": "Login successful",
@@ -57,14 +64,37 @@ async def login(data: dict = Body(...)):
     }
 
 
+@router.post('/logout')
+@handle_response
+@requires_auth
+async def logout(request: Request, auth_service: AuthService = Depends(get_auth_service)):
+    """
+    Revoke the token of this request
+    """
+    await auth_service.revoke_token(bearer_token(request))
+    return {"message": "Logout successful"}
+
+
+@router.post('/logout/all')
+@handle_response
+@requires_auth
+async def logout_all(request: Request, auth_service: AuthService = Depends(get_auth_service)):
+    """
+    Revoke every token of the user (all devices), including this request's
+    """
+    await auth_service.revoke_user_tokens(request.state.user_id)
+    return {"message": "Logged out of all sessions"}
+
+
 @router.get("/profile")
 @handle_response
-@auth_service.requires_auth
-async def get_user_profile(request: Request, user_id: str):
+@requires_auth
+async def get_user_profile(request: Request, user_id: str,
+                           user_service: UserService = Depends(get_user_service)):
     """
     Retrieve user profile
     """
-    user_info = user_service.get_user_info(user_id)
+    user_info = await user_service.get_user_info(user_id)
     if not user_info:
         raise HTTPException(status_code=404, detail="User not found")
     return {"message": "User profile fetched successfully", "data": user_info}
@@ -72,8 +102,8 @@ async def get_user_profile(request: Request, user_id: str):
 
 @router.put("/profile/update")
 @handle_response
-@auth_service.requires_auth
-async def update_user_profile(request: Request):
+@requires_auth
+async def update_user_profile(request: Request, user_service: UserService = Depends(get_user_service)):
     """
     Update user profile
     """
@@ -87,6 +117,6 @@ async def update_user_profile(request: Request):
     validated_data = UserProfileUpdateSchema(**data).dict(exclude_none=True)
 
     # Update user information
-    user_service.update_user_info(user_id, **validated_data)
+    await user_service.update_user_info(user_id, **validated_data)
 
     return {"message": "User profile updated successfully"}
@@ -2,19 +2,25 @@
 @Time ： 2024-11-23
 @Auth ： Adam Lyu
 """
+import json
+import os
 from pydantic import Field
 from datetime import date
-from fastapi import APIRouter, HTTPException, Request
+from typing import Literal
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from services.workout.daily_workout_logs_service import DailyWorkoutLogsService
+from services.container import get_daily_workout_logs_service
 from utils.logger import Logger
 from utils.decorators import handle_response
-from services.user.auth_service import AuthService
+from services.user.auth_service import requires_auth
 
 logger = Logger(__name__)
 router = APIRouter()
-service = DailyWorkoutLogsService()
-auth_service = AuthService()
+
+# Number of records written per bulk_write by the bulk endpoint
+BULK_BATCH_SIZE = int(os.getenv('WORKOUT_LOG_BULK_BATCH_SIZE', 500))
 
 
 # Request body definitions
@@ -27,6 +33,10 @@ class CreateOrUpdateWorkoutLogRequest(BaseModel):
     avg_workout_duration: int
 
 
+class BulkWorkoutLogRecord(CreateOrUpdateWorkoutLogRequest):
+    log_date: date  # Required: bulk uploads carry history, not today's log
+
+
 class UpdateWorkoutLogFieldsRequest(BaseModel):
     total_weight_lost: float = None
     total_calories_burnt: float = None
@@ -38,14 +48,15 @@ class UpdateWorkoutLogFieldsRequest(BaseModel):
 
 @router.get("/workout_logs")
 @handle_response
-@auth_service.requires_auth
-async def get_workout_log(request: Request, log_date: str):
+@requires_auth
+async def get_workout_log(request: Request, log_date: str,
+                          service: DailyWorkoutLogsService = Depends(get_daily_workout_logs_service)):
     """
     Retrieve a user's workout log for a specific date.
     """
     user_id = request.state.user_id  # Retrieve user_id from request.state
     logger.info(f"API: Fetching workout log for user_id {user_id} on log_date {log_date}")
-    log = service.get_workout_log(user_id, log_date)
+    log = await service.get_workout_log(user_id, log_date)
     if not log:
         raise HTTPException(status_code=404, detail="Workout log not found")
     return {"status": "success", "data": log}
@@ -53,8 +64,9 @@ async def get_workout_log(request: Request, log_date: str):
 
 @router.post("/workout_logs")
 @handle_response
-@auth_service.requires_auth
-async def create_or_update_workout_log(request: Request, body: CreateOrUpdateWorkoutLogRequest):
+@requires_auth
+async def create_or_update_workout_log(request: Request, body: CreateOrUpdateWorkoutLogRequest,
+                                       service: DailyWorkoutLogsService = Depends(get_daily_workout_logs_service)):
     """
     Create or update a workout log for a specific date.
     """
@@ -63,7 +75,7 @@ async def create_or_update_workout_log(request: Request, body: CreateOrUpdateWor
     logger.info(f"API: Creating or updating workout log for user_id {user_id} on log_date {workout_log_date}")
 
     try:
-        result = service.create_or_update_workout_log(
+        result = await service.create_or_update_workout_log(
             user_id=user_id,
             log_date=workout_log_date,
             workout_content=body.workout_content,
@@ -77,10 +89,138 @@ async def create_or_update_workout_log(request: Request, body: CreateOrUpdateWor
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
+async def _iter_bulk_records(request: Request):
+    """
+    Yield raw records from the request body without buffering it when possible.
+
+    application/x-ndjson bodies are split line by line as chunks arrive; any other
+    body is parsed as a single JSON array.
+    """
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        buffer = b""
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield line
+        if buffer.strip():
+            yield buffer
+    else:
+        try:
+            records = json.loads(await request.body())
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Request body must be a JSON array or NDJSON")
+        if not isinstance(records, list):
+            raise HTTPException(status_code=400, detail="Request body must be a JSON array or NDJSON")
+        for record in records:
+            yield record
+
+
+async def _write_bulk_batch(service, user_id, batch, batch_indexes):
+    """Write one batch and re-number its results with the record's position in the upload"""
+    results = await service.bulk_upsert_workout_logs(user_id, batch)
+    for result in results:
+        result["index"] = batch_indexes[result["index"]]
+    return results
+
+
+@router.post("/workout_logs/bulk")
+@handle_response
+@requires_auth
+async def bulk_upsert_workout_logs(request: Request,
+                                   service: DailyWorkoutLogsService = Depends(get_daily_workout_logs_service)):
+    """
+    Create or update many workout logs at once (e.g. a wearable history sync).
+
+    Accepts an NDJSON stream (Content-Type: application/x-ndjson) or a JSON array.
+    Records are validated one by one and written in batches of unordered upserts
+    keyed by log_date. Returns a result for every record.
+    """
+    user_id = request.state.user_id
+    logger.info(f"API: Bulk upserting workout logs for user_id {user_id}")
+
+    results, batch, batch_indexes = [], [], []
+    index = 0
+    async for raw in _iter_bulk_records(request):
+        try:
+            record = json.loads(raw) if isinstance(raw, bytes) else raw
+            batch.append(BulkWorkoutLogRecord(**record).dict())
+            batch_indexes.append(index)
+        except (ValueError, TypeError) as e:
+            results.append({"index": index, "operation": "error", "error": str(e)})
+        index += 1
+
+        if len(batch) >= BULK_BATCH_SIZE:
+            results.extend(await _write_bulk_batch(service, user_id, batch, batch_indexes))
+            batch, batch_indexes = [], []
+
+    if batch:
+        results.extend(await _write_bulk_batch(service, user_id, batch, batch_indexes))
+
+    results.sort(key=lambda item: item["index"])
+    summary = {
+        "received": index,
+        "created": sum(1 for item in results if item["operation"] == "create"),
+        "updated": sum(1 for item in results if item["operation"] == "update"),
+        "failed": sum(1 for item in results if item["operation"] == "error"),
+    }
+    logger.info(f"API: Bulk upsert finished for user_id {user_id}: {summary}")
+    return {"status": "success", "data": {**summary, "results": results}}
+
+
+@router.get("/workout_logs/range")
+@handle_response
+@requires_auth
+async def list_workout_logs(request: Request,
+                            from_date: date = Query(None, alias="from"),
+                            to_date: date = Query(None, alias="to"),
+                            cursor: str = None,
+                            limit: int = Query(50, ge=1, le=200),
+                            fields: str = None,
+                            service: DailyWorkoutLogsService = Depends(get_daily_workout_logs_service)):
+    """
+    List a user's workout logs between two dates, one page at a time.
+
+    Pass the returned next_cursor back as `cursor` to get the following page, and
+    `fields` (comma-separated, e.g. log_date,total_calories_burnt) to skip large fields.
+    """
+    user_id = request.state.user_id
+    logger.info(f"API: Listing workout logs for user_id {user_id} from {from_date} to {to_date}")
+    field_list = [field.strip() for field in fields.split(",") if field.strip()] if fields else None
+    try:
+        page = await service.list_workout_logs(user_id, from_date, to_date, cursor=cursor, limit=limit,
+                                               fields=field_list)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"status": "success", "data": page}
+
+
+@router.get("/workout_logs/export")
+@handle_response
+@requires_auth
+async def export_workout_logs(request: Request, format: Literal["ndjson", "csv"] = "ndjson",
+                              start_date: date = None, end_date: date = None,
+                              service: DailyWorkoutLogsService = Depends(get_daily_workout_logs_service)):
+    """
+    Download a user's workout history as NDJSON or CSV, streamed straight from the database cursor.
+    """
+    user_id = request.state.user_id
+    logger.info(f"API: Exporting workout logs for user_id {user_id} as {format}")
+    media_type = "application/x-ndjson" if format == "ndjson" else "text/csv"
+    return StreamingResponse(
+        service.export_workout_logs(user_id, format, start_date, end_date),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="workout_logs.{format}"'}
+    )
+
+
 @router.patch("/workout_logs")
 @handle_response
-@auth_service.requires_auth
-async def update_workout_log_fields(request: Request, body: UpdateWorkoutLogFieldsRequest, log_date: str):
+@requires_auth
+async def update_workout_log_fields(request: Request, body: UpdateWorkoutLogFieldsRequest, log_date: str,
+                                    service: DailyWorkoutLogsService = Depends(get_daily_workout_logs_service)):
     """
     Update specific fields in a user's workout log for a given date.
     """
@@ -90,7 +230,7 @@ async def update_workout_log_fields(request: Request, body: UpdateWorkoutLogFiel
         update_data = body.dict(exclude_unset=True)
         if not update_data:
             raise HTTPException(status_code=400, detail="No fields to update provided")
-        result = service.update_workout_log_fields(user_id, log_date, update_data)
+        result = await service.update_workout_log_fields(user_id, log_date, update_data)
         if result["matched_count"] == 0:
             raise HTTPException(status_code=404, detail="Workout log not found for update")
         return {"status": "success", "message": "Workout log successfully updated", "data": result}
@@ -104,15 +244,17 @@ async def update_workout_log_fields(request: Request, body: UpdateWorkoutLogFiel
 
 @router.get("/workout_logs/progress")
 @handle_response
-@auth_service.requires_auth
-async def calculate_total_progress(request: Request):
+@requires_auth
+async def calculate_total_progress(request: Request, start_date: date = None, end_date: date = None,
+                                   granularity: Literal["day", "week", "month"] = "day",
+                                   service: DailyWorkoutLogsService = Depends(get_daily_workout_logs_service)):
     """
-    Calculate the total progress across all workout logs for a user.
+    Calculate a user's progress (totals plus per day/week/month buckets), optionally within a date range.
     """
     user_id = request.state.user_id  # Retrieve user_id from request.state
     logger.info(f"API: Calculating total progress for user_id {user_id}")
     try:
-        progress = service.calculate_total_progress(user_id)
+        progress = await service.calculate_total_progress(user_id, start_date, end_date, granularity)
         return {"status": "success", "data": progress}
     except Exception as e:
         logger.error(f"Error calculating total progress for user_id {user_id}: {e}")
@@ -2,30 +2,29 @@
 @Time ： 2024-11-23
 @Auth ： Adam Lyu
 """
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Request
 from services.workout.fitness_goal_service import FitnessGoalService
 from services.workout.validation import CreateOrUpdateGoalRequest
+from services.container import get_fitness_goal_service
 from utils.logger import Logger
-from services.user.auth_service import AuthService
+from services.user.auth_service import requires_auth
 from utils.decorators import handle_response
 
 logger = Logger(__name__)
 router = APIRouter()
-service = FitnessGoalService()
-auth_service = AuthService()
 
 
 # Route implementations
 
 @router.get("/fitness_goal")
 @handle_response
-@auth_service.requires_auth
-async def get_fitness_goal(request: Request):
+@requires_auth
+async def get_fitness_goal(request: Request, service: FitnessGoalService = Depends(get_fitness_goal_service)):
     """
     Retrieve the user's fitness goal.
     """
     user_id = request.state.user_id  # Retrieve user_id from request.state
-    result = service.get_fitness_goal(user_id)
+    result = await service.get_fitness_goal(user_id)
     if not result["data"]:
         raise HTTPException(status_code=404, detail=result["message"])
     return {"status": "success", "data": result["data"]}
@@ -33,20 +32,22 @@ async def get_fitness_goal(request: Request):
 
 @router.post("/fitness_goal")
 @handle_response
-@auth_service.requires_auth
-async def create_or_update_fitness_goal(request: Request, body: CreateOrUpdateGoalRequest):
+@requires_auth
+async def create_or_update_fitness_goal(request: Request, body: CreateOrUpdateGoalRequest,
+                                        service: FitnessGoalService = Depends(get_fitness_goal_service)):
     """
     Create or update the user's fitness goal.
     """
     user_id = request.state.user_id  # Retrieve user_id from request.state
-    result = service.create_or_update_fitness_goal(user_id=user_id, data=body.dict(exclude_unset=True))
+    result = await service.create_or_update_fitness_goal(user_id=user_id, data=body.dict(exclude_unset=True))
     return {"status": "success", "message": result["message"], "data": result["data"]}
 
 
 @router.patch("/fitness_goal")
 @handle_response
-@auth_service.requires_auth
-async def update_fitness_goal_fields(request: Request, body: CreateOrUpdateGoalRequest):
+@requires_auth
+async def update_fitness_goal_fields(request: Request, body: CreateOrUpdateGoalRequest,
+                                     service: FitnessGoalService = Depends(get_fitness_goal_service)):
     """
     Dynamically update specific fields of the user's fitness goal.
     """
@@ -58,7 +59,7 @@ async def update_fitness_goal_fields(request: Request, body: CreateOrUpdateGoalR
             raise HTTPException(status_code=400, detail="No fields to update provided")
 
         # Call the service layer to perform the update
-        result = service.update_fitness_goal_fields(user_id, update_data)
+        result = await service.update_fitness_goal_fields(user_id, update_data)
 
         # Serialize the `UpdateResult` fields
         serialized_result = {
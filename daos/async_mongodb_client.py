@@ -0,0 +1,405 @@
+"""
+Asyncio MongoDB client (Motor) with the same API as MongoDBClient
+
+@Date: 2026-10-16
+"""
+import asyncio
+import os
+import time
+from functools import wraps
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import BulkWriteError, DuplicateKeyError, PyMongoError
+from jsonschema import ValidationError
+from daos.mongodb_client import (
+    DEFAULT_ITER_BATCH_SIZE, MONGO_LOG_PER_SECOND, get_pool_options, build_upsert_update, to_return_document,
+    prepare_bulk_upsert, apply_bulk_write_details
+)
+from daos.command_monitor import async_pool_monitor, command_monitor
+from daos.schema_registry import schema_registry
+from utils.logger import Logger
+from utils.env_loader import load_platform_specific_env
+from utils.tracing import span
+
+logger = Logger(__name__)
+# Dynamically load environment variables based on OS and hostname
+load_platform_specific_env()
+
+# Process-wide Motor client; Motor binds to the event loop it is first used on
+_shared_async_client = None
+_shared_async_client_loop = None
+
+
+def traced_command(f):
+    """Time a client method as a `mongo.<method>` span of the current request's trace"""
+    name = f"mongo.{f.__name__}"
+
+    @wraps(f)
+    async def wrapper(self, collection_name, *args, **kwargs):
+        with span(name, **{"db.collection.name": collection_name}):
+            return await f(self, collection_name, *args, **kwargs)
+    return wrapper
+
+
+def get_shared_async_client(uri):
+    """
+    Return the process-wide AsyncIOMotorClient, creating it on first use.
+
+    A new client is created if the running event loop changed (e.g. between test runs),
+    because a Motor client cannot be shared across event loops.
+    """
+    global _shared_async_client, _shared_async_client_loop
+    loop = asyncio.get_running_loop()
+    if _shared_async_client is None or _shared_async_client_loop is not loop:
+        pool_options = get_pool_options()
+        logger.info(f"Creating shared async MongoDB client with pool options: {pool_options}")
+        _shared_async_client = AsyncIOMotorClient(uri, tlsAllowInvalidCertificates=True,
+                                                  event_listeners=[command_monitor, async_pool_monitor],
+                                                  **pool_options)
+        _shared_async_client_loop = loop
+    return _shared_async_client
+
+
+def close_shared_async_client():
+    """Close the process-wide Motor client and its connection pool (call on shutdown)."""
+    global _shared_async_client, _shared_async_client_loop
+    if _shared_async_client is not None:
+        _shared_async_client.close()
+        logger.info("Shared async MongoDB client closed.")
+    _shared_async_client = None
+    _shared_async_client_loop = None
+
+
+class AsyncMongoDBClient:
+    def __init__(self, db_name=None):
+        self.db_name = db_name if db_name else os.getenv('MONGO_DATABASE', 'fitness_db')
+        self.uri = os.getenv('MONGO_URI')
+
+        if not self.uri:
+            raise ValueError("MONGO_URI environment variable is not set!")
+
+    @property
+    def client(self):
+        """The shared Motor client for the running event loop"""
+        return get_shared_async_client(self.uri)
+
+    @property
+    def db(self):
+        return self.client[self.db_name]
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        # Connections are returned to the shared pool after each operation
+        pass
+
+    async def health_check(self):
+        """
+        Ping the server through the shared pool.
+        :return: Dict with status, round-trip latency and the pool configuration
+        """
+        start = time.perf_counter()
+        try:
+            await self.client.admin.command('ping')
+            status = "ok"
+        except PyMongoError as e:
+            logger.error(f"MongoDB health check failed: {str(e)}")
+            status = "unavailable"
+        return {
+            "status": status,
+            "database": self.db_name,
+            "latency_ms": round((time.perf_counter() - start) * 1000, 2),
+            "pool": get_pool_options(),
+        }
+
+    def validate_data(self, data, schema):
+        """
+        Validate data against JSON Schema.
+        :param data: Data to be validated
+        :param schema: Schema file name (precompiled validator from the registry) or a raw JSON Schema
+        """
+        try:
+            schema_registry.get_validator(schema).validate(data)
+        except ValidationError as e:
+            logger.error(f"Data validation failed: {e.message}")
+            raise ValueError(f"Data validation error: {e.message}")
+
+    @traced_command
+    async def insert_one(self, collection_name, data, schema=None):
+        """
+        Insert a single document into a collection with optional schema validation.
+        """
+        if schema:
+            self.validate_data(data, schema)
+
+        logger.info(f"Inserting one document into collection: {collection_name}")
+        data["is_deleted"] = False
+        result = await self.db[collection_name].insert_one(data)
+        logger.info(f"Document inserted with ID: {result.inserted_id}")
+        return result.inserted_id
+
+    @traced_command
+    async def insert_many(self, collection_name, data_list, schema=None):
+        """
+        Insert multiple documents into the specified collection, optionally validating against a JSON Schema.
+        :param collection_name: Target collection name
+        :param data_list: List of documents to insert
+        :param schema: JSON Schema for validation
+        """
+        logger.info(f"Inserting many documents into collection: {collection_name}")
+        if schema:
+            for data in data_list:
+                self.validate_data(data, schema)
+
+        for data in data_list:
+            data["is_deleted"] = False
+        result = await self.db[collection_name].insert_many(data_list)
+        logger.info("Documents inserted", ids=result.inserted_ids)
+        return result.inserted_ids
+
+    @traced_command
+    async def bulk_upsert(self, collection_name, records, schema=None, ordered=False):
+        """
+        Upsert many documents with a single (by default unordered) bulk_write.
+
+        Records that fail validation are reported and skipped; the rest are written in
+        one round trip. Upserts that lose a duplicate key race are retried once.
+        :param collection_name: Target collection name
+        :param records: List of (query, update_fields) tuples, query being the unique key
+        :param schema: Schema file name or JSON Schema to validate each record against
+        :param ordered: Stop at the first write error if True
+        :return: One result per record: {"index", "operation": "create"|"update"|"error", ...}
+        """
+        logger.info(f"Bulk upserting {len(records)} document(s) into collection: {collection_name}")
+        results, operations, positions = prepare_bulk_upsert(records, schema, self.validate_data)
+        if operations:
+            details = await self._bulk_write(collection_name, operations, ordered)
+            retry = apply_bulk_write_details(details, positions, results)
+            if retry:
+                details = await self._bulk_write(collection_name, [operations[i] for i in retry], ordered)
+                apply_bulk_write_details(details, [positions[i] for i in retry], results, retry_duplicates=False)
+        return results
+
+    async def _bulk_write(self, collection_name, operations, ordered):
+        """Run bulk_write and return its raw result, including partial failures"""
+        try:
+            result = await self.db[collection_name].bulk_write(operations, ordered=ordered)
+            return result.bulk_api_result
+        except BulkWriteError as e:
+            logger.warning(f"Bulk write to {collection_name} had {len(e.details.get('writeErrors', []))} error(s)")
+            return e.details
+
+    @traced_command
+    async def update_one(self, collection_name, query, update, upsert=False):
+        """
+        Update a single document in a collection (inserting it if upsert is True).
+        """
+        if not isinstance(update, dict):
+            raise ValueError("Update data must be a dictionary.")
+
+        if "$set" in update and isinstance(update["$set"], dict):
+            for key in update["$set"]:
+                if key.startswith("$"):
+                    raise ValueError(f"Illegal field name in update_data: {key}")
+
+        logger.debug("Updating %s", collection_name, query=query, update=update)
+        return await self.db[collection_name].update_one(query, update, upsert=upsert)
+
+    @traced_command
+    async def upsert_one(self, collection_name, query, update_fields, set_on_insert=None):
+        """
+        Insert or update a single document in one server round trip.
+
+        created_at is only set when a new document is inserted. If two writers race to
+        insert the same unique key, the loser retries once and lands as an update.
+        :return: {"operation": "create", "inserted_id": ...} or
+                 {"operation": "update", "matched_count": ..., "modified_count": ..., "upserted_id": None}
+        """
+        logger.info("Upserting one document in collection: %s", collection_name, query=query)
+        update = build_upsert_update(update_fields, set_on_insert)
+        collection = self.db[collection_name]
+        try:
+            result = await collection.update_one(query, update, upsert=True)
+        except DuplicateKeyError:
+            result = await collection.update_one(query, update, upsert=True)
+
+        if result.upserted_id is not None:
+            return {"operation": "create", "inserted_id": result.upserted_id}
+        return {
+            "operation": "update",
+            "matched_count": result.matched_count,
+            "modified_count": result.modified_count,
+            "upserted_id": None,
+        }
+
+    @traced_command
+    async def find_one_and_update(self, collection_name, query, update, projection=None, return_document="after",
+                                  upsert=False):
+        """
+        Atomically update a single document and return it ('before' or 'after' the update).
+        """
+        logger.debug("Find one and update %s", collection_name, query=query, update=update)
+        return await self.db[collection_name].find_one_and_update(
+            query, update, projection=projection, upsert=upsert,
+            return_document=to_return_document(return_document)
+        )
+
+    @traced_command
+    async def find_one_and_upsert(self, collection_name, query, update_fields, set_on_insert=None,
+                                  projection=None, return_document="after"):
+        """
+        Upsert a single document in one server round trip and return it.
+
+        With return_document='before' a None result means the document was created.
+        """
+        logger.info("Find one and upsert in collection: %s", collection_name, query=query)
+        update = build_upsert_update(update_fields, set_on_insert)
+        try:
+            return await self.find_one_and_update(collection_name, query, update, projection=projection,
+                                                  return_document=return_document, upsert=True)
+        except DuplicateKeyError:
+            return await self.find_one_and_update(collection_name, query, update, projection=projection,
+                                                  return_document=return_document, upsert=True)
+
+    @traced_command
+    async def find_one(self, collection_name, query, include_deleted=False, projection=None):
+        """
+        Find a single document, ignoring soft-deleted documents by default.
+
+        Args:
+            collection_name (str): The name of the collection to query.
+            query (dict): The query to filter documents.
+            include_deleted (bool): Whether to include soft-deleted documents.
+            projection (dict): A projection dict to include or exclude specific fields.
+
+        Returns:
+            dict: The found document, or None if no document matches the query.
+        """
+        logger.info("Finding one document in collection: %s", collection_name, query=query, max_per_second=MONGO_LOG_PER_SECOND)
+
+        # Exclude soft-deleted documents unless explicitly allowed
+        if not include_deleted:
+            query["is_deleted"] = False
+
+        result = await self.db[collection_name].find_one(query, projection=projection)
+        logger.debug("Find one result: %s", "found" if result else "not found", max_per_second=MONGO_LOG_PER_SECOND)
+        return result
+
+    @traced_command
+    async def find_many(self, collection_name, query, include_deleted=False, sort=None, limit=0, skip=0,
+                        projection=None):
+        """
+        Find multiple documents, supporting sorting, limit, and skip options.
+        :param collection_name: Target collection name
+        :param query: Query to filter documents
+        :param include_deleted: If False, exclude soft-deleted documents
+        :param sort: Sorting criteria (e.g., [("field", pymongo.ASCENDING)])
+        :param limit: Number of documents to return
+        :param skip: Number of documents to skip
+        :param projection: Fields to include/exclude
+        """
+        logger.info("Finding many documents in collection: %s", collection_name, query=query, max_per_second=MONGO_LOG_PER_SECOND)
+        if not include_deleted:
+            query["is_deleted"] = False
+
+        cursor = self.db[collection_name].find(query, projection)
+        if sort:
+            cursor = cursor.sort(sort)
+        if skip > 0:
+            cursor = cursor.skip(skip)
+        if limit > 0:
+            cursor = cursor.limit(limit)
+
+        result_list = await cursor.to_list(length=None)
+        logger.info("Find many result: %d document(s) found", len(result_list), max_per_second=MONGO_LOG_PER_SECOND)
+        return result_list
+
+    async def iter_many(self, collection_name, query, include_deleted=False, sort=None, projection=None,
+                        batch_size=DEFAULT_ITER_BATCH_SIZE):
+        """
+        Async generator yielding matching documents one at a time, fetched in batches,
+        so memory stays flat regardless of the result size.
+        :param collection_name: Target collection name
+        :param query: Query to filter documents
+        :param include_deleted: If False, exclude soft-deleted documents
+        :param sort: Sorting criteria (e.g., [("field", pymongo.ASCENDING)])
+        :param projection: Fields to include/exclude
+        :param batch_size: Number of documents per getMore round trip
+        """
+        logger.info("Iterating documents in collection: %s", collection_name, query=query, max_per_second=MONGO_LOG_PER_SECOND)
+        if not include_deleted:
+            query["is_deleted"] = False
+
+        cursor = self.db[collection_name].find(query, projection).batch_size(batch_size)
+        if sort:
+            cursor = cursor.sort(sort)
+        try:
+            async for document in cursor:
+                yield document
+        finally:
+            # Release the server-side cursor if the consumer stops early (e.g. client disconnect)
+            await cursor.close()
+
+    @traced_command
+    async def count_documents(self, collection_name, query):
+        """
+        Count the number of documents that match the query.
+        :param collection_name: Target collection name
+        :param query: Query to filter documents
+        :return: Count of matching documents
+        """
+        logger.info("Counting documents in collection: %s", collection_name, query=query, max_per_second=MONGO_LOG_PER_SECOND)
+        count = await self.db[collection_name].count_documents(query)
+        logger.info("Count result: %d document(s) found", count, max_per_second=MONGO_LOG_PER_SECOND)
+        return count
+
+    @traced_command
+    async def aggregate(self, collection_name, pipeline):
+        """
+        Run an aggregation pipeline and return the resulting documents.
+        :param collection_name: Target collection name
+        :param pipeline: List of aggregation stages
+        :return: List of result documents
+        """
+        logger.info("Aggregating documents in collection: %s", collection_name, max_per_second=MONGO_LOG_PER_SECOND)
+        result_list = await self.db[collection_name].aggregate(pipeline).to_list(length=None)
+        logger.info("Aggregate result: %d document(s) returned", len(result_list), max_per_second=MONGO_LOG_PER_SECOND)
+        return result_list
+
+    @traced_command
+    async def delete_one(self, collection_name, query, soft_delete=True):
+        """
+        Delete a single document, performing a soft delete by default.
+        :param collection_name: Target collection name
+        :param query: Query to identify the document
+        :param soft_delete: If True, perform a soft delete by setting is_deleted to True
+        """
+        logger.info("Deleting one document in collection: %s", collection_name, query=query)
+        collection = self.db[collection_name]
+
+        if soft_delete:
+            result = await collection.update_one(query, {"$set": {"is_deleted": True}})
+            logger.info(f"Soft delete result: {result.modified_count} document(s) modified")
+        else:
+            result = await collection.delete_one(query)
+            logger.info(f"Physical delete result: {result.deleted_count} document(s) deleted")
+        return result
+
+    @traced_command
+    async def delete_many(self, collection_name, query, soft_delete=True):
+        """
+        Delete multiple documents, performing a soft delete by default.
+        :param collection_name: Target collection name
+        :param query: Query to identify the documents
+        :param soft_delete: If True, perform a soft delete by setting is_deleted to True
+        """
+        logger.info("Deleting many documents in collection: %s", collection_name, query=query)
+        collection = self.db[collection_name]
+
+        if soft_delete:
+            result = await collection.update_many(query, {"$set": {"is_deleted": True}})
+            logger.info(f"Soft delete result: {result.modified_count} document(s) modified")
+        else:
+            result = await collection.delete_many(query)
+            logger.info(f"Physical delete result: {result.deleted_count} document(s) deleted")
+        return result
@@ -0,0 +1,220 @@
+"""
+Audit Logs DAO
+
+AsyncAuditSink takes the records of Logger.audit_log() off the request path: they are
+buffered in memory and written to the `audit_logs` collection with one insert_many
+per AUDIT_FLUSH_SIZE records, or every AUDIT_FLUSH_SECONDS, whichever comes first.
+A TTL index drops audits after AUDIT_LOG_TTL_DAYS.
+
+The audit file stays the fallback: records are written there when the sink is not
+running, when its buffer is full, and when a flush to Mongo fails.
+
+AsyncAuditLogsDAO queries the collection for the admin endpoint.
+
+@Date: 2026-10-16
+"""
+import asyncio
+import os
+from collections import deque
+from datetime import datetime
+import pymongo
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import IndexModel
+from daos.async_mongodb_client import AsyncMongoDBClient
+from utils.logger import Logger
+
+logger = Logger(__name__)
+
+# Collection definition, applied once at deploy time by scripts/bootstrap.py
+COLLECTION_NAME = 'audit_logs'
+SCHEMA_FILENAME = 'audit_logs_schema.json'
+AUDIT_LOG_TTL_DAYS = int(os.getenv('AUDIT_LOG_TTL_DAYS', 90))
+INDEXES = [
+    # Retention: Mongo deletes audits older than the TTL
+    IndexModel([("created_at", pymongo.ASCENDING)], expireAfterSeconds=AUDIT_LOG_TTL_DAYS * 24 * 3600,
+               name="created_at_ttl"),
+    # Admin queries by user / by resource, newest first
+    IndexModel([("user_id", pymongo.ASCENDING), ("created_at", pymongo.DESCENDING), ("_id", pymongo.DESCENDING)],
+               name="user_id_1_created_at_-1__id_-1"),
+    IndexModel([("resource", pymongo.ASCENDING), ("created_at", pymongo.DESCENDING), ("_id", pymongo.DESCENDING)],
+               name="resource_1_created_at_-1__id_-1"),
+]
+
+# Records per insert_many; reaching it triggers a flush
+AUDIT_FLUSH_SIZE = int(os.getenv('AUDIT_FLUSH_SIZE', 200))
+# Longest time a record waits in the buffer
+AUDIT_FLUSH_SECONDS = float(os.getenv('AUDIT_FLUSH_SECONDS', 1))
+# Records buffered while Mongo is slow; beyond this they go to the audit file
+AUDIT_BUFFER_MAX = int(os.getenv('AUDIT_BUFFER_MAX', 10000))
+AUDIT_QUERY_MAX_LIMIT = 500
+
+
+def encode_cursor(document):
+    """Page cursor pointing after an audit document"""
+    return f"{document['created_at'].isoformat()}_{document['_id']}"
+
+
+def decode_cursor(cursor):
+    """
+    :return: (created_at, _id) of the last audit of the previous page
+    :raises ValueError: If the cursor is malformed
+    """
+    created_at, _, audit_id = cursor.rpartition("_")
+    try:
+        return datetime.fromisoformat(created_at), ObjectId(audit_id)
+    except (ValueError, InvalidId):
+        raise ValueError("Invalid cursor")
+
+
+def to_audit_document(record):
+    """Audit record (see Logger.audit_log) -> audit_logs document"""
+    document = {key: value for key, value in record.items() if key != "timestamp"}
+    document["created_at"] = datetime.utcnow()
+    return document
+
+
+class AsyncAuditSink:
+    def __init__(self, db_client=None, flush_size=AUDIT_FLUSH_SIZE, flush_seconds=AUDIT_FLUSH_SECONDS,
+                 buffer_max=AUDIT_BUFFER_MAX):
+        self.db_client = db_client or AsyncMongoDBClient()
+        self.flush_size = flush_size
+        self.flush_seconds = flush_seconds
+        self.buffer_max = buffer_max
+        self._buffer = deque()  # Documents waiting for the next flush (appended from any thread)
+        self._wake = None
+        self._loop = None
+        self._task = None
+        self._running = False  # Accepting records
+        self._flush_lock = None
+        self.written = 0
+        self.fallbacks = 0  # Records written to the audit file instead
+        self.failed_flushes = 0
+
+    def write(self, record):
+        """
+        Buffer an audit record.
+        :return: False if the sink cannot take it (not running, or buffer full); the caller writes it to the file
+        """
+        if not self._running or len(self._buffer) >= self.buffer_max:
+            return False
+        self._buffer.append(to_audit_document(record))
+        if len(self._buffer) >= self.flush_size:
+            self._notify()
+        return True
+
+    def _notify(self):
+        """Wake the flush task now (write() may be called from another thread)"""
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is self._loop:
+            self._wake.set()
+        else:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def flush(self):
+        """Write everything buffered so far, in batches of flush_size"""
+        async with self._flush_lock:
+            while self._buffer:
+                batch = []
+                while self._buffer and len(batch) < self.flush_size:
+                    batch.append(self._buffer.popleft())
+                try:
+                    await self.db_client.db[COLLECTION_NAME].insert_many(batch, ordered=False)
+                    self.written += len(batch)
+                except Exception as e:
+                    self.failed_flushes += 1
+                    logger.error(f"Audit flush failed, writing {len(batch)} record(s) to the audit file: {e}")
+                    self._write_to_file(batch)
+
+    def _write_to_file(self, documents):
+        for document in documents:
+            logger.write_audit_file({"timestamp": document["created_at"].isoformat(),
+                                     **{key: value for key, value in document.items()
+                                        if key not in ("_id", "created_at")}})
+        self.fallbacks += len(documents)
+
+    async def _run(self):
+        while self._running:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Audit sink flush loop failed: {e}")
+
+    def start(self):
+        if self._task is None:
+            self._loop = asyncio.get_running_loop()
+            self._wake = asyncio.Event()
+            self._flush_lock = asyncio.Lock()
+            self._running = True
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Audit sink started (flush every {self.flush_size} records or {self.flush_seconds} s).")
+
+    async def stop(self):
+        """Stop the flush task once it has written out the remaining records"""
+        if self._task is not None:
+            self._running = False  # New records go to the file from here on
+            self._wake.set()
+            # Not cancelled: a batch being inserted would be lost
+            await self._task
+            self._task = None
+            await self.flush()
+
+    def stats(self):
+        return {
+            "running": self._running,
+            "buffered": len(self._buffer),
+            "written": self.written,
+            "file_fallbacks": self.fallbacks,
+            "failed_flushes": self.failed_flushes,
+        }
+
+
+class AsyncAuditLogsDAO:
+    def __init__(self, db_client=None):
+        self.db_client = db_client or AsyncMongoDBClient()
+        self.collection_name = COLLECTION_NAME
+
+    async def find_audits(self, user_id=None, resource=None, action=None, status=None, since=None, until=None,
+                          cursor=None, limit=50):
+        """
+        Audit records, newest first, one page at a time.
+        :param user_id: Only records of this user
+        :param resource: Only records of this resource (e.g. 'daily_workout_logs')
+        :param action: Only records of this action
+        :param status: Only records with this status
+        :param since: Only records created at or after this datetime
+        :param until: Only records created before this datetime
+        :param cursor: next_cursor of the previous page
+        :param limit: Maximum number of records (capped at AUDIT_QUERY_MAX_LIMIT)
+        :return: (records, next_cursor or None on the last page)
+        """
+        query = {key: value for key, value in
+                 (("user_id", user_id), ("resource", resource), ("action", action), ("status", status))
+                 if value is not None}
+        created_at = {}
+        if since is not None:
+            created_at["$gte"] = since
+        if until is not None:
+            created_at["$lt"] = until
+        if created_at:
+            query["created_at"] = created_at
+        if cursor:
+            # Several audits can share a timestamp (one insert_many); _id breaks the tie
+            last_created_at, last_id = decode_cursor(cursor)
+            query["$or"] = [{"created_at": {"$lt": last_created_at}},
+                            {"created_at": last_created_at, "_id": {"$lt": last_id}}]
+
+        limit = min(limit, AUDIT_QUERY_MAX_LIMIT)
+        records = await self.db_client.find_many(self.collection_name, query, include_deleted=True,
+                                                 sort=[("created_at", pymongo.DESCENDING), ("_id", pymongo.DESCENDING)],
+                                                 limit=limit)
+        next_cursor = encode_cursor(records[-1]) if len(records) == limit else None
+        return records, next_cursor
@@ -0,0 +1,305 @@
+"""
+Mongo Command Monitor
+
+A pymongo CommandListener installed on the shared sync and async clients. It times
+every data command and aggregates the latencies into one histogram per
+(collection, command, query shape). A query shape is the command's filter, sort or
+pipeline with every value replaced by its type name, so the same DAO query for
+different users lands in the same histogram.
+
+Commands slower than MONGO_SLOW_COMMAND_MS are logged with their shape (never with
+their values) and kept in a short list of recent slow commands.
+
+PoolMonitor, a ConnectionPoolListener, counts open and checked-out connections of each
+client's pool; both monitors are exported on /metrics.
+
+@Date: 2026-10-16
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from pymongo import monitoring
+from utils.env_loader import load_platform_specific_env
+from utils.logger import Logger
+from utils.metrics import Histogram, metrics_registry
+
+load_platform_specific_env()
+logger = Logger(__name__)
+
+# Commands slower than this (milliseconds) are logged
+MONGO_SLOW_COMMAND_MS = float(os.getenv('MONGO_SLOW_COMMAND_MS', 100))
+# Recent slow commands kept for the admin endpoint
+MONGO_SLOW_COMMAND_LOG_SIZE = int(os.getenv('MONGO_SLOW_COMMAND_LOG_SIZE', 100))
+# Upper bound on distinct shapes tracked, in case a caller builds filters with dynamic keys
+MONGO_MAX_COMMAND_SHAPES = int(os.getenv('MONGO_MAX_COMMAND_SHAPES', 1000))
+# Statistics the per-shape snapshot can be ordered by
+SNAPSHOT_SORT_KEYS = ("p99", "p95", "p50", "mean", "max", "count", "failures")
+# Open cursors remembered to attribute getMore commands to their query
+MAX_OPEN_CURSORS = 10000
+
+# Command name -> fields describing the query shape
+SHAPE_FIELDS = {
+    "find": ("filter", "sort", "projection"),
+    "aggregate": ("pipeline",),
+    "count": ("query",),
+    "distinct": ("key", "query"),
+    "findAndModify": ("query", "sort"),
+    "update": ("updates",),
+    "delete": ("deletes",),
+    "insert": (),
+    "getMore": (),
+}
+# Fields of the statements inside update / delete commands that describe their shape
+STATEMENT_FIELDS = ("q", "upsert", "multi", "limit")
+# Keys whose values are structure (field names), not data
+STRUCTURAL_KEYS = {"key", "sort", "projection", "$project", "$sort", "$group", "$facet", "$unwind",
+                   "$replaceRoot", "upsert", "multi", "limit"}
+
+
+def normalize_shape(value, structural=False):
+    """
+    Replace the values in a filter / pipeline by their type names, keeping field names
+    and operators. Lists collapse to the shapes of their distinct elements.
+    """
+    if isinstance(value, dict):
+        return {key: normalize_shape(item, structural or key in STRUCTURAL_KEYS) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        shapes = []
+        for item in value:
+            shape = normalize_shape(item, structural)
+            if shape not in shapes:
+                shapes.append(shape)
+        return shapes
+    if structural and isinstance(value, (str, int, float, bool)):
+        return value
+    return type(value).__name__
+
+
+def command_shape(command_name, command):
+    """Normalized, JSON-encoded shape of a command"""
+    shape = {}
+    for field in SHAPE_FIELDS.get(command_name, ()):
+        if field not in command:
+            continue
+        value = command[field]
+        if field in ("updates", "deletes"):
+            value = [{key: statement[key] for key in STATEMENT_FIELDS if key in statement} for statement in value]
+        shape[field] = normalize_shape(value, structural=field in STRUCTURAL_KEYS)
+    return json.dumps(shape, separators=(",", ":"))
+
+
+def command_collection(command_name, command):
+    """Collection a command targets"""
+    if command_name == "getMore":
+        return command.get("collection")
+    target = command.get(command_name)
+    return target if isinstance(target, str) else None
+
+
+class CommandMonitor(monitoring.CommandListener):
+    def __init__(self, slow_ms=MONGO_SLOW_COMMAND_MS, slow_log_size=MONGO_SLOW_COMMAND_LOG_SIZE,
+                 max_shapes=MONGO_MAX_COMMAND_SHAPES):
+        self.slow_ms = slow_ms
+        self.max_shapes = max_shapes
+        self._lock = threading.Lock()
+        self._in_flight = {}  # (request_id, connection_id) -> (collection, shape, getMore cursor id)
+        self._cursor_shapes = {}  # cursor id -> shape of the find / aggregate that opened it
+        self._stats = {}  # (collection, command, shape) -> {"latency": Histogram, "failures": int}
+        self._slow = deque(maxlen=slow_log_size)
+        self.dropped_shapes = 0
+
+    def started(self, event):
+        if event.command_name not in SHAPE_FIELDS:
+            return  # Handshakes, heartbeats, sessions, ...
+        command = event.command
+        cursor_id = command.get("getMore") if event.command_name == "getMore" else None
+        shape = command_shape(event.command_name, command) if cursor_id is None else None
+        with self._lock:
+            if cursor_id is not None:
+                # Attribute a getMore to the query that opened the cursor
+                shape = self._cursor_shapes.get(cursor_id, "{}")
+            self._in_flight[(event.request_id, event.connection_id)] = (
+                command_collection(event.command_name, command), shape, cursor_id
+            )
+
+    def succeeded(self, event):
+        started = self._finish(event, failed=False)
+        if started is None or event.command_name not in ("find", "aggregate", "getMore"):
+            return
+        reply_cursor = (event.reply.get("cursor") or {}) if isinstance(event.reply, dict) else {}
+        _, shape, requested_cursor_id = started
+        with self._lock:
+            if requested_cursor_id is None and reply_cursor.get("id"):
+                if len(self._cursor_shapes) >= MAX_OPEN_CURSORS:
+                    self._cursor_shapes.clear()  # Cursors closed by killCursors are never seen exhausting
+                self._cursor_shapes[reply_cursor["id"]] = shape
+            elif requested_cursor_id is not None and not reply_cursor.get("id"):
+                self._cursor_shapes.pop(requested_cursor_id, None)
+
+    def failed(self, event):
+        self._finish(event, failed=True)
+
+    def _finish(self, event, failed):
+        """Record a completed command; return what started() stored for it"""
+        with self._lock:
+            started = self._in_flight.pop((event.request_id, event.connection_id), None)
+        if started is not None:
+            collection, shape, _ = started
+            self.record(collection, event.command_name, shape, event.duration_micros / 1000, failed)
+        return started
+
+    def record(self, collection, command_name, shape, duration_ms, failed=False):
+        """Add one command execution to its shape's statistics"""
+        key = (collection, command_name, shape)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                if len(self._stats) >= self.max_shapes:
+                    self.dropped_shapes += 1
+                    return
+                stats = self._stats[key] = {"latency": Histogram(), "failures": 0}
+            if failed:
+                stats["failures"] += 1
+        stats["latency"].observe(duration_ms)
+
+        if duration_ms >= self.slow_ms:
+            logger.warning(f"Slow Mongo command: {command_name} on {collection} took {duration_ms:.1f} ms, "
+                           f"shape {shape}")
+            self._slow.append({
+                "at": time.time(),
+                "collection": collection,
+                "command": command_name,
+                "shape": shape,
+                "duration_ms": round(duration_ms, 3),
+                "failed": failed,
+            })
+
+    def snapshot(self, sort="p99", limit=None):
+        """
+        Per-shape latency statistics, slowest first.
+        :param sort: Statistic to order by (one of SNAPSHOT_SORT_KEYS)
+        :param limit: Maximum number of shapes to return
+        """
+        with self._lock:
+            items = list(self._stats.items())
+        rows = [
+            {"collection": collection, "command": command_name, "shape": shape,
+             "failures": stats["failures"], **stats["latency"].snapshot()}
+            for (collection, command_name, shape), stats in items
+        ]
+        rows.sort(key=lambda row: row[sort], reverse=True)
+        return rows[:limit] if limit else rows
+
+    def slow_commands(self):
+        """Recent slow commands, newest first"""
+        return list(reversed(self._slow))
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._slow.clear()
+            self.dropped_shapes = 0
+
+
+# Process-wide monitor installed on every Mongo client
+command_monitor = CommandMonitor()
+
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """
+    Connection pool gauges of one client (summed over the servers it talks to). Unlike
+    the latency histograms these are running balances, which a lost update would skew
+    for good, so they are updated under a lock.
+    """
+
+    def __init__(self, client_name):
+        self.client_name = client_name
+        self._lock = threading.Lock()
+        self.open = 0
+        self.checked_out = 0
+        self.waiting = 0
+        self.checkout_failures = 0
+
+    def _add(self, **deltas):
+        with self._lock:
+            for name, delta in deltas.items():
+                setattr(self, name, getattr(self, name) + delta)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._add(open=1)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._add(open=-1)
+
+    def connection_check_out_started(self, event):
+        self._add(waiting=1)
+
+    def connection_check_out_failed(self, event):
+        self._add(waiting=-1, checkout_failures=1)
+
+    def connection_checked_out(self, event):
+        self._add(waiting=-1, checked_out=1)
+
+    def connection_checked_in(self, event):
+        self._add(checked_out=-1)
+
+    def stats(self):
+        return {"open": self.open, "checked_out": self.checked_out, "waiting": self.waiting,
+                "checkout_failures": self.checkout_failures}
+
+
+# One pool monitor per shared client
+sync_pool_monitor = PoolMonitor("sync")
+async_pool_monitor = PoolMonitor("async")
+
+# Pool stat -> (metric name, help, type) exposed on /metrics
+POOL_METRICS = {
+    "open": ("mongo_pool_connections", "Open connections in the Mongo connection pool", "gauge"),
+    "checked_out": ("mongo_pool_checked_out_connections", "Connections currently in use", "gauge"),
+    "waiting": ("mongo_pool_waiting_checkouts", "Operations waiting for a connection", "gauge"),
+    "checkout_failures": ("mongo_pool_checkout_failures_total", "Connection checkouts that failed or timed out",
+                          "counter"),
+}
+
+
+def collect_mongo_metrics():
+    """Metrics collector for the pool monitors and the per-command totals"""
+    pools = [(monitor.client_name, monitor.stats()) for monitor in (sync_pool_monitor, async_pool_monitor)]
+    collected = [
+        (metric, documentation, kind, [({"client": client_name}, stats[stat]) for client_name, stats in pools])
+        for stat, (metric, documentation, kind) in POOL_METRICS.items()
+    ]
+
+    # Shapes are too many for labels; export the totals per collection and command
+    totals = {}
+    for row in command_monitor.snapshot():
+        total = totals.setdefault((row["collection"] or "", row["command"]), [0, 0])
+        total[0] += row["count"]
+        total[1] += row["failures"]
+    collected.append(("mongo_commands_total", "Mongo commands completed", "counter",
+                      [({"collection": collection, "command": command_name}, count)
+                       for (collection, command_name), (count, _) in totals.items()]))
+    collected.append(("mongo_command_failures_total", "Mongo commands that failed", "counter",
+                      [({"collection": collection, "command": command_name}, failures)
+                       for (collection, command_name), (_, failures) in totals.items()]))
+    return collected
+
+
+metrics_registry.register_collector(collect_mongo_metrics)
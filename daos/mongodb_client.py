@@ -1,9 +1,12 @@
-import json
 import os
-from pathlib import Path
-from pymongo import MongoClient
-from pymongo.errors import ConnectionFailure, CollectionInvalid
-from jsonschema import validate, ValidationError
+import threading
+import time
+from datetime import datetime
+from pymongo import MongoClient, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, ConnectionFailure, CollectionInvalid, DuplicateKeyError
+from jsonschema import ValidationError
+from daos.command_monitor import command_monitor, sync_pool_monitor
+from daos.schema_registry import schema_registry
 from utils.logger import Logger
 from utils.env_loader import load_platform_specific_env
 
@@ -11,6 +14,159 @@ logger = Logger(__name__)
 # Dynamically load environment variables based on OS and hostname
 load_platform_specific_env()
 
+# Documents fetched per round trip by iter_many
+DEFAULT_ITER_BATCH_SIZE = int(os.getenv('MONGO_ITER_BATCH_SIZE', 500))
+# Per-command read logs emitted per second and call site (they run on every request)
+MONGO_LOG_PER_SECOND = int(os.getenv('MONGO_LOG_PER_SECOND', 20))
+
+# Process-wide pooled client shared by every MongoDBClient instance
+_shared_client = None
+_shared_client_pid = None
+_shared_client_lock = threading.Lock()
+
+
+def get_pool_options():
+    """
+    Build the connection pool options from environment variables.
+
+    MONGO_MAX_POOL_SIZE: Maximum number of pooled connections (default 100)
+    MONGO_MIN_POOL_SIZE: Connections kept open even when idle (default 0)
+    MONGO_MAX_IDLE_TIME_MS: Idle time before a pooled connection is closed (default 300000)
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: Max wait for a free connection (default 10000)
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: Max wait for a usable server (default 10000)
+    """
+    return {
+        "maxPoolSize": int(os.getenv('MONGO_MAX_POOL_SIZE', 100)),
+        "minPoolSize": int(os.getenv('MONGO_MIN_POOL_SIZE', 0)),
+        "maxIdleTimeMS": int(os.getenv('MONGO_MAX_IDLE_TIME_MS', 300000)),
+        "waitQueueTimeoutMS": int(os.getenv('MONGO_WAIT_QUEUE_TIMEOUT_MS', 10000)),
+        "serverSelectionTimeoutMS": int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', 10000)),
+    }
+
+
+def get_shared_client(uri):
+    """
+    Return the process-wide MongoClient, creating it on first use.
+
+    The client owns a connection pool, so it is created once per process and reused
+    by every DAO. A forked child process gets its own client because pymongo clients
+    are not fork-safe.
+    """
+    global _shared_client, _shared_client_pid
+    if _shared_client is None or _shared_client_pid != os.getpid():
+        with _shared_client_lock:
+            if _shared_client is None or _shared_client_pid != os.getpid():
+                pool_options = get_pool_options()
+                logger.info(f"Creating shared MongoDB client with pool options: {pool_options}")
+                client = MongoClient(uri, tlsAllowInvalidCertificates=True,
+                                     event_listeners=[command_monitor, sync_pool_monitor], **pool_options)
+                try:
+                    # Fail fast on the first connection only; pooled connections are monitored by pymongo
+                    client.admin.command('ping')
+                except Exception:
+                    client.close()
+                    raise
+                _shared_client = client
+                _shared_client_pid = os.getpid()
+    return _shared_client
+
+
+def close_shared_client():
+    """Close the process-wide MongoClient and its connection pool (call on shutdown)."""
+    global _shared_client, _shared_client_pid
+    with _shared_client_lock:
+        if _shared_client is not None:
+            _shared_client.close()
+            logger.info("Shared MongoDB client closed.")
+        _shared_client = None
+        _shared_client_pid = None
+
+
+def load_validation_schema(schema_filename):
+    """
+    Return a JSON Schema from the process-wide schema registry (parsed once).
+    :param schema_filename: Name of the schema file
+    :return: Parsed JSON Schema
+    """
+    return schema_registry.get_schema(schema_filename)
+
+
+def build_upsert_update(update_fields, set_on_insert=None):
+    """
+    Build the update document for an upsert.
+
+    Fields in update_fields are always set; created_at (plus set_on_insert) is only
+    written when the upsert inserts a new document.
+    :param update_fields: Fields to $set
+    :param set_on_insert: Extra fields to write on insert only
+    :return: Update document
+    """
+    if not isinstance(update_fields, dict) or not update_fields:
+        raise ValueError("update_fields must be a non-empty dictionary")
+    for key in update_fields:
+        if key.startswith("$"):
+            raise ValueError(f"Illegal field name in update_data: {key}")
+
+    on_insert = {"created_at": datetime.utcnow()}
+    on_insert.update(set_on_insert or {})
+    return {
+        "$set": {**update_fields, "is_deleted": False},
+        "$setOnInsert": {k: v for k, v in on_insert.items() if k not in update_fields},
+    }
+
+
+def prepare_bulk_upsert(records, schema, validate_data):
+    """
+    Validate records and build unordered upsert operations for them.
+    :param records: List of (query, update_fields) tuples
+    :param schema: Optional schema; each record is validated as the document an insert would store
+    :param validate_data: Validation callable (raises ValueError)
+    :return: (results, operations, positions) where positions[i] is the record index of operations[i]
+    """
+    results, operations, positions = [], [], []
+    for index, (query, update_fields) in enumerate(records):
+        results.append({"index": index, "operation": None})
+        try:
+            update = build_upsert_update(update_fields)
+            if schema:
+                validate_data({**update["$setOnInsert"], **query, **update["$set"]}, schema)
+        except ValueError as e:
+            results[index].update(operation="error", error=str(e))
+            continue
+        operations.append(UpdateOne(query, update, upsert=True))
+        positions.append(index)
+    return results, operations, positions
+
+
+def apply_bulk_write_details(details, positions, results, retry_duplicates=True):
+    """
+    Map a bulk_write result (or BulkWriteError details) back onto per-record results.
+    :return: Operation indexes that failed on a duplicate key race and should be retried
+    """
+    upserted = {item["index"]: item["_id"] for item in details.get("upserted", [])}
+    errors = {item["index"]: item for item in details.get("writeErrors", [])}
+    retry = []
+    for op_index, record_index in enumerate(positions):
+        result = results[record_index]
+        if op_index in errors:
+            error = errors[op_index]
+            if retry_duplicates and error.get("code") == 11000:
+                retry.append(op_index)
+            else:
+                result.update(operation="error", error=error.get("errmsg"))
+        elif op_index in upserted:
+            result.update(operation="create", inserted_id=upserted[op_index])
+        else:
+            result["operation"] = "update"
+    return retry
+
+
+def to_return_document(return_document):
+    """Map 'before'/'after' onto pymongo's ReturnDocument"""
+    if return_document not in ("before", "after"):
+        raise ValueError("return_document must be 'before' or 'after'")
+    return ReturnDocument.BEFORE if return_document == "before" else ReturnDocument.AFTER
+
 
 class MongoDBClient:
     def __init__(self, db_name=None):
@@ -20,23 +176,20 @@ class MongoDBClient:
         if not self.uri:
             raise ValueError("MONGO_URI environment variable is not set!")
 
-        logger.info(f"MongoDB URI constructed: {self.uri}")
         self.client = None
         self.db = None
         self.schemas = {}  # Cache loaded schemas
         self._connect()
 
     def _connect(self):
-        """Connect to MongoDB and test connection"""
+        """Attach to the shared pooled MongoDB client"""
         if not self.client:
             try:
-                logger.info(f"Connecting to MongoDB: URI={self.uri}, DB_NAME={self.db_name}")
-                self.client = MongoClient(self.uri, tlsAllowInvalidCertificates=True)
+                self.client = get_shared_client(self.uri)
                 self.db = self.client[self.db_name]
-                self.client.admin.command('ping')
-                logger.info(f"Successfully connected to MongoDB database: {self.db_name}")
             except Exception as e:
                 logger.error(f"Failed to connect to MongoDB: {str(e)}")
+                self.client = None
                 self.db = None
                 raise
 
@@ -46,15 +199,34 @@ class MongoDBClient:
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.close()
+        # Connections are returned to the shared pool after each operation,
+        # so there is nothing to tear down here.
+        pass
 
     def close(self):
-        """Close the MongoDB connection"""
-        if self.client:
-            self.client.close()
-            logger.info("MongoDB connection closed.")
-            self.client = None
-            self.db = None
+        """Detach from the shared client. The pool itself is closed by close_shared_client()."""
+        self.client = None
+        self.db = None
+
+    def health_check(self):
+        """
+        Ping the server through the shared pool.
+        :return: Dict with status, round-trip latency and the pool configuration
+        """
+        self._connect()
+        start = time.perf_counter()
+        try:
+            self.client.admin.command('ping')
+            status = "ok"
+        except ConnectionFailure as e:
+            logger.error(f"MongoDB health check failed: {str(e)}")
+            status = "unavailable"
+        return {
+            "status": status,
+            "database": self.db_name,
+            "latency_ms": round((time.perf_counter() - start) * 1000, 2),
+            "pool": get_pool_options(),
+        }
 
     def _load_validation_schema(self, schema_filename):
         """
@@ -62,32 +234,16 @@ class MongoDBClient:
         :param schema_filename: Name of the schema file
         :return: Parsed JSON Schema
         """
-        base_path = Path(__file__).parent.parent / "schema"
-
-        logger.debug(f"Base path for schemas: {base_path.resolve()}")
-        try:
-            # Search for the schema file in all subdirectories
-            schema_path = next(base_path.rglob(schema_filename))
-            logger.debug(f"Found schema file at: {schema_path}")
-            with open(schema_path, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except StopIteration:
-            logger.error(f"Schema file not found: {schema_filename} in {base_path.resolve()} or its subdirectories.")
-            raise FileNotFoundError(
-                f"Schema file not found: {schema_filename} in {base_path.resolve()} or its subdirectories."
-            )
-        except Exception as e:
-            logger.error(f"Error loading schema file {schema_filename}: {str(e)}")
-            raise
+        return load_validation_schema(schema_filename)
 
     def validate_data(self, data, schema):
         """
         Validate data against JSON Schema.
         :param data: Data to be validated
-        :param schema: JSON Schema for validation
+        :param schema: Schema file name (precompiled validator from the registry) or a raw JSON Schema
         """
         try:
-            validate(instance=data, schema=schema)
+            schema_registry.get_validator(schema).validate(data)
         except ValidationError as e:
             logger.error(f"Data validation failed: {e.message}")
             raise ValueError(f"Data validation error: {e.message}")
@@ -105,8 +261,7 @@ class MongoDBClient:
             logger.info(f"Collection '{collection_name}' already exists.")
 
         schema = self._load_validation_schema(schema_filename)
-        logger.warning(f"Schema validation is not supported in the database. "
-                       f"Validation will be performed at the application level for collection: {collection_name}")
+        logger.info(f"Validation will be performed at the application level for collection: {collection_name}")
 
         return schema
 
@@ -127,9 +282,9 @@ class MongoDBClient:
         logger.info(f"Document inserted with ID: {result.inserted_id}")
         return result.inserted_id
 
-    def update_one(self, collection_name, query, update):
+    def update_one(self, collection_name, query, update, upsert=False):
         """
-        Update a single document in a collection.
+        Update a single document in a collection (inserting it if upsert is True).
         """
         if not isinstance(update, dict):
             raise ValueError("Update data must be a dictionary.")
@@ -139,9 +294,73 @@ class MongoDBClient:
                 if key.startswith("$"):
                     raise ValueError(f"Illegal field name in update_data: {key}")
 
-        logger.debug(f"Updating {collection_name} with query: {query}, update: {update}")
+        logger.debug("Updating %s", collection_name, query=query, update=update)
+        collection = self.db[collection_name]
+        return collection.update_one(query, update, upsert=upsert)
+
+    def upsert_one(self, collection_name, query, update_fields, set_on_insert=None):
+        """
+        Insert or update a single document in one server round trip.
+
+        created_at is only set when a new document is inserted. If two writers race to
+        insert the same unique key, the loser retries once and lands as an update.
+        :param collection_name: Target collection name
+        :param query: Query identifying the document (usually its unique key)
+        :param update_fields: Fields to set on the document
+        :param set_on_insert: Extra fields to write on insert only
+        :return: {"operation": "create", "inserted_id": ...} or
+                 {"operation": "update", "matched_count": ..., "modified_count": ..., "upserted_id": None}
+        """
+        logger.info("Upserting one document in collection: %s", collection_name, query=query)
+        update = build_upsert_update(update_fields, set_on_insert)
         collection = self.db[collection_name]
-        return collection.update_one(query, update)
+        try:
+            result = collection.update_one(query, update, upsert=True)
+        except DuplicateKeyError:
+            result = collection.update_one(query, update, upsert=True)
+
+        if result.upserted_id is not None:
+            return {"operation": "create", "inserted_id": result.upserted_id}
+        return {
+            "operation": "update",
+            "matched_count": result.matched_count,
+            "modified_count": result.modified_count,
+            "upserted_id": None,
+        }
+
+    def find_one_and_update(self, collection_name, query, update, projection=None, return_document="after",
+                            upsert=False):
+        """
+        Atomically update a single document and return it.
+        :param collection_name: Target collection name
+        :param query: Query to identify the document
+        :param update: Update document
+        :param projection: Fields to include or exclude in the returned document
+        :param return_document: 'before' or 'after' the update
+        :param upsert: Insert the document if none matches
+        :return: The document, or None if nothing matched (or it was just inserted and return_document='before')
+        """
+        logger.debug("Find one and update %s", collection_name, query=query, update=update)
+        collection = self.db[collection_name]
+        return collection.find_one_and_update(query, update, projection=projection, upsert=upsert,
+                                              return_document=to_return_document(return_document))
+
+    def find_one_and_upsert(self, collection_name, query, update_fields, set_on_insert=None, projection=None,
+                            return_document="after"):
+        """
+        Upsert a single document in one server round trip and return it.
+
+        With return_document='before' a None result means the document was created,
+        which also tells the caller the operation type.
+        """
+        logger.info("Find one and upsert in collection: %s", collection_name, query=query)
+        update = build_upsert_update(update_fields, set_on_insert)
+        try:
+            return self.find_one_and_update(collection_name, query, update, projection=projection,
+                                            return_document=return_document, upsert=True)
+        except DuplicateKeyError:
+            return self.find_one_and_update(collection_name, query, update, projection=projection,
+                                            return_document=return_document, upsert=True)
 
     def find_one(self, collection_name, query, include_deleted=False, projection=None):
         """
@@ -157,7 +376,7 @@ class MongoDBClient:
         Returns:
             dict: The found document, or None if no document matches the query.
         """
-        logger.info(f"Finding one document in collection: {collection_name} with query: {query}")
+        logger.info("Finding one document in collection: %s", collection_name, query=query, max_per_second=MONGO_LOG_PER_SECOND)
 
         # Exclude soft-deleted documents unless explicitly allowed
         if not include_deleted:
@@ -166,7 +385,7 @@ class MongoDBClient:
         # Execute the query with the optional projection
         collection = self.db[collection_name]
         result = collection.find_one(query, projection=projection)
-        logger.info(f"Find one result: {result}")
+        logger.debug("Find one result: %s", "found" if result else "not found", max_per_second=MONGO_LOG_PER_SECOND)
         return result
 
     def insert_many(self, collection_name, data_list, schema=None):
@@ -185,7 +404,7 @@ class MongoDBClient:
             data["is_deleted"] = False
         collection = self.db[collection_name]
         result = collection.insert_many(data_list)
-        logger.info(f"Documents inserted with IDs: {result.inserted_ids}")
+        logger.info("Documents inserted", ids=result.inserted_ids)
         return result.inserted_ids
 
     def delete_one(self, collection_name, query, soft_delete=True):
@@ -195,7 +414,7 @@ class MongoDBClient:
         :param query: Query to identify the document
         :param soft_delete: If True, perform a soft delete by setting is_deleted to True
         """
-        logger.info(f"Deleting one document in collection: {collection_name} with query: {query}")
+        logger.info("Deleting one document in collection: %s", collection_name, query=query)
         collection = self.db[collection_name]
 
         if soft_delete:
@@ -207,7 +426,8 @@ class MongoDBClient:
             logger.info(f"Physical delete result: {result.deleted_count} document(s) deleted")
         return result
 
-    def find_many(self, collection_name, query, include_deleted=False, sort=None, limit=0, skip=0):
+    def find_many(self, collection_name, query, include_deleted=False, sort=None, limit=0, skip=0,
+                  projection=None):
         """
         Find multiple documents, supporting sorting, limit, and skip options.
         :param collection_name: Target collection name
@@ -216,13 +436,14 @@ class MongoDBClient:
         :param sort: Sorting criteria (e.g., [("field", pymongo.ASCENDING)])
         :param limit: Number of documents to return
         :param skip: Number of documents to skip
+        :param projection: Fields to include/exclude
         """
-        logger.info(f"Finding many documents in collection: {collection_name} with query: {query}")
+        logger.info("Finding many documents in collection: %s", collection_name, query=query, max_per_second=MONGO_LOG_PER_SECOND)
         if not include_deleted:
             query["is_deleted"] = False
         collection = self.db[collection_name]
 
-        cursor = collection.find(query)
+        cursor = collection.find(query, projection)
         if sort:
             cursor = cursor.sort(sort)
         if skip > 0:
@@ -231,9 +452,31 @@ class MongoDBClient:
             cursor = cursor.limit(limit)
 
         result_list = list(cursor)
-        logger.info(f"Find many result: {len(result_list)} document(s) found")
+        logger.info("Find many result: %d document(s) found", len(result_list), max_per_second=MONGO_LOG_PER_SECOND)
         return result_list
 
+    def iter_many(self, collection_name, query, include_deleted=False, sort=None, projection=None,
+                  batch_size=DEFAULT_ITER_BATCH_SIZE):
+        """
+        Yield matching documents one at a time, fetching them from the server in batches,
+        so memory stays flat regardless of the result size.
+        :param collection_name: Target collection name
+        :param query: Query to filter documents
+        :param include_deleted: If False, exclude soft-deleted documents
+        :param sort: Sorting criteria (e.g., [("field", pymongo.ASCENDING)])
+        :param projection: Fields to include/exclude
+        :param batch_size: Number of documents per getMore round trip
+        """
+        logger.info("Iterating documents in collection: %s", collection_name, query=query, max_per_second=MONGO_LOG_PER_SECOND)
+        if not include_deleted:
+            query["is_deleted"] = False
+
+        cursor = self.db[collection_name].find(query, projection).batch_size(batch_size)
+        if sort:
+            cursor = cursor.sort(sort)
+        with cursor:
+            yield from cursor
+
     def insert_many(self, collection_name, data_list, schema=None):
         """
         Insert multiple documents into the specified collection, optionally validating against a JSON Schema.
@@ -250,9 +493,39 @@ class MongoDBClient:
             data["is_deleted"] = False
         collection = self.db[collection_name]
         result = collection.insert_many(data_list)
-        logger.info(f"Documents inserted with IDs: {result.inserted_ids}")
+        logger.info("Documents inserted", ids=result.inserted_ids)
         return result.inserted_ids
 
+    def bulk_upsert(self, collection_name, records, schema=None, ordered=False):
+        """
+        Upsert many documents with a single (by default unordered) bulk_write.
+
+        Records that fail validation are reported and skipped; the rest are written in
+        one round trip. Upserts that lose a duplicate key race are retried once.
+        :param collection_name: Target collection name
+        :param records: List of (query, update_fields) tuples, query being the unique key
+        :param schema: Schema file name or JSON Schema to validate each record against
+        :param ordered: Stop at the first write error if True
+        :return: One result per record: {"index", "operation": "create"|"update"|"error", ...}
+        """
+        logger.info(f"Bulk upserting {len(records)} document(s) into collection: {collection_name}")
+        results, operations, positions = prepare_bulk_upsert(records, schema, self.validate_data)
+        if operations:
+            details = self._bulk_write(collection_name, operations, ordered)
+            retry = apply_bulk_write_details(details, positions, results)
+            if retry:
+                details = self._bulk_write(collection_name, [operations[i] for i in retry], ordered)
+                apply_bulk_write_details(details, [positions[i] for i in retry], results, retry_duplicates=False)
+        return results
+
+    def _bulk_write(self, collection_name, operations, ordered):
+        """Run bulk_write and return its raw result, including partial failures"""
+        try:
+            return self.db[collection_name].bulk_write(operations, ordered=ordered).bulk_api_result
+        except BulkWriteError as e:
+            logger.warning(f"Bulk write to {collection_name} had {len(e.details.get('writeErrors', []))} error(s)")
+            return e.details
+
     def count_documents(self, collection_name, query):
         """
         Count the number of documents that match the query.
@@ -260,12 +533,25 @@ class MongoDBClient:
         :param query: Query to filter documents
         :return: Count of matching documents
         """
-        logger.info(f"Counting documents in collection: {collection_name} with query: {query}")
+        logger.info("Counting documents in collection: %s", collection_name, query=query, max_per_second=MONGO_LOG_PER_SECOND)
         collection = self.db[collection_name]
         count = collection.count_documents(query)
-        logger.info(f"Count result: {count} document(s) found")
+        logger.info("Count result: %d document(s) found", count, max_per_second=MONGO_LOG_PER_SECOND)
         return count
 
+    def aggregate(self, collection_name, pipeline):
+        """
+        Run an aggregation pipeline and return the resulting documents.
+        :param collection_name: Target collection name
+        :param pipeline: List of aggregation stages
+        :return: List of result documents
+        """
+        logger.info("Aggregating documents in collection: %s", collection_name, max_per_second=MONGO_LOG_PER_SECOND)
+        collection = self.db[collection_name]
+        result_list = list(collection.aggregate(pipeline))
+        logger.info("Aggregate result: %d document(s) returned", len(result_list), max_per_second=MONGO_LOG_PER_SECOND)
+        return result_list
+
     def delete_many(self, collection_name, query, soft_delete=True):
         """
         Delete multiple documents, performing a soft delete by default.
@@ -273,7 +559,7 @@ class MongoDBClient:
         :param query: Query to identify the documents
         :param soft_delete: If True, perform a soft delete by setting is_deleted to True
         """
-        logger.info(f"Deleting many documents in collection: {collection_name} with query: {query}")
+        logger.info("Deleting many documents in collection: %s", collection_name, query=query)
         collection = self.db[collection_name]
 
         if soft_delete:
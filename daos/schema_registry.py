@@ -0,0 +1,126 @@
+"""
+JSON Schema Registry
+
+Loads every schema under schema/ once per process and keeps a precompiled validator
+for each, so validating a document on insert only costs the instance check.
+
+The schema files use MongoDB's $jsonSchema dialect; the `bsonType` keyword is
+mapped onto the Python types pymongo produces (ObjectId, datetime, ...).
+
+@Date: 2026-10-16
+"""
+import json
+import threading
+from datetime import datetime
+from decimal import Decimal
+from pathlib import Path
+from bson import ObjectId, Decimal128
+from jsonschema import Draft7Validator, validators
+from jsonschema.exceptions import ValidationError
+from utils.logger import Logger
+
+logger = Logger(__name__)
+
+SCHEMA_DIR = Path(__file__).parent.parent / "schema"
+
+# bsonType aliases -> accepted Python types
+BSON_TYPES = {
+    "objectId": (ObjectId,),
+    "date": (datetime,),
+    "string": (str,),
+    "int": (int,),
+    "long": (int,),
+    "double": (float, int),
+    "decimal": (Decimal, Decimal128),
+    "bool": (bool,),
+    "array": (list, tuple),
+    "object": (dict,),
+    "null": (type(None),),
+}
+
+
+def _bson_type(validator, bson_types, instance, schema):
+    """Validate the `bsonType` keyword (a single alias or a list of aliases)."""
+    if isinstance(bson_types, str):
+        bson_types = [bson_types]
+    for bson_type in bson_types:
+        accepted = BSON_TYPES.get(bson_type)
+        if accepted is None:
+            continue
+        # bool is a subclass of int, but not a BSON number
+        if isinstance(instance, bool) and bool not in accepted:
+            continue
+        if isinstance(instance, accepted):
+            return
+    yield ValidationError(f"{instance!r} is not of bsonType {bson_types}")
+
+
+BsonSchemaValidator = validators.extend(Draft7Validator, {"bsonType": _bson_type})
+
+
+def compile_schema(schema):
+    """
+    Check a schema once and return a reusable validator for it.
+    :param schema: Raw schema dict, with or without the $jsonSchema wrapper
+    :return: BsonSchemaValidator instance
+    """
+    schema = schema.get("$jsonSchema", schema)
+    BsonSchemaValidator.check_schema(schema)
+    return BsonSchemaValidator(schema)
+
+
+class SchemaRegistry:
+    def __init__(self, schema_dir=SCHEMA_DIR):
+        self.schema_dir = Path(schema_dir)
+        self._schemas = None
+        self._validators = {}
+        self._lock = threading.Lock()
+
+    def _load(self):
+        """Read and compile every schema file (runs once)"""
+        if self._schemas is not None:
+            return
+        with self._lock:
+            if self._schemas is not None:
+                return
+            schemas, compiled = {}, {}
+            for schema_path in sorted(self.schema_dir.rglob("*.json")):
+                with open(schema_path, "r", encoding="utf-8") as f:
+                    schema = json.load(f)
+                schemas[schema_path.name] = schema
+                compiled[schema_path.name] = compile_schema(schema)
+                logger.debug("Compiled schema: %s", schema_path.name)
+            self._validators = compiled
+            self._schemas = schemas
+            logger.info(f"Loaded {len(schemas)} schema(s) from {self.schema_dir.resolve()}")
+
+    def names(self):
+        self._load()
+        return list(self._schemas)
+
+    def get_schema(self, schema_filename):
+        """
+        Return the raw schema for a file name.
+        :param schema_filename: Name of the schema file (e.g. 'users_schema.json')
+        """
+        self._load()
+        try:
+            return self._schemas[schema_filename]
+        except KeyError:
+            logger.error(f"Schema file not found: {schema_filename} in {self.schema_dir.resolve()}")
+            raise FileNotFoundError(
+                f"Schema file not found: {schema_filename} in {self.schema_dir.resolve()} or its subdirectories."
+            )
+
+    def get_validator(self, schema):
+        """
+        Return a compiled validator.
+        :param schema: Schema file name (cached) or a raw schema dict (compiled on the fly)
+        """
+        if isinstance(schema, dict):
+            return compile_schema(schema)
+        self.get_schema(schema)
+        return self._validators[schema]
+
+
+schema_registry = SchemaRegistry()
@@ -0,0 +1,151 @@
+"""
+Registered-Email Bloom Filter
+
+Lets registration skip the `users` lookup when an email is definitely not taken. Only
+possible matches are checked in Mongo; the unique `email_1` index stays the final guard.
+
+The filter is persisted as a snapshot in `bloom_filters`, so a worker starting up loads
+it and only scans users created since, instead of rescanning the whole collection.
+Workers also re-scan recent users periodically to pick up each other's registrations.
+
+@Date: 2026-10-16
+"""
+import asyncio
+import os
+from datetime import datetime, timedelta
+import pymongo
+from bson import ObjectId
+from daos.async_mongodb_client import AsyncMongoDBClient
+from daos.user.users_dao import COLLECTION_NAME as USERS_COLLECTION_NAME
+from utils.bloom_filter import BloomFilter
+from utils.logger import Logger
+
+logger = Logger(__name__)
+
+SNAPSHOT_COLLECTION_NAME = 'bloom_filters'
+SNAPSHOT_ID = 'users_email'
+EMAIL_FILTER_CAPACITY = int(os.getenv('EMAIL_FILTER_CAPACITY', 1000000))
+EMAIL_FILTER_ERROR_RATE = float(os.getenv('EMAIL_FILTER_ERROR_RATE', 0.01))
+EMAIL_FILTER_REFRESH_SECONDS = int(os.getenv('EMAIL_FILTER_REFRESH_SECONDS', 30))
+# ObjectIds are generated by each worker's clock, so catch-up scans start a little early
+CATCH_UP_OVERLAP = timedelta(seconds=60)
+
+
+class AsyncEmailFilter:
+    def __init__(self, db_client=None):
+        self.db_client = db_client or AsyncMongoDBClient()
+        self.bloom = None  # None until loaded; every email is then a possible match
+        self.last_user_id = None  # Highest user _id scanned so far
+        self.skipped_lookups = 0
+        self.possible_matches = 0
+        self._dirty = False  # Changed since the last saved snapshot
+        self._task = None
+
+    def might_exist(self, email):
+        """False means the email is definitely not registered"""
+        if self.bloom is None or email in self.bloom:
+            self.possible_matches += 1
+            return True
+        self.skipped_lookups += 1
+        return False
+
+    def add(self, email):
+        if self.bloom is not None:
+            self.bloom.add(email)
+            self._dirty = True
+
+    async def load(self):
+        """Load the saved snapshot and catch up, or build the filter with a full scan"""
+        snapshot = await self.db_client.find_one(SNAPSHOT_COLLECTION_NAME, {"_id": SNAPSHOT_ID},
+                                                 include_deleted=True)
+        if snapshot and snapshot["filter"]["count"] < snapshot["filter"]["capacity"]:
+            self.bloom = BloomFilter.from_document(snapshot["filter"])
+            self.last_user_id = snapshot.get("last_user_id")
+            logger.info(f"Email filter loaded from snapshot ({self.bloom.count} emails).")
+        else:
+            # First start, or the filter outgrew its capacity: rebuild from scratch
+            user_count = await self.db_client.count_documents(USERS_COLLECTION_NAME, {})
+            capacity = max(EMAIL_FILTER_CAPACITY, user_count * 2)
+            bloom = BloomFilter(capacity, EMAIL_FILTER_ERROR_RATE)
+            self.last_user_id = None
+            await self._scan(bloom)
+            self.bloom = bloom
+            logger.info(f"Email filter built from a full scan ({bloom.count} emails).")
+        await self.refresh()
+
+    async def _scan(self, bloom):
+        """
+        Stream users newer than last_user_id (minus the overlap) into the filter.
+        :return: Number of users not seen by a previous scan
+        """
+        query = {}
+        if self.last_user_id is not None:
+            since = self.last_user_id.generation_time - CATCH_UP_OVERLAP
+            query["_id"] = {"$gte": ObjectId.from_datetime(since)}
+        new_users = 0
+        async for user in self.db_client.iter_many(USERS_COLLECTION_NAME, query, include_deleted=True,
+                                                   sort=[("_id", pymongo.ASCENDING)],
+                                                   projection={"email": 1}):
+            if user.get("email"):
+                bloom.add(user["email"])
+            if self.last_user_id is None or user["_id"] > self.last_user_id:
+                self.last_user_id = user["_id"]
+                new_users += 1
+        if new_users:
+            self._dirty = True
+        return new_users
+
+    async def refresh(self):
+        """Add users registered since the last scan (by any worker) and save the snapshot"""
+        if self.bloom is None:
+            return
+        new_users = await self._scan(self.bloom)
+        logger.debug("Email filter refreshed (%d new user(s)).", new_users)
+        if self._dirty:
+            await self.save()
+
+    async def save(self):
+        await self.db_client.update_one(
+            SNAPSHOT_COLLECTION_NAME,
+            {"_id": SNAPSHOT_ID},
+            {"$set": {"filter": self.bloom.to_document(), "last_user_id": self.last_user_id,
+                      "updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+        self._dirty = False
+
+    async def _run(self):
+        while True:
+            try:
+                if self.bloom is None:
+                    await self.load()
+                else:
+                    await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Email filter refresh failed: {e}")
+            await asyncio.sleep(EMAIL_FILTER_REFRESH_SECONDS)
+
+    def start(self):
+        """Load in the background; lookups fall through to Mongo until the filter is ready"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self):
+        return {
+            "ready": self.bloom is not None,
+            "emails": self.bloom.count if self.bloom else 0,
+            "capacity": self.bloom.capacity if self.bloom else EMAIL_FILTER_CAPACITY,
+            "skipped_lookups": self.skipped_lookups,
+            "possible_matches": self.possible_matches,
+        }
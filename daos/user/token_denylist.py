@@ -0,0 +1,247 @@
+"""
+Revoked-Token Denylist
+
+Revocations are stored in the `token_denylist` collection, each until the tokens it
+covers would have expired anyway (TTL index on expires_at). Two kinds of entries:
+
+- token:<digest>  one token (logout)
+- user:<user_id>  every token of a user issued before `revoked_before` (revoke)
+
+Every worker mirrors the token entries into an in-memory Bloom filter, so the check on
+each authenticated request is a few bit lookups: Mongo is only queried when the filter
+reports a possible match. User entries are few and must be compared with each token's
+issue time, so they are kept in memory as they are (user_id -> revoked_before): a user
+who logged out everywhere does not send every later request to Mongo.
+
+Revocations made by this worker apply immediately; those of other workers are picked
+up by an incremental scan every TOKEN_DENYLIST_REFRESH_SECONDS.
+
+@Date: 2026-10-16
+"""
+import asyncio
+import os
+from datetime import datetime, timedelta
+import pymongo
+from pymongo import IndexModel
+from daos.async_mongodb_client import AsyncMongoDBClient
+from utils.bloom_filter import BloomFilter
+from utils.logger import Logger
+
+logger = Logger(__name__)
+
+# Collection definition, applied once at deploy time by scripts/bootstrap.py
+COLLECTION_NAME = 'token_denylist'
+SCHEMA_FILENAME = 'token_denylist_schema.json'
+INDEXES = [
+    # Entries are deleted once the tokens they cover have expired
+    IndexModel([("expires_at", pymongo.ASCENDING)], expireAfterSeconds=0, name="expires_at_ttl"),
+    # Incremental refresh of the workers' filters
+    IndexModel([("revoked_at", pymongo.ASCENDING)], name="revoked_at_1"),
+]
+
+TOKEN_DENYLIST_CAPACITY = int(os.getenv('TOKEN_DENYLIST_CAPACITY', 100000))
+TOKEN_DENYLIST_ERROR_RATE = float(os.getenv('TOKEN_DENYLIST_ERROR_RATE', 0.001))
+TOKEN_DENYLIST_REFRESH_SECONDS = float(os.getenv('TOKEN_DENYLIST_REFRESH_SECONDS', 5))
+# Worker clocks differ, so refresh scans start a little before the last entry seen
+CATCH_UP_OVERLAP = timedelta(seconds=60)
+
+
+def token_key(digest):
+    return f"token:{digest}"
+
+
+def user_key(user_id):
+    return f"user:{user_id}"
+
+
+class AsyncTokenDenylist:
+    def __init__(self, db_client=None):
+        self.db_client = db_client or AsyncMongoDBClient()
+        self.bloom = None  # Token entries; None until loaded, every token is then a possible match
+        self.user_revocations = {}  # user_id -> (revoked_before, expires_at) of the user entries
+        self.last_revoked_at = None  # Latest revoked_at scanned so far
+        self.skipped_lookups = 0
+        self.possible_matches = 0
+        self.revoked = 0  # Possible matches Mongo confirmed
+        self._building = None  # Filter being loaded; local revocations are added to it too
+        self._task = None
+
+    def _add(self, key):
+        for bloom in (self.bloom, self._building):
+            if bloom is not None:
+                bloom.add(key)
+
+    def _remember_user_revocation(self, user_id, revoked_before, expires_at):
+        current = self.user_revocations.get(user_id)
+        if current is not None:
+            revoked_before, expires_at = max(revoked_before, current[0]), max(expires_at, current[1])
+        self.user_revocations[user_id] = (revoked_before, expires_at)
+
+    async def is_revoked(self, digest, user_id, issued_at):
+        """
+        :param digest: Digest of the token (see auth_service.token_digest)
+        :param user_id: user_id claim of the token
+        :param issued_at: iat claim of the token (None for tokens issued without one)
+        :return: True if the token was revoked
+        """
+        user_revocation = self.user_revocations.get(user_id)
+        if user_revocation is not None and (issued_at is None or issued_at < user_revocation[0]):
+            self.revoked += 1
+            return True
+
+        if self.bloom is None:
+            # Not loaded yet: nothing is known locally, check both kinds of entries
+            keys = [token_key(digest), user_key(user_id)]
+        elif token_key(digest) in self.bloom:
+            keys = [token_key(digest)]
+        else:
+            self.skipped_lookups += 1
+            return False
+
+        self.possible_matches += 1
+        entries = await self.db_client.find_many(COLLECTION_NAME, {"_id": {"$in": keys}}, include_deleted=True)
+        revoked = False
+        for entry in entries:
+            if entry["_id"].startswith("user:"):
+                self._remember_user_revocation(user_id, entry["revoked_before"], entry["expires_at"])
+                revoked = revoked or issued_at is None or issued_at < entry["revoked_before"]
+            else:
+                revoked = True
+        if revoked:
+            self.revoked += 1
+        return revoked
+
+    async def revoke_token(self, digest, user_id, expires_at):
+        """
+        Revoke one token.
+        :param expires_at: Expiry of the token (datetime, UTC); the entry is dropped after it
+        """
+        key = token_key(digest)
+        now = datetime.utcnow()
+        await self.db_client.update_one(
+            COLLECTION_NAME,
+            {"_id": key},
+            {"$set": {"user_id": user_id, "revoked_at": now, "expires_at": expires_at}},
+            upsert=True
+        )
+        self._add(key)
+        logger.audit_log(
+            user_id=user_id,
+            action="revoke_token",
+            resource=COLLECTION_NAME,
+            status="success",
+            details=f"Token revoked until {expires_at.isoformat()}"
+        )
+
+    async def revoke_user(self, user_id, revoked_before, expires_at):
+        """
+        Revoke every token of a user issued before revoked_before.
+        :param revoked_before: Epoch seconds, in whole milliseconds like the tokens' iat
+        :param expires_at: Expiry of the newest revoked token (datetime, UTC); the entry is dropped after it
+        """
+        key = user_key(user_id)
+        now = datetime.utcnow()
+        await self.db_client.update_one(
+            COLLECTION_NAME,
+            {"_id": key},
+            {"$set": {"user_id": user_id, "revoked_at": now},
+             "$max": {"revoked_before": revoked_before, "expires_at": expires_at}},
+            upsert=True
+        )
+        self._remember_user_revocation(user_id, revoked_before, expires_at)
+        logger.audit_log(
+            user_id=user_id,
+            action="revoke_user_tokens",
+            resource=COLLECTION_NAME,
+            status="success",
+            details=f"Tokens issued before {revoked_before} revoked"
+        )
+
+    async def load(self):
+        """Build the filter (and refresh the user entries) from every live entry"""
+        count = await self.db_client.count_documents(COLLECTION_NAME, {})
+        bloom = BloomFilter(max(TOKEN_DENYLIST_CAPACITY, count * 2), TOKEN_DENYLIST_ERROR_RATE)
+        self.last_revoked_at = None
+        self._building = bloom
+        try:
+            await self._scan(bloom)
+        finally:
+            self._building = None
+        self.bloom = bloom
+        logger.info(f"Token denylist loaded ({bloom.count} entries).")
+
+    async def _scan(self, bloom):
+        """
+        Add entries revoked since last_revoked_at (minus the overlap) to the filter and
+        the user entries.
+        :return: Number of entries scanned
+        """
+        query = {}
+        if self.last_revoked_at is not None:
+            query["revoked_at"] = {"$gte": self.last_revoked_at - CATCH_UP_OVERLAP}
+        scanned = 0
+        async for entry in self.db_client.iter_many(COLLECTION_NAME, query, include_deleted=True,
+                                                    sort=[("revoked_at", pymongo.ASCENDING)],
+                                                    projection={"user_id": 1, "revoked_before": 1,
+                                                                "revoked_at": 1, "expires_at": 1}):
+            if entry["_id"].startswith("user:"):
+                self._remember_user_revocation(entry["user_id"], entry["revoked_before"], entry["expires_at"])
+            else:
+                bloom.add(entry["_id"])
+            if self.last_revoked_at is None or entry["revoked_at"] > self.last_revoked_at:
+                self.last_revoked_at = entry["revoked_at"]
+            scanned += 1
+        return scanned
+
+    async def refresh(self):
+        """Add entries revoked by any worker since the last scan, and forget expired user entries"""
+        if self.bloom is None:
+            return
+        now = datetime.utcnow()
+        for user_id, (_, expires_at) in list(self.user_revocations.items()):
+            if expires_at <= now:
+                del self.user_revocations[user_id]
+        if self.bloom.count >= self.bloom.capacity:
+            # Expired entries never leave the filter; rebuild it from the live ones
+            await self.load()
+            return
+        scanned = await self._scan(self.bloom)
+        logger.debug("Token denylist refreshed (%d entries scanned).", scanned)
+
+    async def _run(self):
+        while True:
+            try:
+                if self.bloom is None:
+                    await self.load()
+                else:
+                    await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Token denylist refresh failed: {e}")
+            await asyncio.sleep(TOKEN_DENYLIST_REFRESH_SECONDS)
+
+    def start(self):
+        """Load in the background; every token is checked in Mongo until the filter is ready"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self):
+        return {
+            "ready": self.bloom is not None,
+            "entries": self.bloom.count if self.bloom else 0,
+            "user_entries": len(self.user_revocations),
+            "capacity": self.bloom.capacity if self.bloom else TOKEN_DENYLIST_CAPACITY,
+            "skipped_lookups": self.skipped_lookups,
+            "possible_matches": self.possible_matches,
+            "revoked": self.revoked,
+        }
@@ -1,38 +1,46 @@
+import copy
 import hashlib
+import os
 from datetime import datetime
 import pymongo
+from pymongo import IndexModel
 from bson.objectid import ObjectId
 from daos.mongodb_client import MongoDBClient
+from daos.async_mongodb_client import AsyncMongoDBClient
+from utils.cache import create_cache
 from utils.logger import Logger
+from utils.request_context import forget, load_one
 
 logger = Logger(__name__)
 
+# Collection definition, applied once at deploy time by scripts/bootstrap.py
+COLLECTION_NAME = 'users'
+SCHEMA_FILENAME = 'users_schema.json'
+INDEXES = [
+    IndexModel([("email", pymongo.ASCENDING)], unique=True, name="email_1"),
+    IndexModel([("username", pymongo.ASCENDING)], name="username_1"),
+]
+
+# Profile cache in front of the by-id / by-email lookups
+USER_CACHE_MAXSIZE = int(os.getenv('USER_CACHE_MAXSIZE', 10000))
+USER_CACHE_TTL_SECONDS = int(os.getenv('USER_CACHE_TTL_SECONDS', 300))
+
+
 class UserDAO:
     def __init__(self):
         self.db_client = MongoDBClient()
-        self.collection_name = 'users'
+        self.collection_name = COLLECTION_NAME
 
-        # 初始化集合验证规则和索引
-        with self.db_client as db_client:
-            logger.info(f"Setting up validation and index for collection: {self.collection_name}")
-            db_client.ensure_validation(self.collection_name, 'users_schema.json')
-            existing_indexes = db_client.db[self.collection_name].index_information()
-            if "email_1" not in existing_indexes:
-                db_client.db[self.collection_name].create_index(
-                    [("email", pymongo.ASCENDING)], unique=True, name="email_1"
-                )
-            else:
-                logger.info("Index 'email_1' already exists.")
     def get_user_by_username(self, username):
         """Retrieve user information by username"""
-        logger.debug(f"Fetching user by username: {username}")
+        logger.debug("Fetching user by username", username=username)
         with self.db_client as db_client:
             user = db_client.find_one(self.collection_name, {"username": username})
             return user
 
     def get_user_by_email(self, email):
         """Retrieve user information by email"""
-        logger.debug(f"Fetching user by email: {email}")
+        logger.debug("Fetching user by email", email=email)
         with self.db_client as db_client:
             user = db_client.find_one(self.collection_name, {"email": email})
             return user
@@ -113,7 +121,7 @@ class UserDAO:
 
     def get_user_by_id(self, user_id):
         """Retrieve user information by ObjectId, excluding sensitive fields"""
-        logger.debug(f"Fetching user by user_id: {user_id}")
+        logger.debug("Fetching user by user_id", user_id=user_id)
         with self.db_client as db_client:
             user = db_client.find_one(
                 self.collection_name,
@@ -137,3 +145,177 @@ class UserDAO:
                 logger.warning(f"No user found to update: {user_id}")
             return result
 
+
+
+class AsyncUserDAO:
+    """Asyncio counterpart of UserDAO, used by the FastAPI request handlers."""
+
+    def __init__(self, db_client=None, cache=None, email_filter=None):
+        self.db_client = db_client or AsyncMongoDBClient()
+        self.collection_name = COLLECTION_NAME
+        self.cache = cache or create_cache("users", maxsize=USER_CACHE_MAXSIZE, ttl=USER_CACHE_TTL_SECONDS)
+        self.email_filter = email_filter  # Optional AsyncEmailFilter (see daos.user.email_filter)
+
+    async def _load_users(self, field, values, projection=None):
+        """
+        Batch loader behind the by-id / by-email lookups: cache first, then a single `$in`
+        query for the misses. Entries are tagged with the user's id and email so any write
+        to the user drops every cached view of it, in every worker.
+        :param field: '_id' or 'email'
+        :param values: Lookup values (user ids as strings, or emails)
+        :return: {value: user document} for the users found
+        """
+        cache_prefix = "id" if field == "_id" else field
+        users, misses = {}, []
+        for value in values:
+            user = await self.cache.get(f"{cache_prefix}:{value}")
+            if user is None:
+                misses.append(value)
+            else:
+                users[value] = user
+
+        if misses:
+            query_values = [ObjectId(value) for value in misses] if field == "_id" else misses
+            # A user written while loading (e.g. a role change) is not cached in its old state
+            generation = await self.cache.generation()
+            found = await self.db_client.find_many(self.collection_name, {field: {"$in": query_values}},
+                                                   projection=projection)
+            # Misses are not cached, so a new registration is seen at once
+            for user in found:
+                value = str(user["_id"]) if field == "_id" else user[field]
+                users[value] = user
+                await self.cache.set(f"{cache_prefix}:{value}", user, tags=(str(user["_id"]), user.get("email")),
+                                     generation=generation)
+        return users
+
+    async def invalidate(self, user_id=None, email=None):
+        """Drop cached profiles of a user after a write, in this request and on every worker"""
+        forget(self.collection_name)
+        await self.cache.invalidate(str(user_id) if user_id is not None else None, email)
+
+    async def get_user_by_username(self, username):
+        """Retrieve user information by username"""
+        logger.debug("Fetching user by username", username=username)
+        return await self.db_client.find_one(self.collection_name, {"username": username})
+
+    async def get_user_by_email(self, email):
+        """Retrieve user information by email, excluding sensitive fields"""
+        logger.debug("Fetching user by email", email=email)
+        user = await load_one(f"{self.collection_name}:email", email,
+                              lambda emails: self._load_users("email", emails, projection={"password": 0}))
+        return copy.deepcopy(user)  # Callers may modify their copy
+
+    async def get_login_credentials(self, email):
+        """
+        Retrieve the password hash of a user for login. Never cached: credential hashes
+        must not be copied into the (possibly shared) profile cache.
+        :return: {"_id", "username", "password"}, or None if no user has this email
+        """
+        return await self.db_client.find_one(self.collection_name, {"email": email},
+                                             projection={"username": 1, "password": 1})
+
+    async def email_exists(self, email):
+        """Check whether an email is registered, skipping Mongo when the filter rules it out"""
+        if self.email_filter is not None and not self.email_filter.might_exist(email):
+            return False
+        return await self.get_user_by_email(email) is not None
+
+    async def insert_user(self, username, email, password):
+        """Register a new user"""
+        logger.info(f"Inserting new user: {username}, {email}")
+        user_data = {
+            "username": username,
+            "email": email,
+            "password": password,
+            "status": "active",
+            "email_verified": False,
+            "created_at": datetime.utcnow().isoformat(),
+            "updated_at": datetime.utcnow().isoformat(),
+        }
+        try:
+            user_id = await self.db_client.insert_one(self.collection_name, user_data)
+            logger.info(f"User inserted successfully: {user_id}")
+            if self.email_filter is not None:
+                self.email_filter.add(email)
+            return user_id
+        except pymongo.errors.DuplicateKeyError:
+            logger.error(f"Duplicate email detected: {email}")
+            raise ValueError("Email already exists")
+        finally:
+            forget(self.collection_name)  # This request may have remembered the email as unused
+
+    async def update_last_login(self, user_id):
+        """Update the last login timestamp"""
+        logger.info(f"Updating last login for user_id: {user_id}")
+        query = {"_id": ObjectId(user_id)}
+        update_data = {"last_login": datetime.utcnow().isoformat()}
+        result = await self.db_client.update_one(self.collection_name, query, {"$set": update_data})
+        await self.invalidate(user_id)
+        if result.modified_count > 0:
+            logger.info(f"Last login updated for user_id: {user_id}")
+        return result
+
+    async def set_password_reset_token(self, email):
+        """Set password reset token and expiration"""
+        logger.info(f"Generating password reset token for email: {email}")
+        token = hashlib.sha256(f"{email}{datetime.utcnow().timestamp()}".encode()).hexdigest()
+        expires = datetime.utcnow().isoformat()
+        result = await self.db_client.update_one(
+            self.collection_name,
+            {"email": email},
+            {"$set": {"password_reset_token": token, "password_reset_expires": expires}}
+        )
+        await self.invalidate(email=email)
+        logger.info(f"Password reset token set for email: {email}")
+        return result
+
+    async def verify_email(self, user_id):
+        """Verify user's email"""
+        logger.info(f"Verifying email for user_id: {user_id}")
+        result = await self.db_client.update_one(
+            self.collection_name,
+            {"_id": ObjectId(user_id)},
+            {"$set": {"email_verified": True}}
+        )
+        await self.invalidate(user_id)
+        if result.modified_count > 0:
+            logger.info(f"Email verified for user_id: {user_id}")
+        return result
+
+    async def update_user_status(self, user_id, status):
+        """Update user status"""
+        logger.info(f"Updating status for user_id: {user_id} to {status}")
+        if status not in ['active', 'inactive', 'banned', 'deleted']:
+            logger.error(f"Invalid status: {status}")
+            raise ValueError("Invalid status")
+        result = await self.db_client.update_one(
+            self.collection_name,
+            {"_id": ObjectId(user_id)},
+            {"$set": {"status": status}}
+        )
+        await self.invalidate(user_id)
+        logger.info(f"User status updated for user_id: {user_id}")
+        return result
+
+    async def get_user_by_id(self, user_id):
+        """Retrieve user information by ObjectId, excluding sensitive fields"""
+        logger.debug("Fetching user by user_id", user_id=user_id)
+        user_id = str(ObjectId(user_id))  # Reject malformed ids before they join a batch
+        user = await load_one(f"{self.collection_name}:id", user_id,
+                              lambda user_ids: self._load_users("_id", user_ids, projection={"password": 0}))
+        return copy.deepcopy(user)  # Callers may modify their copy
+
+    async def update_user_info(self, user_id, update_fields):
+        """Dynamically update user information"""
+        if not isinstance(update_fields, dict) or not update_fields:
+            logger.error("update_fields must be a non-empty dictionary")
+            raise ValueError("update_fields must be a non-empty dictionary")
+        update_fields["updated_at"] = datetime.utcnow().isoformat()
+        query = {"_id": ObjectId(user_id)}
+        result = await self.db_client.update_one(self.collection_name, query, {"$set": update_fields})
+        await self.invalidate(user_id)
+        if result.matched_count > 0:
+            logger.info(f"User updated successfully: {user_id}")
+        else:
+            logger.warning(f"No user found to update: {user_id}")
+        return result
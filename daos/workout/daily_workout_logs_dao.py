@@ -4,39 +4,171 @@
 """
 from datetime import datetime, date
 import pymongo
+from pymongo import IndexModel
 from bson.objectid import ObjectId
 from daos.mongodb_client import MongoDBClient
+from daos.async_mongodb_client import AsyncMongoDBClient
+from daos.workout.user_progress_dao import (
+    PROGRESS_PROJECTION, UserProgressDAO, AsyncUserProgressDAO, build_progress_inc, merge_inc
+)
 from utils.logger import Logger
 
 # Initialize logger
 logger = Logger(__name__)
 
+# Collection definition, applied once at deploy time by scripts/bootstrap.py
+COLLECTION_NAME = 'daily_workout_logs'
+SCHEMA_FILENAME = 'daily_workout_logs_schema.json'
+INDEXES = [
+    # Ensure each user has only one log per day
+    IndexModel([("user_id", pymongo.ASCENDING), ("log_date", pymongo.ASCENDING)],
+               unique=True, name="user_id_1_log_date_1"),
+    # Live logs only, carrying the summed fields: the progress aggregation and the bulk
+    # pre-read (both filtered on is_deleted: false) are answered from the index alone
+    IndexModel([("user_id", pymongo.ASCENDING), ("is_deleted", pymongo.ASCENDING), ("log_date", pymongo.ASCENDING),
+                ("total_weight_lost", pymongo.ASCENDING), ("total_calories_burnt", pymongo.ASCENDING),
+                ("avg_workout_duration", pymongo.ASCENDING)],
+               name="user_id_1_is_deleted_1_log_date_1_progress",
+               partialFilterExpression={"is_deleted": False}),
+]
+
+
+def to_log_datetime(log_date):
+    """
+    Normalize a log date (date, datetime or 'YYYY-MM-DD' string) to the midnight datetime
+    stored in log_date, so reads and upserts hit the same unique key.
+    """
+    if isinstance(log_date, str):
+        log_date = datetime.strptime(log_date[:10], "%Y-%m-%d")
+    if isinstance(log_date, date):
+        return datetime.combine(log_date, datetime.min.time())
+    raise ValueError(f"Invalid log_date: {log_date!r}")
+
+
+def build_log_date_filter(start_date=None, end_date=None, after=None):
+    """
+    Build a log_date range condition (start/end inclusive, `after` exclusive).
+    :return: Condition dict for the log_date field, or None when unbounded
+    """
+    condition = {}
+    if start_date:
+        condition["$gte"] = to_log_datetime(start_date)
+    if end_date:
+        condition["$lte"] = to_log_datetime(end_date)
+    if after:
+        condition["$gt"] = after
+    return condition or None
+
+
+PROGRESS_GRANULARITIES = ("day", "week", "month")
+# Fields read by the progress aggregation; all of them are keys of the progress index
+PROGRESS_FIELDS = {"_id": 0, "log_date": 1, "total_weight_lost": 1, "total_calories_burnt": 1,
+                   "avg_workout_duration": 1}
+EMPTY_PROGRESS_TOTALS = {
+    "total_weight_lost": 0,
+    "total_calories_burnt": 0,
+    "total_duration": 0,
+    "total_sessions": 0,
+}
+
+
+def build_progress_facet(granularity="day"):
+    """
+    Build the $facet stage computing both the overall totals and the per-period buckets
+    of the workout logs reaching it.
+    :param granularity: Bucket size: 'day', 'week' (starting Monday) or 'month'
+    """
+    if granularity not in PROGRESS_GRANULARITIES:
+        raise ValueError(f"Invalid granularity: {granularity}")
+
+    date_trunc = {"date": "$log_date", "unit": granularity}
+    if granularity == "week":
+        date_trunc["startOfWeek"] = "monday"
+
+    return {
+        "$facet": {
+            "totals": [
+                {
+                    "$group": {
+                        "_id": None,
+                        "total_weight_lost": {"$sum": "$total_weight_lost"},
+                        "total_calories_burnt": {"$sum": "$total_calories_burnt"},
+                        "total_duration": {"$sum": "$avg_workout_duration"},
+                        "total_sessions": {"$sum": 1}
+                    }
+                }
+            ],
+            "buckets": [
+                {
+                    "$group": {
+                        "_id": {"$dateTrunc": date_trunc},
+                        "total_workout_time": {"$sum": "$avg_workout_duration"},
+                        "total_calories_burnt": {"$sum": "$total_calories_burnt"},
+                        "total_weight_lost": {"$sum": "$total_weight_lost"},
+                        "sessions": {"$sum": 1}
+                    }
+                },
+                {"$sort": {"_id": 1}}
+            ]
+        }
+    }
+
+
+def build_progress_pipeline(user_id, start_date=None, end_date=None, granularity="day"):
+    """
+    Build one aggregation returning both the overall totals and the per-period buckets,
+    so the progress dashboard costs a single round trip.
+    :param granularity: Bucket size: 'day', 'week' (starting Monday) or 'month'
+    """
+    facet = build_progress_facet(granularity)
+    match = {"user_id": ObjectId(user_id), "is_deleted": False}
+    log_date_filter = build_log_date_filter(start_date, end_date)
+    if log_date_filter:
+        match["log_date"] = log_date_filter
+    return [{"$match": match}, {"$project": PROGRESS_FIELDS}, facet]
+
+
+def parse_progress_result(results):
+    """Flatten the $facet output of build_progress_pipeline"""
+    facets = results[0] if results else {}
+    totals = facets.get("totals") or [{}]
+    totals = {key: totals[0].get(key, default) for key, default in EMPTY_PROGRESS_TOTALS.items()}
+    buckets = [
+        {
+            "period_start": bucket["_id"],
+            "total_workout_time": bucket["total_workout_time"],
+            "total_calories_burnt": bucket["total_calories_burnt"],
+            "total_weight_lost": bucket["total_weight_lost"],
+            "sessions": bucket["sessions"]
+        } for bucket in facets.get("buckets", [])
+    ]
+    return {"totals": totals, "buckets": buckets}
+
+
+def upsert_result(before, inserted_id):
+    """Describe a find_one_and_upsert(return_document='before') the way upsert_one does"""
+    if before is None:
+        return {"operation": "create", "inserted_id": str(inserted_id)}
+    return {"operation": "update", "matched_count": 1, "modified_count": 1, "upserted_id": None}
+
 
 class DailyWorkoutLogsDAO:
-    def __init__(self):
+    def __init__(self, progress_dao=None):
         self.db_client = MongoDBClient()
-        self.collection_name = 'daily_workout_logs'
-
-        # Apply JSON Schema validation rules and create indexes
-        with self.db_client as db_client:
-            logger.info(f"Initializing validation and index for collection: {self.collection_name}")
-            db_client.ensure_validation(self.collection_name, 'daily_workout_logs_schema.json')
-            db_client.db[self.collection_name].create_index(
-                [("user_id", pymongo.ASCENDING), ("log_date", pymongo.ASCENDING)],
-                unique=True  # Ensure each user has only one log per day
-            )
+        self.collection_name = COLLECTION_NAME
+        self.progress_dao = progress_dao or UserProgressDAO()
 
     def get_log_by_user_and_date(self, user_id, log_date, db_client=None):
         """Retrieve workout log by user_id and log_date."""
         logger.info(f"Fetching workout log for user_id: {user_id}, log_date: {log_date}")
-        query = {"user_id": ObjectId(user_id), "log_date": log_date}
+        query = {"user_id": ObjectId(user_id), "log_date": to_log_datetime(log_date)}
         if db_client is None:
             with self.db_client as db_client:
                 log = db_client.find_one(self.collection_name, query)
         else:
             log = db_client.find_one(self.collection_name, query)
         if log:
-            logger.debug(f"Workout log found: {log}")
+            logger.debug("Workout log found", log=log)
         else:
             logger.warning(f"No workout log found for user_id: {user_id}, log_date: {log_date}")
         return log
@@ -47,13 +179,10 @@ class DailyWorkoutLogsDAO:
         logger.info(f"Creating or updating workout log for user_id: {user_id}, log_date: {log_date}")
 
         # Convert log_date to datetime
-        if isinstance(log_date, date):
-            log_date = datetime.combine(log_date, datetime.min.time())
+        log_date = to_log_datetime(log_date)
 
         with self.db_client as db_client:
             log_data = {
-                "user_id": ObjectId(user_id),
-                "log_date": log_date,
                 "workout_content": workout_content,
                 "total_weight_lost": total_weight_lost,
                 "total_calories_burnt": total_calories_burnt,
@@ -61,29 +190,20 @@ class DailyWorkoutLogsDAO:
                 "updated_at": datetime.utcnow()
             }
 
-            # Check if the log already exists
-            existing_log = self.get_log_by_user_and_date(user_id, log_date, db_client)
-            if existing_log:
-                # Update the existing log
-                result = db_client.update_one(
-                    self.collection_name,
-                    {"user_id": ObjectId(user_id), "log_date": log_date},
-                    {"$set": log_data}
-                )
-                return {
-                    "operation": "update",
-                    "matched_count": result.matched_count,
-                    "modified_count": result.modified_count,
-                    "upserted_id": str(result.upserted_id) if result.upserted_id else None
-                }
-            else:
-                # Create a new log
-                log_data["created_at"] = datetime.now()
-                inserted_id = db_client.insert_one(self.collection_name, log_data)
-                return {
-                    "operation": "create",
-                    "inserted_id": str(inserted_id)
-                }
+            # Single round trip: created_at is only written when the log is new, and the
+            # previous values come back so the progress rollup can be moved by the difference
+            inserted_id = ObjectId()
+            before = db_client.find_one_and_upsert(
+                self.collection_name,
+                {"user_id": ObjectId(user_id), "log_date": log_date},
+                log_data,
+                set_on_insert={"_id": inserted_id},
+                projection=PROGRESS_PROJECTION,
+                return_document="before"
+            )
+            self.progress_dao.apply_increments(user_id, build_progress_inc(log_date, before, log_data),
+                                               db_client=db_client)
+            return upsert_result(before, inserted_id)
 
     def update_log_fields(self, user_id, log_date, update_fields):
         """Update specific fields of a workout log."""
@@ -95,14 +215,20 @@ class DailyWorkoutLogsDAO:
         # Automatically add the `updated_at` timestamp
         update_fields["updated_at"] = datetime.utcnow()
 
-        query = {"user_id": ObjectId(user_id), "log_date": log_date}
+        query = {"user_id": ObjectId(user_id), "log_date": to_log_datetime(log_date)}
         update_data = {"$set": update_fields}
 
-        logger.debug(f"Query: {query}, Update data: {update_data}")
+        logger.debug("Updating workout log", query=query, update=update_data)
 
         with self.db_client as db_client:
-            result = db_client.update_one(self.collection_name, query, update_data)
-            if result.matched_count > 0:
+            before = db_client.find_one_and_update(self.collection_name, query, update_data,
+                                                   projection=PROGRESS_PROJECTION, return_document="before")
+            matched_count = 1 if before else 0
+            if matched_count > 0:
+                self.progress_dao.apply_increments(
+                    user_id, build_progress_inc(before["log_date"], before, {**before, **update_fields}),
+                    db_client=db_client
+                )
                 logger.audit_log(
                     user_id=str(user_id),
                     action="update_fields",
@@ -120,8 +246,8 @@ class DailyWorkoutLogsDAO:
                     details=f"Update failed for user_id: {user_id}, log_date: {log_date}"
                 )
             return {
-                "matched_count": result.matched_count,
-                "modified_count": result.modified_count
+                "matched_count": matched_count,
+                "modified_count": matched_count  # updated_at always changes
             }
 
     def calculate_total_progress(self, user_id):
@@ -146,7 +272,7 @@ class DailyWorkoutLogsDAO:
                 total_results = list(db_client.db[self.collection_name].aggregate(pipeline))
                 if total_results:
                     total_progress = total_results[0]
-                    logger.debug(f"Total progress results: {total_progress}")
+                    logger.debug("Total progress results", total_progress=total_progress)
                     return {
                         "total_weight_lost": total_progress.get("total_weight_lost", 0),
                         "total_calories_burnt": total_progress.get("total_calories_burnt", 0),
@@ -165,7 +291,215 @@ class DailyWorkoutLogsDAO:
             logger.error(f"Failed to calculate total progress for user_id {user_id}: {e}")
             raise
 
+    def calculate_progress(self, user_id, start_date=None, end_date=None, granularity="day"):
+        """
+        Calculate totals and per-period progress for a user in a single aggregation.
+        :return: {"totals": {...}, "buckets": [{"period_start", ...}, ...]}
+        """
+        logger.info(f"Calculating {granularity} progress for user_id: {user_id}, from {start_date} to {end_date}")
+        pipeline = build_progress_pipeline(user_id, start_date, end_date, granularity)
+        try:
+            with self.db_client as db_client:
+                return parse_progress_result(db_client.aggregate(self.collection_name, pipeline))
+        except Exception as e:
+            logger.error(f"Failed to calculate progress for user_id {user_id}: {e}")
+            raise
+
+
+class AsyncDailyWorkoutLogsDAO:
+    """Asyncio counterpart of DailyWorkoutLogsDAO, used by the FastAPI request handlers."""
+
+    def __init__(self, db_client=None, progress_dao=None):
+        self.db_client = db_client or AsyncMongoDBClient()
+        self.collection_name = COLLECTION_NAME
+        self.progress_dao = progress_dao or AsyncUserProgressDAO(self.db_client)
+
+    async def get_log_by_user_and_date(self, user_id, log_date):
+        """Retrieve workout log by user_id and log_date."""
+        logger.info(f"Fetching workout log for user_id: {user_id}, log_date: {log_date}")
+        query = {"user_id": ObjectId(user_id), "log_date": to_log_datetime(log_date)}
+        log = await self.db_client.find_one(self.collection_name, query)
+        if log:
+            logger.debug("Workout log found", log=log)
+        else:
+            logger.warning(f"No workout log found for user_id: {user_id}, log_date: {log_date}")
+        return log
 
+    async def create_or_update_log(self, user_id, log_date, workout_content, total_weight_lost,
+                                   total_calories_burnt, avg_workout_duration):
+        """Create or update a workout log for a user."""
+        logger.info(f"Creating or updating workout log for user_id: {user_id}, log_date: {log_date}")
+
+        # Convert log_date to datetime
+        log_date = to_log_datetime(log_date)
+
+        log_data = {
+            "workout_content": workout_content,
+            "total_weight_lost": total_weight_lost,
+            "total_calories_burnt": total_calories_burnt,
+            "avg_workout_duration": avg_workout_duration,
+            "updated_at": datetime.utcnow()
+        }
+
+        # Single round trip: created_at is only written when the log is new, and the
+        # previous values come back so the progress rollup can be moved by the difference
+        inserted_id = ObjectId()
+        before = await self.db_client.find_one_and_upsert(
+            self.collection_name,
+            {"user_id": ObjectId(user_id), "log_date": log_date},
+            log_data,
+            set_on_insert={"_id": inserted_id},
+            projection=PROGRESS_PROJECTION,
+            return_document="before"
+        )
+        await self.progress_dao.apply_increments(user_id, build_progress_inc(log_date, before, log_data))
+        return upsert_result(before, inserted_id)
+
+    async def bulk_upsert_logs(self, user_id, logs):
+        """
+        Create or update many workout logs for a user with one unordered bulk_write,
+        keyed by (user_id, log_date). Each record is validated against the collection schema.
+
+        :param user_id: Owner of the logs
+        :param logs: List of dicts with log_date, workout_content, total_weight_lost,
+                     total_calories_burnt and avg_workout_duration
+        :return: One result per log: {"index", "operation": "create"|"update"|"error", ...}
+        """
+        logger.info(f"Bulk upserting {len(logs)} workout log(s) for user_id: {user_id}")
+        now = datetime.utcnow()
+        records = []
+        for log in logs:
+            query = {"user_id": ObjectId(user_id), "log_date": to_log_datetime(log["log_date"])}
+            update_fields = {
+                "workout_content": log["workout_content"],
+                "total_weight_lost": log["total_weight_lost"],
+                "total_calories_burnt": log["total_calories_burnt"],
+                "avg_workout_duration": log["avg_workout_duration"],
+                "updated_at": now
+            }
+            records.append((query, update_fields))
+
+        # bulk_write does not return previous values, so read them first (one query) to
+        # compute the rollup deltas; drift from concurrent writers is fixed by the rebuild script
+        existing = await self.db_client.find_many(
+            self.collection_name,
+            {"user_id": ObjectId(user_id), "log_date": {"$in": [query["log_date"] for query, _ in records]}},
+            projection={**PROGRESS_PROJECTION, "_id": 0}  # Index-only
+        )
+        previous = {log["log_date"]: log for log in existing}
+
+        results = await self.db_client.bulk_upsert(self.collection_name, records, schema=SCHEMA_FILENAME)
+        inc = {}
+        for result in sorted(results, key=lambda item: item["index"]):
+            if result["operation"] in ("create", "update"):
+                query, update_fields = records[result["index"]]
+                log_date = query["log_date"]
+                merge_inc(inc, build_progress_inc(log_date, previous.get(log_date), update_fields))
+                previous[log_date] = update_fields  # Repeated dates in one upload apply in order
+        await self.progress_dao.apply_increments(user_id, inc)
+        return results
+
+    async def iter_logs(self, user_id, start_date=None, end_date=None, projection=None):
+        """
+        Stream a user's workout logs in log_date order without loading them all into memory.
+
+        :param start_date: Optional first log date (inclusive)
+        :param end_date: Optional last log date (inclusive)
+        :param projection: Fields to return (defaults to all)
+        """
+        logger.info(f"Streaming workout logs for user_id: {user_id}, from {start_date} to {end_date}")
+        query = {"user_id": ObjectId(user_id)}
+        log_date_filter = build_log_date_filter(start_date, end_date)
+        if log_date_filter:
+            query["log_date"] = log_date_filter
+
+        # Served by the (user_id, log_date) unique index, so no in-memory sort
+        async for log in self.db_client.iter_many(
+                self.collection_name, query, sort=[("log_date", pymongo.ASCENDING)], projection=projection):
+            yield log
+
+    async def list_logs_page(self, user_id, start_date=None, end_date=None, after=None, limit=50,
+                             projection=None):
+        """
+        Return one page of a user's workout logs in log_date order using keyset pagination.
+
+        Pages continue from `after` (the last log_date already seen) rather than skipping,
+        so every page is a bounded seek on the (user_id, log_date) index at any depth.
+
+        :param after: log_date of the last log on the previous page (exclusive)
+        :param limit: Maximum number of logs to return
+        :param projection: Fields to return (log_date is always included)
+        """
+        logger.info(f"Listing workout logs for user_id: {user_id}, from {start_date} to {end_date}, after {after}")
+        query = {"user_id": ObjectId(user_id)}
+        log_date_filter = build_log_date_filter(start_date, end_date, after)
+        if log_date_filter:
+            query["log_date"] = log_date_filter
+        if projection is not None:
+            projection = {**projection, "log_date": 1}
+
+        return await self.db_client.find_many(
+            self.collection_name, query, sort=[("log_date", pymongo.ASCENDING)], limit=limit,
+            projection=projection
+        )
+
+    async def update_log_fields(self, user_id, log_date, update_fields):
+        """Update specific fields of a workout log."""
+        logger.info(f"Updating workout log for user_id: {user_id}, log_date: {log_date}")
+        if not isinstance(update_fields, dict) or not update_fields:
+            logger.error("update_fields must be a non-empty dictionary")
+            raise ValueError("update_fields must be a non-empty dictionary")
+
+        # Automatically add the `updated_at` timestamp
+        update_fields["updated_at"] = datetime.utcnow()
+
+        query = {"user_id": ObjectId(user_id), "log_date": to_log_datetime(log_date)}
+        update_data = {"$set": update_fields}
+
+        logger.debug("Updating workout log", query=query, update=update_data)
+
+        before = await self.db_client.find_one_and_update(self.collection_name, query, update_data,
+                                                          projection=PROGRESS_PROJECTION,
+                                                          return_document="before")
+        matched_count = 1 if before else 0
+        if matched_count > 0:
+            await self.progress_dao.apply_increments(
+                user_id, build_progress_inc(before["log_date"], before, {**before, **update_fields})
+            )
+            logger.audit_log(
+                user_id=str(user_id),
+                action="update_fields",
+                resource="daily_workout_logs",
+                status="success",
+                details=f"Updated fields for user_id {user_id}, log_date {log_date}: {update_fields}"
+            )
+        else:
+            logger.warning(f"No workout log found for user_id: {user_id}, log_date: {log_date}")
+            logger.audit_log(
+                user_id=str(user_id),
+                action="update_fields",
+                resource="daily_workout_logs",
+                status="failed",
+                details=f"Update failed for user_id: {user_id}, log_date: {log_date}"
+            )
+        return {
+            "matched_count": matched_count,
+            "modified_count": matched_count  # updated_at always changes
+        }
+
+    async def calculate_progress(self, user_id, start_date=None, end_date=None, granularity="day"):
+        """
+        Calculate totals and per-period progress for a user in a single aggregation.
+        :return: {"totals": {...}, "buckets": [{"period_start", ...}, ...]}
+        """
+        logger.info(f"Calculating {granularity} progress for user_id: {user_id}, from {start_date} to {end_date}")
+        pipeline = build_progress_pipeline(user_id, start_date, end_date, granularity)
+        try:
+            results = await self.db_client.aggregate(self.collection_name, pipeline)
+            return parse_progress_result(results)
+        except Exception as e:
+            logger.error(f"Failed to calculate progress for user_id {user_id}: {e}")
+            raise
 
 if __name__ == "__main__":
     dao = DailyWorkoutLogsDAO()
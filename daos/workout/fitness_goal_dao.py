@@ -2,29 +2,39 @@
 @Time ： 2024-11-23
 @Auth ： Adam Lyu
 """
+import copy
+import os
 from datetime import datetime
 
 import pymongo
+from pymongo import IndexModel
 from bson.objectid import ObjectId
 from daos.mongodb_client import MongoDBClient
+from daos.async_mongodb_client import AsyncMongoDBClient
+from utils.cache import create_cache
 from utils.logger import Logger
+from utils.request_context import forget, load_one
 
 # Initialize logger
 logger = Logger(__name__)
 
+# Collection definition, applied once at deploy time by scripts/bootstrap.py
+COLLECTION_NAME = 'fitness_goals'
+SCHEMA_FILENAME = 'fitness_goals_schema.json'
+INDEXES = [
+    # Ensure each user can only have one goal
+    IndexModel([("user_id", pymongo.ASCENDING)], unique=True, name="user_id_1"),
+]
+
+# Goal cache in front of get_goal_by_user_id
+GOAL_CACHE_MAXSIZE = int(os.getenv('GOAL_CACHE_MAXSIZE', 10000))
+GOAL_CACHE_TTL_SECONDS = int(os.getenv('GOAL_CACHE_TTL_SECONDS', 300))
+
 
 class FitnessGoalDAO:
     def __init__(self):
         self.db_client = MongoDBClient()
-        self.collection_name = 'fitness_goals'
-
-        # Apply JSON Schema validation rules and create indexes
-        with self.db_client as db_client:
-            logger.info(f"Initializing validation and index for collection: {self.collection_name}")
-            db_client.ensure_validation(self.collection_name, 'fitness_goals_schema.json')
-            db_client.db[self.collection_name].create_index(
-                [("user_id", pymongo.ASCENDING)], unique=True  # Ensure each user can only have one goal
-            )
+        self.collection_name = COLLECTION_NAME
 
     def get_goal_by_user_id(self, user_id, db_client=None):
         """Retrieve fitness goal information by user_id."""
@@ -35,7 +45,7 @@ class FitnessGoalDAO:
         else:
             goal = db_client.find_one(self.collection_name, {"user_id": ObjectId(user_id)})
         if goal:
-            logger.debug(f"Fitness goal found: {goal}")
+            logger.debug("Fitness goal found", goal=goal)
         else:
             logger.warning(f"No fitness goal found for user_id: {user_id}")
         return goal
@@ -45,7 +55,6 @@ class FitnessGoalDAO:
         logger.info(f"Creating or updating fitness goal for user_id: {user_id}")
         with self.db_client as db_client:
             goal_data = {
-                "user_id": ObjectId(user_id),
                 "goal": goal,
                 "days_per_week": days_per_week,
                 "workout_duration": workout_duration,
@@ -53,35 +62,17 @@ class FitnessGoalDAO:
                 "updated_at": datetime.utcnow()
             }
 
-            # Check for existing goal
-            existing_goal = self.get_goal_by_user_id(user_id, db_client)
-            if existing_goal:
-                # Update existing goal
-                result = db_client.update_one(
-                    self.collection_name,
-                    {"user_id": ObjectId(user_id)},
-                    {"$set": goal_data}
-                )
-                logger.audit_log(
-                    user_id=str(user_id),
-                    action="update",
-                    resource="fitness_goals",
-                    status="success",
-                    details=f"Updated fitness goal for user_id {user_id}"
-                )
-                return {"operation": "update", "result": result}
-            else:
-                # Create new goal
-                goal_data["created_at"] = datetime.now()
-                inserted_id = db_client.insert_one(self.collection_name, goal_data)
-                logger.audit_log(
-                    user_id=str(user_id),
-                    action="create",
-                    resource="fitness_goals",
-                    status="success",
-                    details=f"Created new fitness goal for user_id {user_id}"
-                )
-                return {"operation": "create", "inserted_id": inserted_id}
+            # Single round trip: created_at is only written when the goal is new
+            result = db_client.upsert_one(self.collection_name, {"user_id": ObjectId(user_id)}, goal_data)
+            created = result["operation"] == "create"
+            logger.audit_log(
+                user_id=str(user_id),
+                action=result["operation"],
+                resource="fitness_goals",
+                status="success",
+                details=f"{'Created new' if created else 'Updated'} fitness goal for user_id {user_id}"
+            )
+            return result
 
     def update_fitness_goal(self, user_id, update_fields):
         """Update specific fields of a user's fitness goal."""
@@ -96,7 +87,7 @@ class FitnessGoalDAO:
         query = {"user_id": ObjectId(user_id)}
         update_data = {"$set": update_fields}
 
-        logger.debug(f"Query: {query}, Update data: {update_data}")
+        logger.debug("Updating fitness goal", query=query, update=update_data)
 
         with self.db_client as db_client:
             result = db_client.update_one(self.collection_name, query, update_data)
@@ -123,6 +114,119 @@ class FitnessGoalDAO:
             }
 
 
+class AsyncFitnessGoalDAO:
+    """Asyncio counterpart of FitnessGoalDAO, used by the FastAPI request handlers."""
+
+    def __init__(self, db_client=None, cache=None):
+        self.db_client = db_client or AsyncMongoDBClient()
+        self.collection_name = COLLECTION_NAME
+        self.cache = cache or create_cache("fitness_goals", maxsize=GOAL_CACHE_MAXSIZE, ttl=GOAL_CACHE_TTL_SECONDS)
+
+    async def _load_goals(self, user_ids):
+        """
+        Batch loader for get_goal_by_user_id: cache first, then one `$in` query for the misses.
+        :return: {user_id: goal document} for the users that have a goal
+        """
+        goals, misses = {}, []
+        for user_id in user_ids:
+            goal = await self.cache.get(user_id)
+            if goal is None:
+                misses.append(user_id)
+            else:
+                goals[user_id] = goal
+
+        if misses:
+            generation = await self.cache.generation()  # A goal updated while loading is not cached
+            found = await self.db_client.find_many(
+                self.collection_name, {"user_id": {"$in": [ObjectId(user_id) for user_id in misses]}}
+            )
+            for goal in found:
+                user_id = str(goal["user_id"])
+                goals[user_id] = goal
+                await self.cache.set(user_id, goal, tags=(user_id,), generation=generation)
+        return goals
+
+    async def invalidate(self, user_id):
+        """Drop a cached goal after a write, in this request and on every worker"""
+        forget(self.collection_name)
+        await self.cache.invalidate(str(user_id))
+
+    async def get_goal_by_user_id(self, user_id):
+        """Retrieve fitness goal information by user_id (read-through cached)."""
+        logger.info(f"Fetching fitness goal by user_id: {user_id}")
+        user_id = str(ObjectId(user_id))  # Reject malformed ids before they join a batch
+        goal = await load_one(f"{self.collection_name}:user_id", user_id, self._load_goals)
+        goal = copy.deepcopy(goal)  # Callers may modify their copy
+        if goal:
+            logger.debug("Fitness goal found", goal=goal)
+        else:
+            logger.warning(f"No fitness goal found for user_id: {user_id}")
+        return goal
+
+    async def create_or_update_fitness_goal(self, user_id, goal, days_per_week, workout_duration, rest_days):
+        """Create or update a fitness goal for a user."""
+        logger.info(f"Creating or updating fitness goal for user_id: {user_id}")
+        goal_data = {
+            "goal": goal,
+            "days_per_week": days_per_week,
+            "workout_duration": workout_duration,
+            "rest_days": rest_days,
+            "updated_at": datetime.utcnow()
+        }
+
+        # Single round trip: created_at is only written when the goal is new
+        result = await self.db_client.upsert_one(self.collection_name, {"user_id": ObjectId(user_id)}, goal_data)
+        await self.invalidate(user_id)
+        created = result["operation"] == "create"
+        logger.audit_log(
+            user_id=str(user_id),
+            action=result["operation"],
+            resource="fitness_goals",
+            status="success",
+            details=f"{'Created new' if created else 'Updated'} fitness goal for user_id {user_id}"
+        )
+        return result
+
+    async def update_fitness_goal(self, user_id, update_fields):
+        """Update specific fields of a user's fitness goal."""
+        logger.info(f"Updating fitness goal for user_id: {user_id}")
+        if not isinstance(update_fields, dict) or not update_fields:
+            logger.error("update_fields must be a non-empty dictionary")
+            raise ValueError("update_fields must be a non-empty dictionary")
+
+        # Automatically add the `updated_at` timestamp
+        update_fields["updated_at"] = datetime.utcnow()
+
+        query = {"user_id": ObjectId(user_id)}
+        update_data = {"$set": update_fields}
+
+        logger.debug("Updating fitness goal", query=query, update=update_data)
+
+        result = await self.db_client.update_one(self.collection_name, query, update_data)
+        await self.invalidate(user_id)
+        if result.matched_count > 0:
+            logger.audit_log(
+                user_id=str(user_id),
+                action="update_fields",
+                resource="fitness_goals",
+                status="success",
+                details=f"Updated fields for user_id {user_id}: {update_fields}"
+            )
+        else:
+            logger.warning(f"No fitness goal found for user_id: {user_id}")
+            logger.audit_log(
+                user_id=str(user_id),
+                action="update_fields",
+                resource="fitness_goals",
+                status="failed",
+                details=f"Update failed for user_id: {user_id}"
+            )
+        return {
+            "matched_count": result.matched_count,
+            "modified_count": result.modified_count
+        }
+
+
 if __name__ == "__main__":
     # Example usage
     dao = FitnessGoalDAO()
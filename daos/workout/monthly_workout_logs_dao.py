@@ -0,0 +1,583 @@
+"""
+Monthly Workout Logs DAO
+
+Optional storage layout for workout logs, enabled with WORKOUT_LOG_STORAGE=monthly:
+one `monthly_workout_logs` document per user-month holding that month's daily entries
+(in log_date order) and their precomputed totals. Compared with one document per day,
+the (user_id, month) index gets ~30x fewer entries and a year of logs is ~12 reads.
+
+The DAOs have the same interface as the daily ones and return entries shaped like
+`daily_workout_logs` documents. Writes read the month, change it and save it back
+guarded by a version number, retrying when another writer saved the month first.
+Convert existing data with `python -m scripts.migrate_workout_log_storage`.
+
+@Date: 2026-10-16
+"""
+import os
+from contextlib import aclosing
+from datetime import datetime, timedelta
+import pymongo
+from pymongo import IndexModel
+from pymongo.errors import DuplicateKeyError
+from bson.objectid import ObjectId
+from daos.mongodb_client import MongoDBClient
+from daos.async_mongodb_client import AsyncMongoDBClient
+from daos.workout.daily_workout_logs_dao import (
+    EMPTY_PROGRESS_TOTALS, SCHEMA_FILENAME as LOG_SCHEMA_FILENAME, build_log_date_filter, build_progress_facet,
+    parse_progress_result, to_log_datetime, upsert_result
+)
+from daos.workout.user_progress_dao import (
+    UserProgressDAO, AsyncUserProgressDAO, build_progress_inc, merge_inc, month_start
+)
+from utils.logger import Logger
+
+logger = Logger(__name__)
+
+# Collection definition, applied once at deploy time by scripts/bootstrap.py
+COLLECTION_NAME = 'monthly_workout_logs'
+SCHEMA_FILENAME = 'monthly_workout_logs_schema.json'
+INDEXES = [
+    # One bucket per user per month
+    IndexModel([("user_id", pymongo.ASCENDING), ("month", pymongo.ASCENDING)],
+               unique=True, name="user_id_1_month_1"),
+]
+
+# Workout log layout used by the application: 'daily' (one document per log) or 'monthly'
+WORKOUT_LOG_STORAGE = os.getenv('WORKOUT_LOG_STORAGE', 'daily')
+# Attempts at saving a bucket before giving up on a heavily contended month
+BUCKET_WRITE_RETRIES = int(os.getenv('BUCKET_WRITE_RETRIES', 5))
+
+LOG_FIELDS = ("workout_content", "total_weight_lost", "total_calories_burnt", "avg_workout_duration")
+_NOT_LOADED = object()
+
+
+def new_bucket(user_id, month):
+    """Empty bucket for a user-month (not yet stored)"""
+    return {
+        "_id": ObjectId(),
+        "user_id": ObjectId(user_id),
+        "month": month,
+        "days": [],
+        "totals": dict(EMPTY_PROGRESS_TOTALS),
+        "version": 0,
+    }
+
+
+def compute_totals(days):
+    """Month totals over a bucket's daily entries"""
+    return {
+        "total_weight_lost": float(sum(day.get("total_weight_lost") or 0 for day in days)),
+        "total_calories_burnt": float(sum(day.get("total_calories_burnt") or 0 for day in days)),
+        "total_duration": sum(day.get("avg_workout_duration") or 0 for day in days),
+        "total_sessions": len(days),
+    }
+
+
+def build_bucket(user_id, month, logs):
+    """
+    Build a complete bucket from daily log documents (used by the migration).
+    Entries keep their `_id`, so log ids survive a change of layout.
+    """
+    bucket = new_bucket(user_id, month)
+    bucket["days"] = sorted(
+        ({key: value for key, value in log.items() if key not in ("user_id", "is_deleted")} for log in logs),
+        key=lambda day: day["log_date"]
+    )
+    bucket["totals"] = compute_totals(bucket["days"])
+    return bucket
+
+
+def set_entry(bucket, log_date, fields, now, create=True):
+    """
+    Create or update the entry for log_date in a bucket, then recompute the month totals.
+    :param fields: Log fields to set
+    :param create: If False, a missing entry is left missing
+    :return: (entry before the change or None, entry after the change), or None if nothing changed
+    """
+    days = bucket["days"]
+    for position, day in enumerate(days):
+        if day["log_date"] == log_date:
+            entry = {**day, **fields, "updated_at": now}
+            days[position] = entry
+            bucket["totals"] = compute_totals(days)
+            return day, entry
+    if not create:
+        return None
+
+    entry = {"_id": ObjectId(), "log_date": log_date, **fields, "created_at": now, "updated_at": now}
+    days.append(entry)
+    days.sort(key=lambda day: day["log_date"])
+    bucket["totals"] = compute_totals(days)
+    return None, entry
+
+
+def to_log(user_id, entry, projection=None):
+    """
+    Shape a bucket entry like a `daily_workout_logs` document.
+    :param projection: Optional inclusion projection ({field: 1}; `_id` unless set to 0)
+    """
+    log = {**entry, "user_id": user_id, "is_deleted": False}
+    if projection:
+        log = {key: value for key, value in log.items() if projection.get(key, key == "_id")}
+    return log
+
+
+def bucket_projection(projection=None):
+    """Project buckets down to the entry fields a log projection needs"""
+    if not projection:
+        return None
+    fields = {"user_id": 1, "month": 1, "days.log_date": 1}
+    if projection.get("_id", 1):
+        fields["days._id"] = 1
+    for key, value in projection.items():
+        if value and key not in ("_id", "user_id", "is_deleted"):
+            fields[f"days.{key}"] = 1
+    return fields
+
+
+def build_month_filter(start_date=None, end_date=None, after=None):
+    """
+    Build the month range condition covering a log_date range (see build_log_date_filter).
+    :return: Condition dict for the month field, or None when unbounded
+    """
+    lower = [month_start(to_log_datetime(start_date))] if start_date else []
+    if after:
+        lower.append(month_start(after))
+    condition = {}
+    if lower:
+        condition["$gte"] = max(lower)
+    if end_date:
+        condition["$lte"] = month_start(to_log_datetime(end_date))
+    return condition or None
+
+
+def matches_log_date(log_date, condition):
+    """Evaluate a build_log_date_filter condition against one log_date"""
+    if not condition:
+        return True
+    return (("$gte" not in condition or log_date >= condition["$gte"])
+            and ("$lte" not in condition or log_date <= condition["$lte"])
+            and ("$gt" not in condition or log_date > condition["$gt"]))
+
+
+def covers_whole_months(start_date=None, end_date=None):
+    """True if a date range starts and ends on month boundaries (or is open)"""
+    if start_date and to_log_datetime(start_date).day != 1:
+        return False
+    if end_date and (to_log_datetime(end_date) + timedelta(days=1)).day != 1:
+        return False
+    return True
+
+
+def build_bucket_progress_pipeline(user_id, start_date=None, end_date=None, granularity="day"):
+    """Same output as build_progress_pipeline, computed from the monthly buckets"""
+    facet = build_progress_facet(granularity)
+    match = {"user_id": ObjectId(user_id), "is_deleted": False}
+    month_filter = build_month_filter(start_date, end_date)
+    if month_filter:
+        match["month"] = month_filter
+
+    pipeline = [{"$match": match}, {"$unwind": "$days"}, {"$replaceRoot": {"newRoot": "$days"}}]
+    log_date_filter = build_log_date_filter(start_date, end_date)
+    if log_date_filter:
+        pipeline.append({"$match": {"log_date": log_date_filter}})
+    pipeline.append(facet)
+    return pipeline
+
+
+def progress_from_totals(buckets):
+    """Monthly progress straight from the buckets' precomputed totals (no $unwind)"""
+    totals = dict(EMPTY_PROGRESS_TOTALS)
+    rows = []
+    for bucket in buckets:
+        month_totals = bucket["totals"]
+        for key in totals:
+            totals[key] += month_totals.get(key, 0)
+        rows.append({
+            "period_start": bucket["month"],
+            "total_workout_time": month_totals["total_duration"],
+            "total_calories_burnt": month_totals["total_calories_burnt"],
+            "total_weight_lost": month_totals["total_weight_lost"],
+            "sessions": month_totals["total_sessions"]
+        })
+    return {"totals": totals, "buckets": rows}
+
+
+def bucket_save_update(bucket, now):
+    """Update writing a changed bucket back (applied only if its version is unchanged)"""
+    return {
+        "$set": {"days": bucket["days"], "totals": bucket["totals"], "updated_at": now},
+        "$inc": {"version": 1}
+    }
+
+
+def bulk_results(records, changes):
+    """Map (record index, (before, entry)) changes onto per-record bulk results"""
+    for index, (before, entry) in changes:
+        if before is None:
+            records[index].update(operation="create", inserted_id=entry["_id"])
+        else:
+            records[index].update(operation="update")
+
+
+def log_audit_update(user_id, log_date, update_fields, updated):
+    """Audit a field update the same way the daily DAOs do"""
+    if updated:
+        logger.audit_log(
+            user_id=str(user_id),
+            action="update_fields",
+            resource="daily_workout_logs",
+            status="success",
+            details=f"Updated fields for user_id {user_id}, log_date {log_date}: {update_fields}"
+        )
+    else:
+        logger.warning(f"No workout log found for user_id: {user_id}, log_date: {log_date}")
+        logger.audit_log(
+            user_id=str(user_id),
+            action="update_fields",
+            resource="daily_workout_logs",
+            status="failed",
+            details=f"Update failed for user_id: {user_id}, log_date: {log_date}"
+        )
+
+
+class MonthlyWorkoutLogsDAO:
+    def __init__(self, progress_dao=None):
+        self.db_client = MongoDBClient()
+        self.collection_name = COLLECTION_NAME
+        self.progress_dao = progress_dao or UserProgressDAO()
+
+    def _write_bucket(self, db_client, user_id, month, modify):
+        """
+        Read-modify-write one bucket, retrying if another writer saved it in between.
+        :param modify: fn(bucket) changing it in place and returning a list of
+                       (before, entry) changes; nothing is written when it is empty
+        :return: The changes
+        """
+        for _ in range(BUCKET_WRITE_RETRIES):
+            bucket = db_client.find_one(self.collection_name, {"user_id": ObjectId(user_id), "month": month})
+            is_new = bucket is None
+            bucket = bucket or new_bucket(user_id, month)
+            version = bucket["version"]
+            changes = modify(bucket)
+            if not changes:
+                return changes
+
+            now = datetime.utcnow()
+            if is_new:
+                try:
+                    db_client.insert_one(self.collection_name,
+                                         {**bucket, "version": 1, "created_at": now, "updated_at": now})
+                    return changes
+                except DuplicateKeyError:
+                    continue
+            result = db_client.update_one(self.collection_name, {"_id": bucket["_id"], "version": version},
+                                          bucket_save_update(bucket, now))
+            if result.matched_count:
+                return changes
+        raise RuntimeError(f"Could not save workout logs of user {user_id} for {month:%Y-%m}: too many concurrent writes")
+
+    def get_log_by_user_and_date(self, user_id, log_date, db_client=None):
+        """Retrieve workout log by user_id and log_date."""
+        logger.info(f"Fetching workout log for user_id: {user_id}, log_date: {log_date}")
+        log_date = to_log_datetime(log_date)
+        query = {"user_id": ObjectId(user_id), "month": month_start(log_date)}
+        projection = {"user_id": 1, "days": {"$elemMatch": {"log_date": log_date}}}
+        if db_client is None:
+            with self.db_client as db_client:
+                bucket = db_client.find_one(self.collection_name, query, projection=projection)
+        else:
+            bucket = db_client.find_one(self.collection_name, query, projection=projection)
+        if bucket and bucket.get("days"):
+            return to_log(bucket["user_id"], bucket["days"][0])
+        logger.warning(f"No workout log found for user_id: {user_id}, log_date: {log_date}")
+        return None
+
+    def create_or_update_log(self, user_id, log_date, workout_content, total_weight_lost, total_calories_burnt,
+                             avg_workout_duration):
+        """Create or update a workout log for a user."""
+        logger.info(f"Creating or updating workout log for user_id: {user_id}, log_date: {log_date}")
+        log_date = to_log_datetime(log_date)
+        fields = {
+            "workout_content": workout_content,
+            "total_weight_lost": total_weight_lost,
+            "total_calories_burnt": total_calories_burnt,
+            "avg_workout_duration": avg_workout_duration,
+        }
+
+        with self.db_client as db_client:
+            [(before, entry)] = self._write_bucket(
+                db_client, user_id, month_start(log_date),
+                lambda bucket: [set_entry(bucket, log_date, fields, datetime.utcnow())]
+            )
+            self.progress_dao.apply_increments(user_id, build_progress_inc(log_date, before, entry),
+                                               db_client=db_client)
+            return upsert_result(before, entry["_id"])
+
+    def update_log_fields(self, user_id, log_date, update_fields):
+        """Update specific fields of a workout log."""
+        logger.info(f"Updating workout log for user_id: {user_id}, log_date: {log_date}")
+        if not isinstance(update_fields, dict) or not update_fields:
+            logger.error("update_fields must be a non-empty dictionary")
+            raise ValueError("update_fields must be a non-empty dictionary")
+        log_date = to_log_datetime(log_date)
+
+        def modify(bucket):
+            change = set_entry(bucket, log_date, update_fields, datetime.utcnow(), create=False)
+            return [change] if change else []
+
+        with self.db_client as db_client:
+            changes = self._write_bucket(db_client, user_id, month_start(log_date), modify)
+            for before, entry in changes:
+                self.progress_dao.apply_increments(user_id, build_progress_inc(log_date, before, entry),
+                                                   db_client=db_client)
+        log_audit_update(user_id, log_date, update_fields, bool(changes))
+        return {"matched_count": len(changes), "modified_count": len(changes)}
+
+    def calculate_total_progress(self, user_id):
+        """Calculate overall progress for a user."""
+        return self.calculate_progress(user_id, granularity="month")["totals"]
+
+    def calculate_progress(self, user_id, start_date=None, end_date=None, granularity="day"):
+        """
+        Calculate totals and per-period progress for a user.
+        :return: {"totals": {...}, "buckets": [{"period_start", ...}, ...]}
+        """
+        logger.info(f"Calculating {granularity} progress for user_id: {user_id}, from {start_date} to {end_date}")
+        try:
+            with self.db_client as db_client:
+                if granularity == "month" and covers_whole_months(start_date, end_date):
+                    query = {"user_id": ObjectId(user_id)}
+                    month_filter = build_month_filter(start_date, end_date)
+                    if month_filter:
+                        query["month"] = month_filter
+                    return progress_from_totals(db_client.find_many(
+                        self.collection_name, query, sort=[("month", pymongo.ASCENDING)],
+                        projection={"month": 1, "totals": 1}
+                    ))
+                pipeline = build_bucket_progress_pipeline(user_id, start_date, end_date, granularity)
+                return parse_progress_result(db_client.aggregate(self.collection_name, pipeline))
+        except Exception as e:
+            logger.error(f"Failed to calculate progress for user_id {user_id}: {e}")
+            raise
+
+
+class AsyncMonthlyWorkoutLogsDAO:
+    """Asyncio counterpart of MonthlyWorkoutLogsDAO, used by the FastAPI request handlers."""
+
+    def __init__(self, db_client=None, progress_dao=None):
+        self.db_client = db_client or AsyncMongoDBClient()
+        self.collection_name = COLLECTION_NAME
+        self.progress_dao = progress_dao or AsyncUserProgressDAO(self.db_client)
+
+    async def _write_bucket(self, user_id, month, modify, bucket=_NOT_LOADED):
+        """
+        Read-modify-write one bucket, retrying if another writer saved it in between.
+        :param modify: fn(bucket) changing it in place and returning a list of
+                       (before, entry) changes; nothing is written when it is empty
+        :param bucket: The bucket if the caller already read it (None if it does not exist)
+        :return: The changes
+        """
+        for _ in range(BUCKET_WRITE_RETRIES):
+            if bucket is _NOT_LOADED:
+                bucket = await self.db_client.find_one(self.collection_name,
+                                                       {"user_id": ObjectId(user_id), "month": month})
+            is_new = bucket is None
+            bucket = bucket or new_bucket(user_id, month)
+            version = bucket["version"]
+            changes = modify(bucket)
+            if not changes:
+                return changes
+
+            now = datetime.utcnow()
+            if is_new:
+                try:
+                    await self.db_client.insert_one(self.collection_name,
+                                                    {**bucket, "version": 1, "created_at": now, "updated_at": now})
+                    return changes
+                except DuplicateKeyError:
+                    bucket = _NOT_LOADED
+                    continue
+            result = await self.db_client.update_one(self.collection_name,
+                                                     {"_id": bucket["_id"], "version": version},
+                                                     bucket_save_update(bucket, now))
+            if result.matched_count:
+                return changes
+            bucket = _NOT_LOADED
+        raise RuntimeError(f"Could not save workout logs of user {user_id} for {month:%Y-%m}: too many concurrent writes")
+
+    async def get_log_by_user_and_date(self, user_id, log_date):
+        """Retrieve workout log by user_id and log_date."""
+        logger.info(f"Fetching workout log for user_id: {user_id}, log_date: {log_date}")
+        log_date = to_log_datetime(log_date)
+        bucket = await self.db_client.find_one(
+            self.collection_name, {"user_id": ObjectId(user_id), "month": month_start(log_date)},
+            projection={"user_id": 1, "days": {"$elemMatch": {"log_date": log_date}}}
+        )
+        if bucket and bucket.get("days"):
+            return to_log(bucket["user_id"], bucket["days"][0])
+        logger.warning(f"No workout log found for user_id: {user_id}, log_date: {log_date}")
+        return None
+
+    async def create_or_update_log(self, user_id, log_date, workout_content, total_weight_lost,
+                                   total_calories_burnt, avg_workout_duration):
+        """Create or update a workout log for a user."""
+        logger.info(f"Creating or updating workout log for user_id: {user_id}, log_date: {log_date}")
+        log_date = to_log_datetime(log_date)
+        fields = {
+            "workout_content": workout_content,
+            "total_weight_lost": total_weight_lost,
+            "total_calories_burnt": total_calories_burnt,
+            "avg_workout_duration": avg_workout_duration,
+        }
+
+        [(before, entry)] = await self._write_bucket(
+            user_id, month_start(log_date), lambda bucket: [set_entry(bucket, log_date, fields, datetime.utcnow())]
+        )
+        await self.progress_dao.apply_increments(user_id, build_progress_inc(log_date, before, entry))
+        return upsert_result(before, entry["_id"])
+
+    async def bulk_upsert_logs(self, user_id, logs):
+        """
+        Create or update many workout logs for a user: one query reads every month they
+        fall in, then each month is written once. Each record is validated against the
+        daily log schema.
+
+        :param user_id: Owner of the logs
+        :param logs: List of dicts with log_date, workout_content, total_weight_lost,
+                     total_calories_burnt and avg_workout_duration
+        :return: One result per log: {"index", "operation": "create"|"update"|"error", ...}
+        """
+        logger.info(f"Bulk upserting {len(logs)} workout log(s) for user_id: {user_id}")
+        now = datetime.utcnow()
+        results, months = [], {}
+        for index, log in enumerate(logs):
+            results.append({"index": index, "operation": None})
+            try:
+                log_date = to_log_datetime(log["log_date"])
+                fields = {field: log[field] for field in LOG_FIELDS}
+                self.db_client.validate_data(
+                    {"user_id": ObjectId(user_id), "log_date": log_date, **fields, "created_at": now},
+                    LOG_SCHEMA_FILENAME
+                )
+            except ValueError as e:
+                results[index].update(operation="error", error=str(e))
+                continue
+            months.setdefault(month_start(log_date), []).append((index, log_date, fields))
+
+        buckets = {}
+        if months:
+            existing = await self.db_client.find_many(
+                self.collection_name, {"user_id": ObjectId(user_id), "month": {"$in": list(months)}}
+            )
+            buckets = {bucket["month"]: bucket for bucket in existing}
+
+        inc = {}
+        for month, records in months.items():
+            def modify(bucket, records=records):
+                # Repeated dates in one upload apply in order
+                return [(index, set_entry(bucket, log_date, fields, now)) for index, log_date, fields in records]
+
+            try:
+                changes = await self._write_bucket(user_id, month, modify, bucket=buckets.get(month))
+            except RuntimeError as e:
+                for index, _, _ in records:
+                    results[index].update(operation="error", error=str(e))
+                continue
+            bulk_results(results, changes)
+            for _, (before, entry) in changes:
+                merge_inc(inc, build_progress_inc(entry["log_date"], before, entry))
+        await self.progress_dao.apply_increments(user_id, inc)
+        return results
+
+    async def _iter_entries(self, user_id, start_date=None, end_date=None, after=None, projection=None):
+        """Stream a user's entries in log_date order, reading only the months in range"""
+        query = {"user_id": ObjectId(user_id)}
+        month_filter = build_month_filter(start_date, end_date, after)
+        if month_filter:
+            query["month"] = month_filter
+        log_date_filter = build_log_date_filter(start_date, end_date, after)
+
+        async with aclosing(self.db_client.iter_many(
+                self.collection_name, query, sort=[("month", pymongo.ASCENDING)],
+                projection=bucket_projection(projection))) as buckets:
+            async for bucket in buckets:
+                for entry in bucket.get("days", []):
+                    if matches_log_date(entry["log_date"], log_date_filter):
+                        yield to_log(bucket["user_id"], entry, projection)
+
+    async def iter_logs(self, user_id, start_date=None, end_date=None, projection=None):
+        """
+        Stream a user's workout logs in log_date order without loading them all into memory.
+
+        :param start_date: Optional first log date (inclusive)
+        :param end_date: Optional last log date (inclusive)
+        :param projection: Fields to return (defaults to all)
+        """
+        logger.info(f"Streaming workout logs for user_id: {user_id}, from {start_date} to {end_date}")
+        async with aclosing(self._iter_entries(user_id, start_date, end_date, projection=projection)) as logs:
+            async for log in logs:
+                yield log
+
+    async def list_logs_page(self, user_id, start_date=None, end_date=None, after=None, limit=50,
+                             projection=None):
+        """
+        Return one page of a user's workout logs in log_date order, continuing after the
+        log_date `after` (exclusive). Only the months from `after` onwards are read.
+
+        :param limit: Maximum number of logs to return
+        :param projection: Fields to return (log_date is always included)
+        """
+        logger.info(f"Listing workout logs for user_id: {user_id}, from {start_date} to {end_date}, after {after}")
+        if projection is not None:
+            projection = {**projection, "log_date": 1}
+
+        page = []
+        async with aclosing(self._iter_entries(user_id, start_date, end_date, after, projection)) as logs:
+            async for log in logs:
+                page.append(log)
+                if limit and len(page) >= limit:
+                    break
+        return page
+
+    async def update_log_fields(self, user_id, log_date, update_fields):
+        """Update specific fields of a workout log."""
+        logger.info(f"Updating workout log for user_id: {user_id}, log_date: {log_date}")
+        if not isinstance(update_fields, dict) or not update_fields:
+            logger.error("update_fields must be a non-empty dictionary")
+            raise ValueError("update_fields must be a non-empty dictionary")
+        log_date = to_log_datetime(log_date)
+
+        def modify(bucket):
+            change = set_entry(bucket, log_date, update_fields, datetime.utcnow(), create=False)
+            return [change] if change else []
+
+        changes = await self._write_bucket(user_id, month_start(log_date), modify)
+        for before, entry in changes:
+            await self.progress_dao.apply_increments(user_id, build_progress_inc(log_date, before, entry))
+        log_audit_update(user_id, log_date, update_fields, bool(changes))
+        return {"matched_count": len(changes), "modified_count": len(changes)}
+
+    async def calculate_progress(self, user_id, start_date=None, end_date=None, granularity="day"):
+        """
+        Calculate totals and per-period progress for a user. Monthly progress over whole
+        months is read from the precomputed bucket totals.
+        :return: {"totals": {...}, "buckets": [{"period_start", ...}, ...]}
+        """
+        logger.info(f"Calculating {granularity} progress for user_id: {user_id}, from {start_date} to {end_date}")
+        try:
+            if granularity == "month" and covers_whole_months(start_date, end_date):
+                query = {"user_id": ObjectId(user_id)}
+                month_filter = build_month_filter(start_date, end_date)
+                if month_filter:
+                    query["month"] = month_filter
+                return progress_from_totals(await self.db_client.find_many(
+                    self.collection_name, query, sort=[("month", pymongo.ASCENDING)],
+                    projection={"month": 1, "totals": 1}
+                ))
+            pipeline = build_bucket_progress_pipeline(user_id, start_date, end_date, granularity)
+            return parse_progress_result(await self.db_client.aggregate(self.collection_name, pipeline))
+        except Exception as e:
+            logger.error(f"Failed to calculate progress for user_id {user_id}: {e}")
+            raise
+
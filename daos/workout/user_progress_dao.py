@@ -0,0 +1,241 @@
+"""
+User Progress Rollup DAO
+
+Keeps one `user_progress` document per user with running totals and per-day /
+per-week / per-month buckets, updated with $inc deltas whenever a workout log is
+written, so reading a user's progress is a single document fetch.
+
+@Date: 2026-10-16
+"""
+import os
+from datetime import datetime, timedelta
+import pymongo
+from pymongo import IndexModel
+from bson.objectid import ObjectId
+from daos.mongodb_client import MongoDBClient
+from daos.async_mongodb_client import AsyncMongoDBClient
+from utils.cache import create_cache
+from utils.logger import Logger
+
+logger = Logger(__name__)
+
+# Collection definition, applied once at deploy time by scripts/bootstrap.py
+COLLECTION_NAME = 'user_progress'
+SCHEMA_FILENAME = 'user_progress_schema.json'
+INDEXES = [
+    # One rollup document per user
+    IndexModel([("user_id", pymongo.ASCENDING)], unique=True, name="user_id_1"),
+]
+
+# Rollup cache in front of get_progress (dropped on every log write)
+PROGRESS_CACHE_MAXSIZE = int(os.getenv('PROGRESS_CACHE_MAXSIZE', 10000))
+PROGRESS_CACHE_TTL_SECONDS = int(os.getenv('PROGRESS_CACHE_TTL_SECONDS', 300))
+
+# Rollup bucket maps by progress granularity
+BUCKET_FIELDS = {"day": "days", "week": "weeks", "month": "months"}
+
+# log field -> (totals field, bucket field)
+LOG_METRICS = {
+    "total_weight_lost": ("total_weight_lost", "total_weight_lost"),
+    "total_calories_burnt": ("total_calories_burnt", "total_calories_burnt"),
+    "avg_workout_duration": ("total_duration", "total_workout_time"),
+}
+# Log fields needed to compute a delta
+PROGRESS_PROJECTION = {"log_date": 1, "is_deleted": 1, **{field: 1 for field in LOG_METRICS}}
+
+
+def week_start(log_date):
+    """Monday of the week containing log_date"""
+    return datetime(log_date.year, log_date.month, log_date.day) - timedelta(days=log_date.weekday())
+
+
+def month_start(log_date):
+    """First day of the month containing log_date"""
+    return datetime(log_date.year, log_date.month, 1)
+
+
+def bucket_keys(log_date):
+    """Return the (day, week, month) bucket keys of a log date"""
+    day = datetime(log_date.year, log_date.month, log_date.day)
+    return tuple(start.strftime("%Y-%m-%d") for start in (day, week_start(log_date), month_start(log_date)))
+
+
+def _counted(log):
+    """A log contributes to the rollup unless it is missing or soft-deleted"""
+    return log is not None and not log.get("is_deleted", False)
+
+
+def build_progress_inc(log_date, old_log=None, new_log=None):
+    """
+    Build the $inc document that moves the rollup from old_log to new_log.
+
+    :param log_date: Date of the log (both versions share it)
+    :param old_log: Log before the write (None if it was created)
+    :param new_log: Log after the write (None if it was removed)
+    :return: $inc field paths -> deltas (empty if nothing changed)
+    """
+    old_counted, new_counted = _counted(old_log), _counted(new_log)
+    day_key, week_key, month_key = bucket_keys(log_date)
+    bucket_prefixes = (f"days.{day_key}.", f"weeks.{week_key}.", f"months.{month_key}.")
+
+    inc = {}
+    for log_field, (total_field, bucket_field) in LOG_METRICS.items():
+        old_value = (old_log.get(log_field) or 0) if old_counted else 0
+        new_value = (new_log.get(log_field) or 0) if new_counted else 0
+        delta = new_value - old_value
+        if delta:
+            inc[f"totals.{total_field}"] = delta
+            for prefix in bucket_prefixes:
+                inc[f"{prefix}{bucket_field}"] = delta
+
+    session_delta = int(new_counted) - int(old_counted)
+    if session_delta:
+        inc["totals.total_sessions"] = session_delta
+        for prefix in bucket_prefixes:
+            inc[f"{prefix}sessions"] = session_delta
+    return inc
+
+
+def merge_inc(target, inc):
+    """Add the deltas of inc into target (in place) and return it"""
+    for path, delta in inc.items():
+        target[path] = target.get(path, 0) + delta
+    return target
+
+
+def build_rollup(logs):
+    """
+    Recompute the rollup fields from raw logs.
+    :param logs: Iterable of workout log documents
+    :return: {"totals": {...}, "days": {...}, "weeks": {...}, "months": {...}}
+    """
+    rollup = {"totals": {}, "days": {}, "weeks": {}, "months": {}}
+    for log in logs:
+        for path, delta in build_progress_inc(log["log_date"], None, log).items():
+            *parents, leaf = path.split(".")
+            node = rollup
+            for parent in parents:
+                node = node.setdefault(parent, {})
+            node[leaf] = node.get(leaf, 0) + delta
+    return rollup
+
+
+def parse_rollup(document, granularity):
+    """
+    Shape a rollup document like the aggregation result of the daily logs DAO.
+    :param granularity: 'day', 'week' or 'month'
+    :return: {"totals": {...}, "buckets": [{"period_start", ...}, ...]}
+    """
+    document = document or {}
+    totals = document.get("totals", {})
+    buckets = [
+        {
+            "period_start": datetime.strptime(key, "%Y-%m-%d"),
+            "total_workout_time": round(bucket.get("total_workout_time", 0), 4),
+            "total_calories_burnt": round(bucket.get("total_calories_burnt", 0), 4),
+            "total_weight_lost": round(bucket.get("total_weight_lost", 0), 4),
+            "sessions": bucket.get("sessions", 0)
+        }
+        for key, bucket in sorted(document.get(BUCKET_FIELDS[granularity], {}).items())
+        if bucket.get("sessions", 0) > 0
+    ]
+    return {
+        "totals": {
+            # $inc on doubles accumulates float noise; the rebuild command resets it
+            "total_weight_lost": round(totals.get("total_weight_lost", 0), 4),
+            "total_calories_burnt": round(totals.get("total_calories_burnt", 0), 4),
+            "total_duration": totals.get("total_duration", 0),
+            "total_sessions": totals.get("total_sessions", 0),
+        },
+        "buckets": buckets
+    }
+
+
+def _inc_update(inc):
+    return {
+        "$inc": inc,
+        "$set": {"updated_at": datetime.utcnow()},
+        "$setOnInsert": {"created_at": datetime.utcnow()}
+    }
+
+
+def _replace_update(rollup):
+    return {
+        "$set": {**rollup, "updated_at": datetime.utcnow()},
+        "$setOnInsert": {"created_at": datetime.utcnow()}
+    }
+
+
+class UserProgressDAO:
+    def __init__(self):
+        self.db_client = MongoDBClient()
+        self.collection_name = COLLECTION_NAME
+
+    def apply_increments(self, user_id, inc, db_client=None):
+        """
+        Apply $inc deltas to a user's rollup, creating it if needed.
+        :param inc: Field paths -> deltas, from build_progress_inc / merge_inc
+        """
+        if not inc:
+            return
+        logger.debug("Applying progress deltas", user_id=user_id, inc=inc)
+        if db_client is None:
+            with self.db_client as db_client:
+                db_client.update_one(self.collection_name, {"user_id": ObjectId(user_id)}, _inc_update(inc),
+                                     upsert=True)
+        else:
+            db_client.update_one(self.collection_name, {"user_id": ObjectId(user_id)}, _inc_update(inc),
+                                 upsert=True)
+
+    def get_progress(self, user_id, granularity="week"):
+        """Read a user's rollup, shaped as {"totals", "buckets"}"""
+        logger.info(f"Fetching progress rollup for user_id: {user_id}")
+        with self.db_client as db_client:
+            document = db_client.find_one(self.collection_name, {"user_id": ObjectId(user_id)},
+                                          include_deleted=True,  # Rollups are never soft-deleted
+                                          projection={BUCKET_FIELDS[granularity]: 1, "totals": 1})
+        return parse_rollup(document, granularity)
+
+    def replace_progress(self, user_id, rollup, db_client=None):
+        """Overwrite a user's rollup with freshly computed values (see build_rollup)"""
+        logger.info(f"Replacing progress rollup for user_id: {user_id}")
+        if db_client is None:
+            with self.db_client as db_client:
+                db_client.update_one(self.collection_name, {"user_id": ObjectId(user_id)},
+                                     _replace_update(rollup), upsert=True)
+        else:
+            db_client.update_one(self.collection_name, {"user_id": ObjectId(user_id)},
+                                 _replace_update(rollup), upsert=True)
+
+
+class AsyncUserProgressDAO:
+    """Asyncio counterpart of UserProgressDAO, used by the FastAPI request handlers."""
+
+    def __init__(self, db_client=None, cache=None):
+        self.db_client = db_client or AsyncMongoDBClient()
+        self.collection_name = COLLECTION_NAME
+        self.cache = cache or create_cache("user_progress", maxsize=PROGRESS_CACHE_MAXSIZE,
+                                           ttl=PROGRESS_CACHE_TTL_SECONDS)
+
+    async def apply_increments(self, user_id, inc):
+        """
+        Apply $inc deltas to a user's rollup, creating it if needed.
+        :param inc: Field paths -> deltas, from build_progress_inc / merge_inc
+        """
+        if not inc:
+            return
+        logger.debug("Applying progress deltas", user_id=user_id, inc=inc)
+        await self.db_client.update_one(self.collection_name, {"user_id": ObjectId(user_id)}, _inc_update(inc),
+                                        upsert=True)
+        await self.cache.invalidate(str(user_id))
+
+    async def get_progress(self, user_id, granularity="week"):
+        """Read a user's rollup (read-through cached), shaped as {"totals", "buckets"}"""
+        logger.info(f"Fetching progress rollup for user_id: {user_id}")
+        document = await self.cache.get(str(user_id))
+        if document is None:
+            generation = await self.cache.generation()  # A log written while loading is not missed
+            document = await self.db_client.find_one(self.collection_name, {"user_id": ObjectId(user_id)},
+                                                      include_deleted=True)  # Rollups are never soft-deleted
+            await self.cache.set(str(user_id), document, tags=(str(user_id),), generation=generation)
+        return parse_rollup(document, granularity)
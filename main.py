@@ -1,8 +1,26 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from api import router as api_router  # Import the top-level router object from the API
+from services.container import ServiceContainer
+from utils.http_metrics import MetricsMiddleware
+from utils.metrics import metrics_registry
+from utils.request_context import RequestContextMiddleware
+from utils.tracing import TracingMiddleware
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Build DAOs and services once per process; handlers get them through Depends
+    container = ServiceContainer()
+    await container.startup()
+    app.state.container = container
+    yield
+    await container.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # CORS configuration
 origins = [
@@ -18,6 +36,15 @@ app.add_middleware(
     allow_headers=["*"],    # Allow all headers (e.g., Content-Type, Authorization)
 )
 
+# Per-request identity map used by the DAOs to deduplicate and batch lookups
+app.add_middleware(RequestContextMiddleware)
+
+# Span tree per request, returned as a Server-Timing header (and sampled into the logs)
+app.add_middleware(TracingMiddleware)
+
+# Request count / status / latency per route template, rendered by /metrics (added last: outermost)
+app.add_middleware(MetricsMiddleware)
+
 # Register API routes with "/api" prefix
 app.include_router(api_router, prefix="/api")
 
@@ -25,3 +52,8 @@ app.include_router(api_router, prefix="/api")
 async def root():
     return {"message": "Welcome to the 5300 API"}
 
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    # Prometheus text exposition format
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
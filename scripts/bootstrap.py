@@ -0,0 +1,52 @@
+"""
+Database Bootstrap
+
+Creates every collection and index once at deploy time, so the application never
+issues DDL on startup or on the request path.
+
+Usage:
+    python -m scripts.bootstrap
+
+@Date: 2026-10-16
+"""
+from daos.mongodb_client import MongoDBClient
+from daos.audit import audit_logs_dao
+from daos.schema_registry import schema_registry
+from daos.user import token_denylist, users_dao
+from daos.workout import daily_workout_logs_dao, fitness_goal_dao, monthly_workout_logs_dao, user_progress_dao
+from utils.logger import Logger
+
+logger = Logger(__name__)
+
+# (collection name, schema file, index models)
+COLLECTIONS = [
+    (users_dao.COLLECTION_NAME, users_dao.SCHEMA_FILENAME, users_dao.INDEXES),
+    (token_denylist.COLLECTION_NAME, token_denylist.SCHEMA_FILENAME, token_denylist.INDEXES),
+    (daily_workout_logs_dao.COLLECTION_NAME, daily_workout_logs_dao.SCHEMA_FILENAME, daily_workout_logs_dao.INDEXES),
+    (monthly_workout_logs_dao.COLLECTION_NAME, monthly_workout_logs_dao.SCHEMA_FILENAME,
+     monthly_workout_logs_dao.INDEXES),
+    (fitness_goal_dao.COLLECTION_NAME, fitness_goal_dao.SCHEMA_FILENAME, fitness_goal_dao.INDEXES),
+    (user_progress_dao.COLLECTION_NAME, user_progress_dao.SCHEMA_FILENAME, user_progress_dao.INDEXES),
+    (audit_logs_dao.COLLECTION_NAME, audit_logs_dao.SCHEMA_FILENAME, audit_logs_dao.INDEXES),
+]
+
+
+def bootstrap(db_client=None):
+    """
+    Create collections and indexes. Safe to run repeatedly.
+    :param db_client: Optional MongoDBClient to use
+    """
+    # Fail before touching the database if any schema file is invalid
+    logger.info(f"Schemas available: {schema_registry.names()}")
+
+    with (db_client or MongoDBClient()) as db_client:
+        for collection_name, schema_filename, indexes in COLLECTIONS:
+            db_client.ensure_validation(collection_name, schema_filename)
+            if indexes:
+                names = db_client.db[collection_name].create_indexes(indexes)
+                logger.info(f"Indexes ensured on '{collection_name}': {names}")
+    logger.info("Database bootstrap completed.")
+
+
+if __name__ == "__main__":
+    bootstrap()
@@ -0,0 +1,163 @@
+"""
+Index Advisor
+
+Runs explain() on every query shape the DAOs issue and flags plans that scan the
+collection (COLLSCAN), sort in memory (SORT) or fetch documents (FETCH) although the
+query is meant to be answered from an index alone. The shapes below mirror the DAO
+code, including the `is_deleted: False` the Mongo clients append to reads.
+
+Run it after `python -m scripts.bootstrap` against a database with representative data:
+
+Usage:
+    python -m scripts.index_advisor     # exits with 1 if any plan is flagged
+
+@Date: 2026-10-16
+"""
+import sys
+from datetime import datetime
+import pymongo
+from bson.objectid import ObjectId
+from daos.mongodb_client import MongoDBClient
+from daos.user import email_filter, users_dao
+from daos.workout import daily_workout_logs_dao, fitness_goal_dao, monthly_workout_logs_dao, user_progress_dao
+from services.workout.daily_workout_logs_service import EXPORT_FIELDS, LIST_FIELDS
+from utils.logger import Logger
+
+logger = Logger(__name__)
+
+# Placeholder values; plans depend on the shape of a query, not on its values
+SAMPLE_ID = ObjectId("000000000000000000000000")
+SAMPLE_START, SAMPLE_END = datetime(2024, 1, 1), datetime(2024, 12, 31)
+LIVE = {"is_deleted": False}  # Appended by find_one / find_many / iter_many
+
+LOGS = daily_workout_logs_dao.COLLECTION_NAME
+BUCKETS = monthly_workout_logs_dao.COLLECTION_NAME
+
+# name, collection, then either filter (+ projection, sort, limit) or pipeline;
+# covered marks the queries expected to run index-only
+QUERY_SHAPES = [
+    {"name": "users by id", "collection": users_dao.COLLECTION_NAME,
+     "filter": {"_id": {"$in": [SAMPLE_ID]}, **LIVE}, "projection": {"password": 0}},
+    {"name": "users by email", "collection": users_dao.COLLECTION_NAME,
+     "filter": {"email": {"$in": ["sample@example.com"]}, **LIVE}},
+    {"name": "users by username", "collection": users_dao.COLLECTION_NAME,
+     "filter": {"username": "sample", **LIVE}},
+    {"name": "email filter catch-up scan", "collection": users_dao.COLLECTION_NAME,
+     "filter": {"_id": {"$gte": SAMPLE_ID}}, "projection": {"email": 1}, "sort": [("_id", pymongo.ASCENDING)]},
+    {"name": "email filter snapshot", "collection": email_filter.SNAPSHOT_COLLECTION_NAME,
+     "filter": {"_id": email_filter.SNAPSHOT_ID}},
+    {"name": "fitness goals by user", "collection": fitness_goal_dao.COLLECTION_NAME,
+     "filter": {"user_id": {"$in": [SAMPLE_ID]}, **LIVE}},
+    {"name": "progress rollup", "collection": user_progress_dao.COLLECTION_NAME,
+     "filter": {"user_id": SAMPLE_ID}},
+    {"name": "workout log by date", "collection": LOGS,
+     "filter": {"user_id": SAMPLE_ID, "log_date": SAMPLE_START, **LIVE}},
+    {"name": "workout log bulk pre-read", "collection": LOGS, "covered": True,
+     "filter": {"user_id": SAMPLE_ID, "log_date": {"$in": [SAMPLE_START, SAMPLE_END]}, **LIVE},
+     "projection": {**user_progress_dao.PROGRESS_PROJECTION, "_id": 0}},
+    {"name": "workout log range page", "collection": LOGS,
+     "filter": {"user_id": SAMPLE_ID, "log_date": {"$gte": SAMPLE_START, "$lte": SAMPLE_END}, **LIVE},
+     "projection": {field: 1 for field in LIST_FIELDS}, "sort": [("log_date", pymongo.ASCENDING)], "limit": 51},
+    {"name": "workout log export", "collection": LOGS,
+     "filter": {"user_id": SAMPLE_ID, "log_date": {"$gte": SAMPLE_START, "$lte": SAMPLE_END}, **LIVE},
+     "projection": {"_id": 0, **{field: 1 for field in EXPORT_FIELDS}}, "sort": [("log_date", pymongo.ASCENDING)]},
+    {"name": "workout log progress", "collection": LOGS, "covered": True,
+     "pipeline": daily_workout_logs_dao.build_progress_pipeline(SAMPLE_ID, SAMPLE_START, SAMPLE_END, "week")},
+    {"name": "monthly bucket by month", "collection": BUCKETS,
+     "filter": {"user_id": SAMPLE_ID, "month": SAMPLE_START, **LIVE}},
+    {"name": "monthly buckets bulk pre-read", "collection": BUCKETS,
+     "filter": {"user_id": SAMPLE_ID, "month": {"$in": [SAMPLE_START]}, **LIVE}},
+    {"name": "monthly bucket range", "collection": BUCKETS,
+     "filter": {"user_id": SAMPLE_ID, "month": {"$gte": SAMPLE_START, "$lte": SAMPLE_END}, **LIVE},
+     "sort": [("month", pymongo.ASCENDING)]},
+    {"name": "monthly bucket progress", "collection": BUCKETS,
+     "pipeline": monthly_workout_logs_dao.build_bucket_progress_pipeline(SAMPLE_ID, SAMPLE_START, SAMPLE_END,
+                                                                          "week")},
+]
+
+
+def _walk_plans(node, found, in_plan=False):
+    """Collect (stage, indexName) of every winning plan node in an explain() document"""
+    if isinstance(node, list):
+        for item in node:
+            _walk_plans(item, found, in_plan)
+    elif isinstance(node, dict):
+        if in_plan and isinstance(node.get("stage"), str):
+            found.append((node["stage"], node.get("indexName")))
+        for key, value in node.items():
+            if key != "rejectedPlans":
+                _walk_plans(value, found, in_plan or key == "winningPlan")
+
+
+def plan_summary(explain):
+    """
+    Summarize an explain() result (find or aggregate, classic or slot-based engine).
+    :return: {"stages": [...], "indexes": [...]}
+    """
+    found = []
+    _walk_plans(explain, found)
+    return {
+        "stages": [stage for stage, _ in found],
+        "indexes": sorted({index for _, index in found if index}),
+    }
+
+
+def plan_problems(summary, covered=False):
+    """Flags for a plan: collection scans, in-memory sorts, and fetches of covered queries"""
+    problems = []
+    if "COLLSCAN" in summary["stages"]:
+        problems.append("COLLSCAN: no index serves the filter")
+    if "SORT" in summary["stages"]:
+        problems.append("SORT: sorted in memory instead of by an index")
+    if covered and "FETCH" in summary["stages"]:
+        problems.append("FETCH: expected to be answered from the index alone")
+    return problems
+
+
+def explain_shape(db, shape):
+    """Run explain() for one query shape"""
+    collection = db[shape["collection"]]
+    if "pipeline" in shape:
+        return db.command("aggregate", shape["collection"], pipeline=shape["pipeline"], explain=True)
+    cursor = collection.find(shape["filter"], shape.get("projection"))
+    if shape.get("sort"):
+        cursor = cursor.sort(shape["sort"])
+    if shape.get("limit"):
+        cursor = cursor.limit(shape["limit"])
+    return cursor.explain()
+
+
+def advise(db_client=None, shapes=QUERY_SHAPES):
+    """
+    Explain every query shape.
+    :return: One report per shape: {"name", "collection", "stages", "indexes", "problems"}
+    """
+    reports = []
+    with (db_client or MongoDBClient()) as db_client:
+        for shape in shapes:
+            summary = plan_summary(explain_shape(db_client.db, shape))
+            reports.append({
+                "name": shape["name"],
+                "collection": shape["collection"],
+                **summary,
+                "problems": plan_problems(summary, shape.get("covered", False)),
+            })
+    return reports
+
+
+def print_report(reports):
+    for report in reports:
+        status = "FLAGGED" if report["problems"] else "ok"
+        print(f"[{status}] {report['collection']}: {report['name']}")
+        print(f"    plan: {' <- '.join(report['stages']) or '-'}")
+        print(f"    indexes: {', '.join(report['indexes']) or '-'}")
+        for problem in report["problems"]:
+            print(f"    ! {problem}")
+
+
+if __name__ == "__main__":
+    reports = advise()
+    print_report(reports)
+    flagged = [report for report in reports if report["problems"]]
+    logger.info(f"Index advisor checked {len(reports)} query shape(s), {len(flagged)} flagged.")
+    sys.exit(1 if flagged else 0)
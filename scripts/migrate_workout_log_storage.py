@@ -0,0 +1,120 @@
+"""
+Migrate Workout Log Storage
+
+Copies workout logs between the two layouts: one `daily_workout_logs` document per
+day, and one `monthly_workout_logs` bucket per user-month. Log ids are preserved (a
+daily document that already exists for a date keeps its own), and re-running a migration
+overwrites its previous output, so it can be repeated safely.
+The source collection is left untouched.
+
+Switching layouts:
+    1. python -m scripts.bootstrap                          # create the target collection
+    2. stop writes, then migrate:
+       python -m scripts.migrate_workout_log_storage to-monthly   # or to-daily
+    3. set WORKOUT_LOG_STORAGE=monthly (or daily) and restart the workers
+    4. drop the old collection once the new layout has been checked
+
+Progress rollups hold the same values in both layouts and need no rebuild.
+
+@Date: 2026-10-16
+"""
+import os
+import sys
+from datetime import datetime
+from itertools import groupby
+import pymongo
+from pymongo import ReplaceOne, UpdateOne
+from daos.mongodb_client import MongoDBClient
+from daos.workout.daily_workout_logs_dao import COLLECTION_NAME as LOGS_COLLECTION_NAME
+from daos.workout.monthly_workout_logs_dao import COLLECTION_NAME as BUCKETS_COLLECTION_NAME, build_bucket
+from daos.workout.user_progress_dao import month_start
+from utils.logger import Logger
+
+logger = Logger(__name__)
+
+# Documents written per bulk_write
+MIGRATION_BATCH_SIZE = int(os.getenv('MIGRATION_BATCH_SIZE', 500))
+
+
+def _write_batches(db_client, collection_name, operations):
+    """Run write operations in unordered bulk_writes of MIGRATION_BATCH_SIZE"""
+    written, batch = 0, []
+    for operation in operations:
+        batch.append(operation)
+        if len(batch) >= MIGRATION_BATCH_SIZE:
+            db_client.db[collection_name].bulk_write(batch, ordered=False)
+            written, batch = written + len(batch), []
+    if batch:
+        db_client.db[collection_name].bulk_write(batch, ordered=False)
+        written += len(batch)
+    return written
+
+
+def bucket_replacement(user_id, month, logs, now):
+    """Replace (or create) one bucket; a bucket written by an earlier run keeps its _id"""
+    bucket = build_bucket(user_id, month, logs)
+    del bucket["_id"]
+    bucket.update(is_deleted=False, created_at=now, updated_at=now)
+    return ReplaceOne({"user_id": user_id, "month": month}, bucket, upsert=True)
+
+
+def log_upsert(user_id, day):
+    """
+    Write (or overwrite) the daily log of one bucket entry. The entry's _id is only used
+    when the log is created: a document already there for the date, e.g. a soft-deleted
+    one, keeps its own, as _id cannot be changed.
+    """
+    log = {key: value for key, value in day.items() if key != "_id"}
+    log.update(user_id=user_id, is_deleted=False)
+    return UpdateOne({"user_id": user_id, "log_date": day["log_date"]},
+                     {"$set": log, "$setOnInsert": {"_id": day["_id"]}}, upsert=True)
+
+
+def to_monthly(db_client):
+    """
+    Group daily logs into monthly buckets.
+    :return: Number of buckets written
+    """
+    now = datetime.utcnow()
+    logs = db_client.iter_many(LOGS_COLLECTION_NAME, {},
+                               sort=[("user_id", pymongo.ASCENDING), ("log_date", pymongo.ASCENDING)])
+    operations = (
+        bucket_replacement(user_id, month, month_logs, now)
+        for (user_id, month), month_logs in groupby(
+            logs, key=lambda log: (log["user_id"], month_start(log["log_date"])))
+    )
+    return _write_batches(db_client, BUCKETS_COLLECTION_NAME, operations)
+
+
+def to_daily(db_client):
+    """
+    Expand monthly buckets into one document per log.
+    :return: Number of logs written
+    """
+    buckets = db_client.iter_many(BUCKETS_COLLECTION_NAME, {},
+                                  sort=[("user_id", pymongo.ASCENDING), ("month", pymongo.ASCENDING)])
+    operations = (log_upsert(bucket["user_id"], day) for bucket in buckets for day in bucket["days"])
+    return _write_batches(db_client, LOGS_COLLECTION_NAME, operations)
+
+
+MIGRATIONS = {"to-monthly": to_monthly, "to-daily": to_daily}
+
+
+def migrate(direction, db_client=None):
+    """
+    :param direction: 'to-monthly' or 'to-daily'
+    :param db_client: Optional MongoDBClient to use
+    :return: Number of documents written
+    """
+    if direction not in MIGRATIONS:
+        raise ValueError(f"Invalid direction: {direction} (expected one of {', '.join(MIGRATIONS)})")
+    with (db_client or MongoDBClient()) as db_client:
+        written = MIGRATIONS[direction](db_client)
+    logger.info(f"Workout log migration {direction} wrote {written} document(s).")
+    return written
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        sys.exit(f"Usage: python -m scripts.migrate_workout_log_storage {{{'|'.join(MIGRATIONS)}}}")
+    migrate(sys.argv[1])
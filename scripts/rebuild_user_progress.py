@@ -0,0 +1,71 @@
+"""
+Rebuild User Progress Rollups
+
+Recomputes `user_progress` documents from the raw workout logs, read from the layout
+selected by WORKOUT_LOG_STORAGE. Run it once after deploying the rollup, and whenever a
+rollup is suspected to have drifted.
+Workers keep serving cached rollups for up to PROGRESS_CACHE_TTL_SECONDS afterwards.
+
+Usage:
+    python -m scripts.rebuild_user_progress             # every user
+    python -m scripts.rebuild_user_progress <user_id>   # a single user
+
+@Date: 2026-10-16
+"""
+import sys
+from itertools import groupby
+import pymongo
+from bson.objectid import ObjectId
+from daos.mongodb_client import MongoDBClient
+from daos.workout.daily_workout_logs_dao import COLLECTION_NAME as LOGS_COLLECTION_NAME
+from daos.workout.monthly_workout_logs_dao import COLLECTION_NAME as BUCKETS_COLLECTION_NAME, WORKOUT_LOG_STORAGE
+from daos.workout.user_progress_dao import PROGRESS_PROJECTION, UserProgressDAO, build_rollup
+from utils.logger import Logger
+
+logger = Logger(__name__)
+
+
+def iter_logs(db_client, query):
+    """Stream raw logs in (user_id, log_date) order from whichever layout is in use"""
+    if WORKOUT_LOG_STORAGE == "monthly":
+        buckets = db_client.iter_many(
+            BUCKETS_COLLECTION_NAME, query, projection={"user_id": 1, "days": 1},
+            sort=[("user_id", pymongo.ASCENDING), ("month", pymongo.ASCENDING)]
+        )
+        for bucket in buckets:
+            for day in bucket["days"]:
+                yield {**day, "user_id": bucket["user_id"]}
+    else:
+        yield from db_client.iter_many(
+            LOGS_COLLECTION_NAME, query, projection={**PROGRESS_PROJECTION, "user_id": 1},
+            sort=[("user_id", pymongo.ASCENDING), ("log_date", pymongo.ASCENDING)]
+        )
+
+
+def rebuild_user_progress(user_id=None, db_client=None):
+    """
+    Recompute rollups from raw logs, streaming them in (user_id, log_date) index order.
+    :param user_id: Only rebuild this user (default: every user with logs)
+    :param db_client: Optional MongoDBClient to use
+    :return: Number of rollups written
+    """
+    progress_dao = UserProgressDAO()
+    query = {"user_id": ObjectId(user_id)} if user_id else {}
+    rebuilt = 0
+
+    with (db_client or MongoDBClient()) as db_client:
+        for log_user_id, user_logs in groupby(iter_logs(db_client, query), key=lambda log: log["user_id"]):
+            progress_dao.replace_progress(log_user_id, build_rollup(user_logs), db_client=db_client)
+            rebuilt += 1
+
+        if user_id and not rebuilt:
+            # The user has no logs left; reset the rollup to zero
+            progress_dao.replace_progress(user_id, build_rollup([]), db_client=db_client)
+            rebuilt = 1
+
+    logger.info(f"Rebuilt {rebuilt} user progress rollup(s).")
+    return rebuilt
+
+
+if __name__ == "__main__":
+    rebuild_user_progress(sys.argv[1] if len(sys.argv) > 1 else None)
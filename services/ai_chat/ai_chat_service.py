@@ -2,7 +2,9 @@
 @Time ： 2024-11-28
 @Auth ： Adam Lyu
 """
+import asyncio
 import os
+import time
 from pinecone import Pinecone
 from langchain_huggingface import HuggingFaceEmbeddings
 from langchain.vectorstores import Pinecone as PineconeVectorStore
@@ -10,9 +12,11 @@ from langchain.chains.question_answering import load_qa_chain
 from langchain_groq import ChatGroq
 from langchain.output_parsers import StructuredOutputParser, ResponseSchema
 
-from daos.workout.fitness_goal_dao import FitnessGoalDAO
+from daos.workout.fitness_goal_dao import AsyncFitnessGoalDAO
 from utils.logger import Logger
-from daos.user.users_dao import UserDAO
+from utils.metrics import metrics_registry
+from utils.tracing import span
+from daos.user.users_dao import AsyncUserDAO
 
 from utils.env_loader import load_platform_specific_env
 
@@ -20,9 +24,15 @@ from utils.env_loader import load_platform_specific_env
 load_platform_specific_env()
 logger = Logger(__name__)  # Initialize logger
 
+# Exposed on /metrics: answers being generated, and time spent in each stage of one
+ai_chat_in_flight = metrics_registry.gauge("ai_chat_requests_in_flight", "AI chat answers being generated")
+ai_chat_stage_seconds = metrics_registry.histogram(
+    "ai_chat_stage_duration_seconds", "Time spent per AI chat stage (retrieval, llm)", ("stage",),
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30))
+
 
 class AIChatService:
-    def __init__(self):
+    def __init__(self, user_dao=None, fitness_goal_dao=None):
         try:
             logger.info("Initializing AIChatService...")
 
@@ -89,8 +99,8 @@ class AIChatService:
             logger.info("StructuredOutputParser initialized successfully.")
 
             # Initialize DAOs
-            self.user_dao = UserDAO()
-            self.fitness_goal_dao = FitnessGoalDAO()
+            self.user_dao = user_dao or AsyncUserDAO()
+            self.fitness_goal_dao = fitness_goal_dao or AsyncFitnessGoalDAO()
 
         except Exception as e:
             logger.error(f"Error initializing AIChatService: {str(e)}")
@@ -100,7 +110,11 @@ class AIChatService:
         """Retrieve similar documents from the vector store."""
         try:
             logger.info(f"Retrieving query '{query}' with top {k} results...")
-            results = self.vector_store.similarity_search(query, k=k)
+            # Same as vector_store.similarity_search, split to time the embedding and Pinecone separately
+            with span("ai.embedding"):
+                embedding = self.embeddings.embed_query(query)
+            with span("ai.pinecone", k=k):
+                results = [doc for doc, _ in self.vector_store.similarity_search_by_vector_with_score(embedding, k=k)]
             logger.info(f"Query retrieved successfully. {len(results)} documents found.")
             return results
         except Exception as e:
@@ -136,16 +150,18 @@ class AIChatService:
             logger.error(f"Error generating prompt: {str(e)}")
             raise
 
-    def retrieve_answer(self, user_id, query):
+    async def retrieve_answer(self, user_id, query):
         """Generate an answer based on user input."""
+        ai_chat_in_flight.inc()
         try:
             logger.info(f"Retrieving answer for user_id {user_id} and query '{query}'...")
 
-            # Retrieve user and fitness goal information
-            user_info = self.user_dao.get_user_by_id(user_id)
-            goal_info = self.fitness_goal_dao.get_goal_by_user_id(user_id)
-            logger.debug(f"user_info -> {user_info}")
-            logger.debug(f"goal_info -> {goal_info}")
+            # Retrieve user and fitness goal information (independent lookups, issued together)
+            user_info, goal_info = await asyncio.gather(
+                self.user_dao.get_user_by_id(user_id),
+                self.fitness_goal_dao.get_goal_by_user_id(user_id)
+            )
+            logger.debug("Loaded chat context", user_info=user_info, goal_info=goal_info)
 
             if not user_info:
                 raise ValueError(f"User with ID {user_id} not found.")
@@ -163,20 +179,27 @@ class AIChatService:
                 "RestDay": user_info.get("rest_days", "Any"),
             }
 
-            # Retrieve matching documents
-            matching_docs = self.retrieve_query(query)
+            # Retrieve matching documents (embedding + Pinecone are blocking, keep them off the event loop)
+            start = time.perf_counter()
+            with span("ai.retrieval"):
+                matching_docs = await asyncio.to_thread(self.retrieve_query, query)
+            ai_chat_stage_seconds.labels("retrieval").observe(time.perf_counter() - start)
 
             # Generate prompt
             question = self.generate_prompt(input_data)
 
             # Get results from QA chain
-            response = self.chain.invoke({
-                "input_documents": matching_docs,
-                "question": question,
-            })
+            start = time.perf_counter()
+            with span("ai.llm"):
+                response = await self.chain.ainvoke({
+                    "input_documents": matching_docs,
+                    "question": question,
+                })
+            ai_chat_stage_seconds.labels("llm").observe(time.perf_counter() - start)
 
             # Parse response
-            parsed_output = self.parser.parse(response["output_text"])
+            with span("ai.parse"):
+                parsed_output = self.parser.parse(response["output_text"])
             logger.info("Answer retrieved and parsed successfully.")
             return parsed_output
 
@@ -186,6 +209,8 @@ class AIChatService:
         except Exception as e:
             logger.error(f"Error retrieving answer for user_id {user_id}: {str(e)}")
             raise
+        finally:
+            ai_chat_in_flight.dec()
 
 
 if __name__ == "__main__":
@@ -202,7 +227,7 @@ if __name__ == "__main__":
     try:
         # Test retrieve_answer method
         logger.info(f"Testing retrieve_answer for user_id {test_user_id} with query '{test_query}'...")
-        response = service.retrieve_answer(user_id=test_user_id, query=test_query)
+        response = asyncio.run(service.retrieve_answer(user_id=test_user_id, query=test_query))
 
         # Print test output
         print("\nTest User ID:", test_user_id)
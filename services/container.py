@@ -0,0 +1,121 @@
+"""
+Application Service Container
+
+Builds the DAOs and services once per process (from the FastAPI lifespan) and hands
+the singletons to route handlers through FastAPI's Depends.
+
+@Date: 2026-10-16
+"""
+from fastapi import Request
+from daos.async_mongodb_client import AsyncMongoDBClient, close_shared_async_client
+from daos.audit.audit_logs_dao import AsyncAuditLogsDAO, AsyncAuditSink
+from daos.mongodb_client import close_shared_client
+from daos.schema_registry import schema_registry
+from utils.cache import close_shared_backend, get_shared_backend, invalidation_bus
+from daos.user.email_filter import AsyncEmailFilter
+from daos.user.token_denylist import AsyncTokenDenylist
+from daos.user.users_dao import AsyncUserDAO
+from daos.workout.daily_workout_logs_dao import AsyncDailyWorkoutLogsDAO
+from daos.workout.fitness_goal_dao import AsyncFitnessGoalDAO
+from daos.workout.monthly_workout_logs_dao import WORKOUT_LOG_STORAGE, AsyncMonthlyWorkoutLogsDAO
+from daos.workout.user_progress_dao import AsyncUserProgressDAO
+from services.ai_chat.ai_chat_service import AIChatService
+from services.user.auth_service import AuthService
+from services.user.user_service import UserService
+from services.workout.daily_workout_logs_service import DailyWorkoutLogsService
+from services.workout.fitness_goal_service import FitnessGoalService
+from utils.http_metrics import event_loop_lag_monitor
+from utils.logger import Logger
+
+logger = Logger(__name__)
+
+
+class ServiceContainer:
+    def __init__(self):
+        logger.info("Building service container...")
+        self.db_client = AsyncMongoDBClient()
+
+        # DAOs share one async client (and therefore one connection pool)
+        self.email_filter = AsyncEmailFilter(self.db_client)
+        self.user_dao = AsyncUserDAO(self.db_client, email_filter=self.email_filter)
+        self.token_denylist = AsyncTokenDenylist(self.db_client)
+        self.user_progress_dao = AsyncUserProgressDAO(self.db_client)
+        # Same interface for both layouts; see scripts/migrate_workout_log_storage.py
+        logs_dao_class = AsyncMonthlyWorkoutLogsDAO if WORKOUT_LOG_STORAGE == "monthly" else AsyncDailyWorkoutLogsDAO
+        self.daily_workout_logs_dao = logs_dao_class(self.db_client, self.user_progress_dao)
+        self.fitness_goal_dao = AsyncFitnessGoalDAO(self.db_client)
+        self.audit_sink = AsyncAuditSink(self.db_client)
+        self.audit_logs_dao = AsyncAuditLogsDAO(self.db_client)
+
+        # Services
+        self.user_service = UserService(self.user_dao)
+        self.auth_service = AuthService(self.user_service, self.token_denylist)
+        self.daily_workout_logs_service = DailyWorkoutLogsService(self.daily_workout_logs_dao,
+                                                                  self.user_progress_dao)
+        self.fitness_goal_service = FitnessGoalService(self.fitness_goal_dao)
+        self.ai_chat_service = AIChatService(self.user_dao, self.fitness_goal_dao)
+
+    async def startup(self):
+        """
+        Prepare per-process state before serving requests.
+
+        Collections and indexes are not created here; run `python -m scripts.bootstrap`
+        once at deploy time.
+        """
+        schema_registry.names()  # Load and compile every JSON Schema up front
+        # Drop local cache entries when another worker writes (only with a shared cache backend)
+        invalidation_bus.start(get_shared_backend())
+        self.email_filter.start()  # Loads in the background; registration checks Mongo until ready
+        self.token_denylist.start()  # Same; every token is checked in Mongo until ready
+        event_loop_lag_monitor.start()
+        # Audit records are batched into the audit_logs collection instead of the audit file
+        self.audit_sink.start()
+        Logger.set_audit_sink(self.audit_sink)
+        logger.info("Service container started.")
+
+    async def shutdown(self):
+        """Stop background tasks and release the process-wide connection pools"""
+        Logger.set_audit_sink(None)
+        await self.audit_sink.stop()  # Flushes the buffered audit records
+        await event_loop_lag_monitor.stop()
+        await self.token_denylist.stop()
+        await self.email_filter.stop()
+        await invalidation_bus.stop()
+        await close_shared_backend()
+        close_shared_async_client()
+        close_shared_client()
+        logger.info("Service container stopped.")
+
+
+# FastAPI dependencies
+
+def get_container(request: Request) -> ServiceContainer:
+    return request.app.state.container
+
+
+def get_user_dao(request: Request) -> AsyncUserDAO:
+    return get_container(request).user_dao
+
+
+def get_user_service(request: Request) -> UserService:
+    return get_container(request).user_service
+
+
+def get_auth_service(request: Request) -> AuthService:
+    return get_container(request).auth_service
+
+
+def get_daily_workout_logs_service(request: Request) -> DailyWorkoutLogsService:
+    return get_container(request).daily_workout_logs_service
+
+
+def get_fitness_goal_service(request: Request) -> FitnessGoalService:
+    return get_container(request).fitness_goal_service
+
+
+def get_ai_chat_service(request: Request) -> AIChatService:
+    return get_container(request).ai_chat_service
+
+
+def get_audit_logs_dao(request: Request) -> AsyncAuditLogsDAO:
+    return get_container(request).audit_logs_dao
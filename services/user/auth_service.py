@@ -7,13 +7,19 @@ User Authentication Service
 
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
+import asyncio
+import hashlib
+import math
 import os
+import time
 from jose import jwt, JWTError
 from fastapi import HTTPException, Request
 from functools import wraps
 from fastapi.responses import JSONResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from daos.user.token_denylist import AsyncTokenDenylist
 from services.user.user_service import UserService
+from utils.cache import create_local_cache
 from utils.env_loader import load_platform_specific_env
 from utils.logger import Logger
 
@@ -22,18 +28,39 @@ load_platform_specific_env()
 logger = Logger(__name__)
 
 security = HTTPBearer()  # Parses Bearer Token from the Authorization header
+TOKEN_LIFETIME = timedelta(days=7)
+
+# Verified-token cache: a token seen before skips decoding and the signature check
+JWT_CACHE_ENABLED = os.getenv('JWT_CACHE_ENABLED', 'true').lower() == 'true'
+JWT_CACHE_MAXSIZE = int(os.getenv('JWT_CACHE_MAXSIZE', 10000))
+# Entries expire with their token, and after this many seconds at the latest
+JWT_CACHE_MAX_TTL_SECONDS = int(os.getenv('JWT_CACHE_MAX_TTL_SECONDS', 3600))
+
+
+def epoch_millis(timestamp):
+    """Whole milliseconds of an epoch timestamp: the precision of iat and of user revocations"""
+    return math.floor(timestamp * 1000)
+
+
+def token_digest(token):
+    """Cache key of a token (the token itself is not kept in memory)"""
+    return hashlib.blake2b(token.encode(), digest_size=16).digest()
 
 
 class AuthService:
-    def __init__(self):
-        self.user_service = UserService()
+    def __init__(self, user_service=None, token_denylist=None):
+        self.user_service = user_service or UserService()
+        self.token_denylist = token_denylist or AsyncTokenDenylist()
         self.secret_key = os.getenv('SECRET_KEY')
         if not self.secret_key:
             raise ValueError("SECRET_KEY is not set in environment variables")
         self.algorithm = os.getenv('ALGORITHM', 'HS256')
         self.password_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+        # token digest -> claims of tokens that passed verification (stats in /health/cache and /metrics)
+        self.token_cache = create_local_cache("jwt_verify", maxsize=JWT_CACHE_MAXSIZE,
+                                              ttl=JWT_CACHE_MAX_TTL_SECONDS) if JWT_CACHE_ENABLED else None
 
-    def register_user(self, username: str, email: str, password: str) -> str:
+    async def register_user(self, username: str, email: str, password: str) -> str:
         """
         Register a new user with a hashed password.
 
@@ -42,10 +69,10 @@ class AuthService:
         :param password: The user's password
         :return: The registered user ID
         """
-        user_id = self.user_service.register_user(username, email, password)
+        user_id = await self.user_service.register_user(username, email, password)
         return user_id
 
-    def login_user(self, email: str, password: str) -> dict:
+    async def login_user(self, email: str, password: str) -> dict:
         """
         Authenticate a user and generate a token.
 
@@ -53,7 +80,7 @@ class AuthService:
         :param password: The user's password
         :return: A dictionary containing the user ID, username, and token
         """
-        user_id, username = self.user_service.login_user(email, password)
+        user_id, username = await self.user_service.login_user(email, password)
         tokens = self._generate_tokens(str(user_id))
         return {"user_id": user_id, "username": username, "token": tokens}
 
@@ -67,28 +94,100 @@ class AuthService:
         now = datetime.now()
         refresh_token_payload = {
             'user_id': user_id,  # Include user ID
-            'exp': int((now + timedelta(days=7)).timestamp())  # Token expiration set to 7 days
+            # Issue time, compared with revoke_user_tokens (whole milliseconds)
+            'iat': epoch_millis(now.timestamp()) / 1000,
+            'exp': int((now + TOKEN_LIFETIME).timestamp())  # Token expiration set to 7 days
         }
         refresh_token = jwt.encode(refresh_token_payload, self.secret_key, algorithm=self.algorithm)
-        logger.debug(f"Generated refresh_token -> {refresh_token}")
+        logger.debug("Generated refresh token", user_id=user_id)
         return refresh_token
 
     def verify_token(self, token: str) -> str:
         """
-        Verify a JWT token.
+        Verify a JWT token (signature and expiry; authenticate also checks revocation).
 
         :param token: The JWT token
         :return: The user ID from the token payload
         :raises HTTPException: If the token is invalid or expired
         """
+        return self._verified_claims(token, token_digest(token))["user_id"]
+
+    def _verified_claims(self, token, digest):
+        """
+        :return: {"user_id", "iat", "exp"} of a valid token, from the verify cache when possible
+        :raises HTTPException: If the token is invalid or expired
+        """
+        if self.token_cache is not None:
+            claims = self.token_cache.get(digest)
+            if claims is not None:
+                return claims
+
         try:
             payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
-            return payload.get("user_id")
         except jwt.ExpiredSignatureError:
             raise HTTPException(status_code=401, detail="Token has expired")
         except JWTError:
             raise HTTPException(status_code=401, detail="Invalid token")
 
+        claims = {"user_id": payload.get("user_id"), "iat": payload.get("iat"), "exp": payload.get("exp")}
+        if self.token_cache is not None and claims["user_id"] is not None:
+            # Only valid tokens are cached, and never past their own expiry
+            ttl = JWT_CACHE_MAX_TTL_SECONDS
+            if isinstance(claims["exp"], (int, float)):
+                ttl = min(ttl, claims["exp"] - time.time())
+            if ttl > 0:
+                self.token_cache.set(digest, claims, ttl=ttl)
+        return claims
+
+    async def authenticate(self, token: str) -> str:
+        """
+        Verify a JWT token and check that it was not revoked. The denylist's Bloom filter
+        answers for almost every token; Mongo is only queried on a possible match.
+
+        :param token: The JWT token
+        :return: The user ID from the token payload
+        :raises HTTPException: If the token is invalid, expired or revoked
+        """
+        digest = token_digest(token)
+        claims = self._verified_claims(token, digest)
+        if claims["user_id"] is not None and await self.token_denylist.is_revoked(
+                digest.hex(), claims["user_id"], claims["iat"]):
+            raise HTTPException(status_code=401, detail="Token has been revoked")
+        return claims["user_id"]
+
+    async def revoke_token(self, token: str):
+        """
+        Log out: revoke one token until it expires.
+
+        :param token: The JWT token (verified first)
+        """
+        digest = token_digest(token)
+        claims = self._verified_claims(token, digest)
+        if isinstance(claims["exp"], (int, float)):
+            expires_at = datetime.utcfromtimestamp(claims["exp"])
+        else:
+            expires_at = datetime.utcnow() + TOKEN_LIFETIME
+        await self.token_denylist.revoke_token(digest.hex(), claims["user_id"], expires_at)
+        logger.info(f"Token revoked for user: {claims['user_id']}")
+
+    async def revoke_user_tokens(self, user_id: str):
+        """
+        Revoke every token issued to a user so far (tokens from later logins stay valid).
+
+        Tokens issued before the next whole millisecond are revoked: that includes every
+        token issued so far, as iat is truncated to the millisecond. Returning only once
+        that millisecond has started keeps tokens of logins that follow valid.
+
+        :param user_id: The user ID
+        """
+        revoked_before = (epoch_millis(time.time()) + 1) / 1000
+        await self.token_denylist.revoke_user(user_id, revoked_before,
+                                              datetime.utcfromtimestamp(revoked_before) + TOKEN_LIFETIME)
+        delay = revoked_before - time.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        logger.info(f"All tokens revoked for user: {user_id}")
+
     def requires_auth(self, func):
         """
         Decorator: Validates the JWT token in the request.
@@ -96,23 +195,62 @@ class AuthService:
         :param func: The function to wrap
         :return: The wrapped function
         """
+        return _auth_wrapper(func, lambda request: self)
+
+
+def requires_auth(func):
+    """
+    Decorator: Validates the JWT token in the request using the AuthService singleton
+    held by the application's service container, so routers need no AuthService at import time.
 
-        @wraps(func)
-        async def wrapper(request: Request, *args, **kwargs):
-            authorization = request.headers.get("Authorization")
-            if not authorization or not authorization.startswith("Bearer "):
-                raise HTTPException(status_code=401, detail="Missing or invalid Authorization header")
+    :param func: The function to wrap
+    :return: The wrapped function
+    """
+    return _auth_wrapper(func, lambda request: request.app.state.container.auth_service)
 
-            token = authorization.split(" ")[1]
 
-            try:
-                user_id = self.verify_token(token)
-                request.state.user_id = user_id
-                return await func(request, *args, **kwargs)
-            except HTTPException as e:
-                return JSONResponse(status_code=e.status_code, content={"detail": e.detail})
+def requires_admin(func):
+    """
+    Decorator: Like requires_auth, and the authenticated user must have the 'admin' role.
+
+    :param func: The function to wrap
+    :return: The wrapped function
+    """
+    @wraps(func)
+    async def wrapper(request: Request, *args, **kwargs):
+        user = await request.app.state.container.user_dao.get_user_by_id(request.state.user_id)
+        if not user or user.get("role") != "admin":
+            return JSONResponse(status_code=403, content={"detail": "Admin role required"})
+        return await func(request, *args, **kwargs)
+
+    return requires_auth(wrapper)
+
+
+def bearer_token(request: Request) -> str:
+    """
+    The token of the request's `Authorization: Bearer` header.
+
+    :raises HTTPException: If the header is missing or malformed
+    """
+    authorization = request.headers.get("Authorization")
+    if not authorization or not authorization.startswith("Bearer "):
+        raise HTTPException(status_code=401, detail="Missing or invalid Authorization header")
+    return authorization.split(" ")[1]
+
+
+def _auth_wrapper(func, resolve_auth_service):
+    @wraps(func)
+    async def wrapper(request: Request, *args, **kwargs):
+        token = bearer_token(request)
+
+        try:
+            user_id = await resolve_auth_service(request).authenticate(token)
+            request.state.user_id = user_id
+            return await func(request, *args, **kwargs)
+        except HTTPException as e:
+            return JSONResponse(status_code=e.status_code, content={"detail": e.detail})
 
-        return wrapper
+    return wrapper
 
 
 if __name__ == '__main__':
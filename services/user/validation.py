@@ -6,7 +6,7 @@ Validation Schemas for User Operations
 """
 from marshmallow import Schema, fields, ValidationError, validates
 from pydantic import BaseModel, EmailStr, Field
-from daos.user.users_dao import UserDAO
+from daos.user.users_dao import AsyncUserDAO
 
 
 # Validation logic embedded in the schema
@@ -16,9 +16,9 @@ class RegistrationValidationSchema(Schema):
     email = fields.Email(required=True)  # Automatically validates email format
     password = fields.Str(required=True)
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, user_dao=None, **kwargs):
         super().__init__(*args, **kwargs)
-        self.user_dao = UserDAO()  # Initialize DAO instance
+        self.user_dao = user_dao or AsyncUserDAO()  # Shared DAO from the service container
 
     @validates('password')
     def validate_password(self, value):
@@ -32,11 +32,15 @@ class RegistrationValidationSchema(Schema):
         if not any(char.isdigit() for char in value):
             raise ValidationError("Password must contain at least one digit")
 
-    @validates('email')
-    def validate_email(self, value):
-        """Check if email already exists in the database"""
-        if self.user_dao.get_user_by_email(value):
-            raise ValidationError("Email already exists")
+    async def validate_email(self, value):
+        """
+        Check if email already exists in the database.
+
+        marshmallow validators are synchronous, so this runs after schema.load()
+        and must be awaited by the caller.
+        """
+        if await self.user_dao.email_exists(value):
+            raise ValidationError("Email already exists", field_name="email")
 
 
 class LoginValidationSchema(Schema):
@@ -4,28 +4,73 @@ Daily Workout Logs Service
 @Date: 2024-11-23
 @Author: Adam Lyu
 """
+import base64
+import binascii
+import csv
+import io
+import json
 from datetime import datetime, date as log_date
-from daos.workout.daily_workout_logs_dao import DailyWorkoutLogsDAO
+from daos.workout.daily_workout_logs_dao import AsyncDailyWorkoutLogsDAO
+from daos.workout.user_progress_dao import AsyncUserProgressDAO
 from pymongo.results import UpdateResult, InsertOneResult
 from utils.logger import Logger
 
 # Initialize logger
 logger = Logger(__name__)
 
+# Fields written by the export, in column order
+EXPORT_FIELDS = ["log_date", "workout_content", "total_weight_lost", "total_calories_burnt",
+                 "avg_workout_duration", "created_at", "updated_at"]
+EXPORT_FORMATS = ("ndjson", "csv")
+# Rows grouped into one chunk of the streamed response
+EXPORT_CHUNK_ROWS = 200
+
+
+# Fields a listing may project; workout_content can be skipped by list views
+LIST_FIELDS = ("log_date", "workout_content", "total_weight_lost", "total_calories_burnt",
+               "avg_workout_duration", "created_at", "updated_at")
+
+
+def encode_page_cursor(last_log_date):
+    """Encode the last log_date of a page as an opaque cursor token"""
+    payload = json.dumps({"after": last_log_date.isoformat()})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_page_cursor(cursor):
+    """
+    Decode a cursor token produced by encode_page_cursor.
+    :raises ValueError: If the token is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(payload["after"])
+    except (binascii.Error, UnicodeDecodeError, KeyError, TypeError, ValueError):
+        raise ValueError("Invalid cursor")
+
+
+def _export_value(value):
+    """Render a stored value for export (dates as ISO strings)"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
 
 class DailyWorkoutLogsService:
-    def __init__(self):
-        self.dao = DailyWorkoutLogsDAO()
+    def __init__(self, dao=None, progress_dao=None):
+        self.dao = dao or AsyncDailyWorkoutLogsDAO()
+        self.progress_dao = progress_dao or AsyncUserProgressDAO()
 
-    def get_workout_log(self, user_id, log_date):
+    async def get_workout_log(self, user_id, log_date):
         """
         Retrieve a workout log for a specific user and log date.
         """
         logger.info(f"Service: Fetching workout log for user_id: {user_id}, log_date: {log_date}")
         try:
-            log = self.dao.get_log_by_user_and_date(user_id, log_date)
+            log = await self.dao.get_log_by_user_and_date(user_id, log_date)
             if log:
-                logger.debug(f"Workout log retrieved: {log}")
+                logger.debug("Workout log retrieved", log=log)
             else:
                 logger.warning(f"No workout log found for user_id: {user_id}, log_date: {log_date}")
             return log
@@ -33,8 +78,8 @@ class DailyWorkoutLogsService:
             logger.error(f"Failed to retrieve workout log: {e}")
             raise
 
-    def create_or_update_workout_log(self, user_id, log_date=None, workout_content=None,
-                                     total_weight_lost=0, total_calories_burnt=0, avg_workout_duration=0):
+    async def create_or_update_workout_log(self, user_id, log_date=None, workout_content=None,
+                                           total_weight_lost=0, total_calories_burnt=0, avg_workout_duration=0):
         """
         Create or update a workout log for a specific user.
         """
@@ -42,7 +87,7 @@ class DailyWorkoutLogsService:
         logger.info(f"Service: Creating or updating workout log for user_id {user_id} on log_date {log_date}")
 
         try:
-            result = self.dao.create_or_update_log(
+            result = await self.dao.create_or_update_log(
                 user_id=user_id,
                 log_date=log_date,
                 workout_content=workout_content,
@@ -69,13 +114,89 @@ class DailyWorkoutLogsService:
             logger.error(f"Error creating or updating workout log for user_id {user_id}: {e}")
             raise
 
-    def update_workout_log_fields(self, user_id, log_date, update_fields):
+    async def bulk_upsert_workout_logs(self, user_id, logs):
+        """
+        Create or update a batch of workout logs for a user in one database round trip.
+
+        :return: One result per log, in input order
+        """
+        logger.info(f"Service: Bulk upserting {len(logs)} workout log(s) for user_id: {user_id}")
+        try:
+            return await self.dao.bulk_upsert_logs(user_id, logs)
+        except Exception as e:
+            logger.error(f"Error bulk upserting workout logs for user_id {user_id}: {e}")
+            raise
+
+    async def list_workout_logs(self, user_id, start_date=None, end_date=None, cursor=None, limit=50, fields=None):
+        """
+        Return one page of a user's workout logs plus the cursor for the next page.
+
+        :param cursor: Token from a previous page's next_cursor
+        :param fields: Optional subset of LIST_FIELDS to return
+        :return: {"items": [...], "next_cursor": str | None}
+        :raises ValueError: On a malformed cursor or an unknown field
+        """
+        logger.info(f"Service: Listing workout logs for user_id: {user_id}, limit: {limit}")
+        after = decode_page_cursor(cursor) if cursor else None
+        projection = None
+        if fields:
+            unknown = set(fields) - set(LIST_FIELDS)
+            if unknown:
+                raise ValueError(f"Unknown fields: {sorted(unknown)}")
+            projection = {field: 1 for field in fields}
+
+        # Fetch one extra log to know whether another page exists
+        logs = await self.dao.list_logs_page(user_id, start_date, end_date, after=after, limit=limit + 1,
+                                             projection=projection)
+        next_cursor = None
+        if len(logs) > limit:
+            logs = logs[:limit]
+            next_cursor = encode_page_cursor(logs[-1]["log_date"])
+        return {"items": logs, "next_cursor": next_cursor}
+
+    async def export_workout_logs(self, user_id, export_format="ndjson", start_date=None, end_date=None):
+        """
+        Async generator producing a user's workout history as NDJSON or CSV text chunks.
+
+        Logs are read from a DAO cursor and written out as they arrive, so memory use
+        and time to first byte do not depend on how many logs the user has.
+        """
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format: {export_format}")
+        logger.info(f"Service: Exporting workout logs for user_id: {user_id} as {export_format}")
+
+        buffer = io.StringIO()
+        writer = None
+        if export_format == "csv":
+            writer = csv.writer(buffer)
+            writer.writerow(EXPORT_FIELDS)
+
+        projection = {field: 1 for field in EXPORT_FIELDS}
+        projection["_id"] = 0
+        rows = 0
+        async for log in self.dao.iter_logs(user_id, start_date, end_date, projection=projection):
+            row = [_export_value(log.get(field)) for field in EXPORT_FIELDS]
+            if writer:
+                writer.writerow(row)
+            else:
+                buffer.write(json.dumps(dict(zip(EXPORT_FIELDS, row))) + "\n")
+            rows += 1
+            if rows % EXPORT_CHUNK_ROWS == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+
+        if buffer.tell():
+            yield buffer.getvalue()
+        logger.info(f"Service: Exported {rows} workout log(s) for user_id: {user_id}")
+
+    async def update_workout_log_fields(self, user_id, log_date, update_fields):
         """
         Update specific fields of a workout log.
         """
         logger.info(f"Service: Updating workout log fields for user_id: {user_id}, log_date: {log_date}")
         try:
-            result = self.dao.update_log_fields(
+            result = await self.dao.update_log_fields(
                 user_id=user_id,
                 log_date=log_date,
                 update_fields=update_fields
@@ -89,9 +210,13 @@ class DailyWorkoutLogsService:
             logger.error(f"Failed to update workout log fields: {e}")
             raise
 
-    def calculate_total_progress(self, user_id):
+    async def calculate_total_progress(self, user_id, start_date=None, end_date=None, granularity="day"):
         """
-        Calculate total progress for a user based on all workout logs.
+        Calculate progress for a user from their workout logs (one aggregation round trip).
+
+        :param start_date: Optional first log date (inclusive)
+        :param end_date: Optional last log date (inclusive)
+        :param granularity: Bucket size for daily_progress: 'day', 'week' or 'month'
 
         Returns:
             {
@@ -101,6 +226,7 @@ class DailyWorkoutLogsService:
                     "avg_calories_burnt_per_day": 500,
                     "avg_workout_duration_per_session": 45
                 },
+                "granularity": "day",
                 "daily_progress": [
                     {"log_date": "2024-11-01", "total_workout_time": 30, "total_calories_burnt": 500},
                     {"log_date": "2024-11-02", "total_workout_time": 40, "total_calories_burnt": 600},
@@ -110,19 +236,20 @@ class DailyWorkoutLogsService:
         """
         logger.info(f"Service: Calculating total progress for user_id: {user_id}")
         try:
-            # Retrieve total progress data
-            total_progress = self.dao.calculate_total_progress(user_id)
-            logger.debug(f"Total progress: {total_progress}")
-
-            # Retrieve daily progress data
-            daily_progress = self.dao.calculate_daily_progress(user_id)
-            logger.debug(f"Daily progress: {daily_progress}")
+            if start_date is None and end_date is None:
+                # Whole-history progress is kept up to date in the rollup document
+                progress = await self.progress_dao.get_progress(user_id, granularity)
+            else:
+                progress = await self.dao.calculate_progress(user_id, start_date, end_date, granularity)
+            total_progress = progress["totals"]
+            logger.debug("Total progress", total_progress=total_progress)
 
-            # Calculate averages needed for frontend display
-            avg_calories_burnt_per_day = total_progress["total_calories_burnt"] / len(
-                daily_progress) if daily_progress else 0
-            avg_workout_duration_per_session = total_progress["total_duration"] / total_progress["total_sessions"] if \
-                total_progress["total_sessions"] > 0 else 0
+            # Logs are unique per day, so each session is one active day
+            total_sessions = total_progress["total_sessions"]
+            avg_calories_burnt_per_day = total_progress["total_calories_burnt"] / total_sessions \
+                if total_sessions > 0 else 0
+            avg_workout_duration_per_session = total_progress["total_duration"] / total_sessions \
+                if total_sessions > 0 else 0
 
             result = {
                 "key_statistics": {
@@ -131,15 +258,16 @@ class DailyWorkoutLogsService:
                     "avg_calories_burnt_per_day": round(avg_calories_burnt_per_day, 2),
                     "avg_workout_duration_per_session": round(avg_workout_duration_per_session, 2),
                 },
+                "granularity": granularity,
                 "daily_progress": [
                     {
-                        "log_date": item["_id"]["log_date"].strftime("%Y-%m-%d"),  # Convert date to string format
-                        "total_workout_time": item["total_workout_time"],
-                        "total_calories_burnt": item["total_calories_burnt"]
-                    } for item in daily_progress
+                        "log_date": bucket["period_start"].strftime("%Y-%m-%d"),  # Start of the day/week/month
+                        "total_workout_time": bucket["total_workout_time"],
+                        "total_calories_burnt": bucket["total_calories_burnt"]
+                    } for bucket in progress["buckets"]
                 ]
             }
-            logger.info(f"Total progress calculated for user_id {user_id}: {result}")
+            logger.info(f"Total progress calculated for user_id {user_id}: {result['key_statistics']}")
             return result
         except Exception as e:
             logger.error(f"Failed to calculate total progress for user_id {user_id}: {e}")
@@ -5,7 +5,7 @@ Fitness Goal Service
 @Author: Adam Lyu
 """
 
-from daos.workout.fitness_goal_dao import FitnessGoalDAO
+from daos.workout.fitness_goal_dao import AsyncFitnessGoalDAO
 from utils.logger import Logger
 from services.workout.validation import CreateOrUpdateGoalRequest  # Import validation model
 
@@ -13,10 +13,10 @@ logger = Logger(__name__)
 
 
 class FitnessGoalService:
-    def __init__(self):
-        pass
+    def __init__(self, dao=None):
+        self.dao = dao or AsyncFitnessGoalDAO()
 
-    def get_fitness_goal(self, user_id: str):
+    async def get_fitness_goal(self, user_id: str):
         """
         Retrieve the fitness goal for a user.
 
@@ -24,14 +24,13 @@ class FitnessGoalService:
         :return: Fitness goal data
         """
         logger.info(f"Fetching fitness goal for user_id: {user_id}")
-        dao = FitnessGoalDAO()
-        goal = dao.get_goal_by_user_id(user_id)
+        goal = await self.dao.get_goal_by_user_id(user_id)
         if not goal:
             logger.warning(f"No fitness goal found for user_id: {user_id}")
             return {"message": "No fitness goal found", "data": None}
         return {"message": "Fitness goal retrieved successfully", "data": goal}
 
-    def create_or_update_fitness_goal(self, user_id: str, data: dict):
+    async def create_or_update_fitness_goal(self, user_id: str, data: dict):
         """
         Create or update the fitness goal for a user.
 
@@ -43,10 +42,9 @@ class FitnessGoalService:
 
         # Validate the input data using the model
         validated_data = CreateOrUpdateGoalRequest(**data)
-        dao = FitnessGoalDAO()
 
         # Call the DAO layer to perform create or update operation
-        result = dao.create_or_update_fitness_goal(
+        result = await self.dao.create_or_update_fitness_goal(
             user_id=user_id,
             goal=validated_data.goal,
             days_per_week=validated_data.days_per_week,
@@ -71,7 +69,7 @@ class FitnessGoalService:
             logger.error(f"Unexpected operation result for user_id {user_id}: {result}")
             raise ValueError("Unexpected DAO operation result")
 
-    def update_fitness_goal_fields(self, user_id: str, update_fields: dict):
+    async def update_fitness_goal_fields(self, user_id: str, update_fields: dict):
         """
         Dynamically update specific fields of a user's fitness goal.
 
@@ -79,20 +77,19 @@ class FitnessGoalService:
         :param update_fields: Fields to update in JSON format
         :return: Update result
         """
-        dao = FitnessGoalDAO()
         logger.info(f"Updating fitness goal fields for user_id: {user_id}")
 
         # Validate the input fields (only validate provided fields)
         validated_data = CreateOrUpdateGoalRequest(**update_fields)
 
         # Call the DAO layer to perform field updates
-        result = dao.update_fitness_goal(user_id, validated_data.dict(exclude_unset=True))
+        result = await self.dao.update_fitness_goal(user_id, validated_data.dict(exclude_unset=True))
 
         # Extract serializable fields from the result
         serialized_result = {
-            "matched_count": result.matched_count,
-            "modified_count": result.modified_count,
-            "upserted_id": str(result.upserted_id) if result.upserted_id else None,
+            "matched_count": result["matched_count"],
+            "modified_count": result["modified_count"],
+            "upserted_id": str(result["upserted_id"]) if result.get("upserted_id") else None,
         }
 
         # Return results
@@ -0,0 +1,44 @@
+"""
+Tests for the Bloom filter
+
+@Date: 2026-10-17
+"""
+from utils.bloom_filter import BloomFilter
+
+
+def test_no_false_negatives():
+    bloom = BloomFilter(1000, 0.01)
+    emails = [f"user{i}@example.com" for i in range(1000)]
+    for email in emails:
+        bloom.add(email)
+    assert all(email in bloom for email in emails)
+
+
+def test_false_positive_rate_near_target():
+    bloom = BloomFilter(1000, 0.01)
+    for i in range(1000):
+        bloom.add(f"user{i}@example.com")
+    false_positives = sum(f"other{i}@example.com" in bloom for i in range(10000))
+    assert false_positives < 300  # ~1% expected
+
+
+def test_count_ignores_duplicates():
+    bloom = BloomFilter(100)
+    bloom.add("a@example.com")
+    bloom.add("a@example.com")
+    assert bloom.count == 1
+
+
+def test_document_roundtrip():
+    bloom = BloomFilter(500, 0.001)
+    for i in range(100):
+        bloom.add(f"user{i}@example.com")
+    document = bloom.to_document()
+    assert isinstance(document["bits"], bytes)
+
+    restored = BloomFilter.from_document(document)
+    assert (restored.num_bits, restored.num_hashes, restored.count) == (bloom.num_bits, bloom.num_hashes, 100)
+    assert restored.bits == bloom.bits
+    assert all(f"user{i}@example.com" in restored for i in range(100))
+    restored.add("new@example.com")
+    assert "new@example.com" not in BloomFilter.from_document(document)  # The document is not shared
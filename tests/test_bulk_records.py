@@ -0,0 +1,48 @@
+"""
+Tests for the bulk workout-log body parser
+
+@Date: 2026-10-17
+"""
+import asyncio
+import pytest
+from fastapi import HTTPException
+from api.v1.workout.daily_workout_logs import _iter_bulk_records
+
+
+class FakeRequest:
+    def __init__(self, content_type, chunks):
+        self.headers = {"content-type": content_type}
+        self.chunks = chunks
+
+    async def stream(self):
+        for chunk in self.chunks:
+            yield chunk
+
+    async def body(self):
+        return b"".join(self.chunks)
+
+
+def collect(request):
+    async def run():
+        return [record async for record in _iter_bulk_records(request)]
+    return asyncio.run(run())
+
+
+def test_ndjson_lines_split_across_chunks():
+    request = FakeRequest("application/x-ndjson", [b'{"a": 1}\n{"a"', b': 2}\n\n', b'{"a": 3}'])
+    assert collect(request) == [b'{"a": 1}', b'{"a": 2}', b'{"a": 3}']
+
+
+def test_ndjson_skips_blank_lines():
+    assert collect(FakeRequest("application/jsonlines", [b"\n  \n", b'{"a": 1}\n'])) == [b'{"a": 1}']
+
+
+def test_json_array_body():
+    assert collect(FakeRequest("application/json", [b'[{"a": 1}, ', b'{"a": 2}]'])) == [{"a": 1}, {"a": 2}]
+
+
+@pytest.mark.parametrize("body", [b'{"a": 1}', b"not json"])
+def test_json_body_must_be_an_array(body):
+    with pytest.raises(HTTPException) as error:
+        collect(FakeRequest("application/json", [body]))
+    assert error.value.status_code == 400
@@ -0,0 +1,62 @@
+"""
+Tests for the cache registries
+
+@Date: 2026-10-17
+"""
+import asyncio
+import utils.cache as cache_module
+from utils.cache import NearCache, TTLCache, create_local_cache, get_cache_stats
+
+
+class DisconnectingBackend:
+    """Shared backend whose pub/sub subscription fails once"""
+
+    def __init__(self):
+        self.listens = 0
+
+    async def listen(self):
+        self.listens += 1
+        if self.listens == 1:
+            raise ConnectionError("connection lost")
+        await asyncio.Event().wait()  # Stay subscribed
+        yield
+
+
+def test_local_caches_are_listed_in_stats():
+    cache = create_local_cache("tests_local", maxsize=2, ttl=60)
+    cache.set("key", "value")
+    assert cache.get("key") == "value"
+    stats = get_cache_stats()["tests_local"]
+    assert stats["hits"] == 1 and stats["size"] == 1
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None and cache.get("a") == 1
+    assert cache.stats()["evictions"] == 1
+
+
+def test_invalidation_bus_survives_a_disconnect_with_local_caches(monkeypatch):
+    real_sleep = asyncio.sleep
+    monkeypatch.setattr(cache_module.asyncio, "sleep", lambda seconds: real_sleep(0))  # Reconnect at once
+    create_local_cache("tests_local_bus")
+    near = NearCache("tests_near_bus")
+
+    async def run():
+        bus = cache_module.CacheInvalidationBus()
+        backend = DisconnectingBackend()
+        await near.set("key", "value")
+        bus.start(backend)
+        for _ in range(20):
+            await asyncio.sleep(0)
+        task = bus._task
+        await bus.stop()
+        return backend.listens, task
+
+    listens, task = asyncio.run(run())
+    assert listens == 2  # Reconnected instead of dying on the local cache
+    assert task.cancelled()
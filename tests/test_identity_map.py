@@ -0,0 +1,65 @@
+"""
+Tests for the request-scoped identity map
+
+@Date: 2026-10-17
+"""
+import asyncio
+import pytest
+from utils.request_context import IdentityMap
+
+
+class Loader:
+    def __init__(self, documents, fail=False):
+        self.documents = documents
+        self.fail = fail
+        self.calls = []
+
+    async def __call__(self, keys):
+        self.calls.append(sorted(keys))
+        if self.fail:
+            raise RuntimeError("boom")
+        return {key: self.documents[key] for key in keys if key in self.documents}
+
+
+def test_concurrent_lookups_share_one_batch():
+    loader = Loader({"a": {"_id": "a"}, "b": {"_id": "b"}})
+
+    async def run():
+        identity_map = IdentityMap()
+        return await asyncio.gather(identity_map.load("users:id", "a", loader),
+                                    identity_map.load("users:id", "b", loader),
+                                    identity_map.load("users:id", "a", loader),
+                                    identity_map.load("users:id", "missing", loader))
+
+    assert asyncio.run(run()) == [{"_id": "a"}, {"_id": "b"}, {"_id": "a"}, None]
+    assert loader.calls == [["a", "b", "missing"]]
+
+
+def test_results_are_remembered_until_forgotten():
+    loader = Loader({"a": {"_id": "a"}})
+
+    async def run():
+        identity_map = IdentityMap()
+        await identity_map.load("users:id", "a", loader)
+        await identity_map.load("users:id", "a", loader)
+        identity_map.forget("goals")  # Another collection: kept
+        await identity_map.load("users:id", "a", loader)
+        identity_map.forget("users")
+        await identity_map.load("users:id", "a", loader)
+
+    asyncio.run(run())
+    assert loader.calls == [["a"], ["a"]]
+
+
+def test_failures_are_not_remembered():
+    loader = Loader({"a": {"_id": "a"}}, fail=True)
+
+    async def run():
+        identity_map = IdentityMap()
+        with pytest.raises(RuntimeError):
+            await identity_map.load("users:id", "a", loader)
+        loader.fail = False
+        return await identity_map.load("users:id", "a", loader)
+
+    assert asyncio.run(run()) == {"_id": "a"}
+    assert len(loader.calls) == 2
@@ -0,0 +1,46 @@
+"""
+Tests for per-call-site log sampling and field snapshots
+
+@Date: 2026-10-17
+"""
+import utils.logger as logger_module
+from utils.logger import LOG_FIELD_MAX_ITEMS, CallSiteSampler, snapshot_field
+
+
+def test_sample_every_emits_the_first_of_each_n():
+    sampler = CallSiteSampler()
+    assert [sampler.allow(sample_every=3) for _ in range(7)] == [True, False, False, True, False, False, True]
+    assert sampler.suppressed == 4
+
+
+def test_max_per_second_resets_each_window(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(logger_module.time, "monotonic", lambda: now[0])
+    sampler = CallSiteSampler()
+    assert [sampler.allow(max_per_second=2) for _ in range(3)] == [True, True, False]
+    now[0] += 1
+    assert sampler.allow(max_per_second=2)
+
+
+def test_no_limits_emits_everything():
+    sampler = CallSiteSampler()
+    assert all(sampler.allow() for _ in range(5))
+
+
+def test_snapshot_copies_and_bounds_values():
+    document = {"nested": {"items": list(range(LOG_FIELD_MAX_ITEMS + 5))}, "tags": ("a",)}
+    snapshot = snapshot_field(document)
+    document["nested"]["items"].append("later")
+    assert len(snapshot["nested"]["items"]) == LOG_FIELD_MAX_ITEMS + 1
+    assert snapshot["nested"]["items"][-1] == "... 5 more"
+    assert snapshot["tags"] == ["a"]
+    assert snapshot_field({"a": {"b": {"c": {"d": {"e": 1}}}}}) == {"a": {"b": {"c": {"d": "{'e': 1}"}}}}
+
+
+def test_logger_samples_per_call_site():
+    sampled = logger_module.Logger("tests.sampling")
+    for _ in range(5):
+        sampled.info("Sampled line", sample_every=5)
+    sampler = [sampler for (path, _), sampler in logger_module._samplers.items()
+               if path.endswith("test_logger_sampling.py")]
+    assert len(sampler) == 1 and sampler[0].calls == 5 and sampler[0].suppressed == 4
@@ -0,0 +1,78 @@
+"""
+Tests for the metrics registry
+
+@Date: 2026-10-17
+"""
+import math
+import pytest
+from utils.metrics import Histogram, MetricsRegistry
+
+
+def test_counter_and_gauge_rendering():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests", ("method", "route"))
+    requests.labels("GET", "/a").inc()
+    requests.labels("GET", "/a").inc(2)
+    registry.gauge("in_flight", "In flight").set(3)
+    lines = registry.render().splitlines()
+    assert "# HELP requests_total Requests" in lines
+    assert "# TYPE requests_total counter" in lines
+    assert 'requests_total{method="GET",route="/a"} 3.0' in lines
+    assert "in_flight 3" in lines
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1))
+    for value in (0.05, 0.5, 0.5, 5):
+        latency.observe(value)
+    lines = registry.render().splitlines()
+    assert 'latency_seconds_bucket{le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{le="1"} 3' in lines
+    assert 'latency_seconds_bucket{le="+Inf"} 4' in lines
+    assert "latency_seconds_sum 6.05" in lines
+    assert "latency_seconds_count 4" in lines
+
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry()
+    registry.counter("errors_total", "Errors", ("message",)).labels('say "hi"\\\n').inc()
+    assert 'errors_total{message="say \\"hi\\"\\\\\\n"} 1.0' in registry.render().splitlines()
+
+
+def test_collectors_are_read_at_render_time():
+    registry = MetricsRegistry()
+    values = {"size": 1}
+    registry.register_collector(lambda: [("cache_entries", "Entries", "gauge", [({"cache": "users"}, values["size"])])])
+    values["size"] = 7
+    assert 'cache_entries{cache="users"} 7' in registry.render()
+
+
+def test_failing_collector_is_skipped():
+    registry = MetricsRegistry()
+
+    def broken():
+        raise RuntimeError("boom")
+
+    registry.register_collector(broken)
+    registry.gauge("up", "Up").set(1)
+    assert "up 1" in registry.render()
+
+
+def test_label_count_and_kind_are_checked():
+    registry = MetricsRegistry()
+    family = registry.counter("hits_total", "Hits", ("cache",))
+    with pytest.raises(ValueError):
+        family.labels()
+    with pytest.raises(ValueError):
+        registry.gauge("hits_total", "Hits")
+
+
+def test_histogram_percentile_interpolates_within_bucket():
+    histogram = Histogram(buckets=(10, 20))
+    for value in (12, 14, 16, 18):
+        histogram.observe(value)
+    assert 10 < histogram.percentile(50) <= 18
+    assert histogram.percentile(100) == 18
+    assert Histogram().percentile(99) == 0.0
+    assert histogram.buckets[-1] == math.inf
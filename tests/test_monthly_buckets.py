@@ -0,0 +1,181 @@
+"""
+Tests for the month-per-document workout log buckets
+
+@Date: 2026-10-17
+"""
+import asyncio
+import copy
+from datetime import datetime
+from types import SimpleNamespace
+import pytest
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+import daos.workout.monthly_workout_logs_dao as monthly
+import scripts.migrate_workout_log_storage as migration
+from daos.workout.monthly_workout_logs_dao import (
+    AsyncMonthlyWorkoutLogsDAO, bucket_projection, build_bucket, new_bucket, set_entry, to_log
+)
+
+USER_ID = str(ObjectId())
+MONTH = datetime(2024, 11, 1)
+NOW = datetime(2024, 11, 30, 12)
+
+
+def fields(calories, duration=30):
+    return {"workout_content": "Running", "total_weight_lost": 0.5, "total_calories_burnt": calories,
+            "avg_workout_duration": duration}
+
+
+def test_set_entry_creates_in_date_order_and_recomputes_totals():
+    bucket = new_bucket(USER_ID, MONTH)
+    assert set_entry(bucket, datetime(2024, 11, 20), fields(500), NOW)[0] is None
+    before, entry = set_entry(bucket, datetime(2024, 11, 3), fields(300), NOW)
+    assert before is None and entry["created_at"] == NOW
+    assert [day["log_date"].day for day in bucket["days"]] == [3, 20]
+    assert bucket["totals"] == {"total_weight_lost": 1.0, "total_calories_burnt": 800.0, "total_duration": 60,
+                                "total_sessions": 2}
+
+
+def test_set_entry_updates_an_existing_day():
+    bucket = new_bucket(USER_ID, MONTH)
+    _, created = set_entry(bucket, datetime(2024, 11, 3), fields(300), NOW)
+    before, entry = set_entry(bucket, datetime(2024, 11, 3), {"total_calories_burnt": 450}, NOW)
+    assert before is created and entry["_id"] == created["_id"]
+    assert entry["total_calories_burnt"] == 450 and entry["workout_content"] == "Running"
+    assert bucket["totals"]["total_calories_burnt"] == 450.0 and bucket["totals"]["total_sessions"] == 1
+
+
+def test_set_entry_without_create_leaves_missing_days():
+    bucket = new_bucket(USER_ID, MONTH)
+    assert set_entry(bucket, datetime(2024, 11, 3), fields(300), NOW, create=False) is None
+    assert bucket["days"] == []
+
+
+def test_to_log_shapes_a_daily_document():
+    bucket = build_bucket(USER_ID, MONTH, [{"_id": ObjectId(), "user_id": USER_ID, "is_deleted": False,
+                                            "log_date": datetime(2024, 11, 3), **fields(300)}])
+    entry = bucket["days"][0]
+    assert "user_id" not in entry and "is_deleted" not in entry
+    log = to_log(USER_ID, entry)
+    assert log["user_id"] == USER_ID and log["is_deleted"] is False and log["total_calories_burnt"] == 300
+    assert to_log(USER_ID, entry, {"log_date": 1}) == {"_id": entry["_id"], "log_date": entry["log_date"]}
+    assert to_log(USER_ID, entry, {"_id": 0, "log_date": 1}) == {"log_date": entry["log_date"]}
+
+
+def test_bucket_projection():
+    assert bucket_projection(None) is None
+    assert bucket_projection({"_id": 0, "total_calories_burnt": 1}) == {
+        "user_id": 1, "month": 1, "days.log_date": 1, "days.total_calories_burnt": 1}
+
+
+class FakeBucketClient:
+    """Holds one bucket; the first `conflicts` saves find its version already changed"""
+
+    def __init__(self, bucket=None, conflicts=0, duplicate_inserts=0):
+        self.bucket = bucket
+        self.conflicts = conflicts
+        self.duplicate_inserts = duplicate_inserts
+        self.saves = []
+
+    async def find_one(self, collection_name, query):
+        return copy.deepcopy(self.bucket)
+
+    async def insert_one(self, collection_name, document):
+        if self.duplicate_inserts:
+            self.duplicate_inserts -= 1
+            self.bucket = {**new_bucket(USER_ID, MONTH), "_id": document["_id"], "version": 1}
+            raise DuplicateKeyError("user_id_1_month_1")
+        self.bucket = document
+        self.saves.append(document)
+
+    async def update_one(self, collection_name, query, update):
+        if self.conflicts:
+            self.conflicts -= 1
+            self.bucket["version"] += 1  # Another writer saved the month first
+            return SimpleNamespace(matched_count=0)
+        assert query["version"] == self.bucket["version"]
+        self.bucket = {**self.bucket, **update["$set"], "version": self.bucket["version"] + update["$inc"]["version"]}
+        self.saves.append(self.bucket)
+        return SimpleNamespace(matched_count=1)
+
+
+def write(client, calories):
+    dao = AsyncMonthlyWorkoutLogsDAO(db_client=client, progress_dao=object())
+    modify = lambda bucket: [set_entry(bucket, datetime(2024, 11, 3), fields(calories), NOW)]
+    return asyncio.run(dao._write_bucket(USER_ID, MONTH, modify))
+
+
+def test_write_creates_a_missing_bucket_at_version_1():
+    client = FakeBucketClient()
+    write(client, 300)
+    assert client.bucket["version"] == 1 and len(client.bucket["days"]) == 1
+
+
+def test_write_retries_after_losing_the_insert_race():
+    client = FakeBucketClient(duplicate_inserts=1)
+    write(client, 300)
+    assert client.bucket["version"] == 2 and client.bucket["totals"]["total_calories_burnt"] == 300.0
+
+
+def test_write_retries_when_the_version_changed():
+    existing = {**new_bucket(USER_ID, MONTH), "version": 3}
+    client = FakeBucketClient(existing, conflicts=2)
+    write(client, 300)
+    assert len(client.saves) == 1 and client.bucket["version"] == 6
+
+
+def test_write_gives_up_on_a_contended_month(monkeypatch):
+    monkeypatch.setattr(monthly, "BUCKET_WRITE_RETRIES", 2)
+    client = FakeBucketClient({**new_bucket(USER_ID, MONTH), "version": 1}, conflicts=5)
+    with pytest.raises(RuntimeError):
+        write(client, 300)
+    assert client.saves == []
+
+
+class FakeLogsCollection:
+    """Applies upserting ReplaceOne / UpdateOne($set, $setOnInsert) matched on equality; _id never changes"""
+
+    def __init__(self, documents=()):
+        self.documents = [dict(document) for document in documents]
+
+    def bulk_write(self, operations, ordered=True):
+        for operation in operations:
+            query, update = operation._filter, operation._doc
+            fields = update.get("$set", update)
+            match = next((document for document in self.documents
+                          if all(document.get(key) == value for key, value in query.items())), None)
+            if match is None:
+                self.documents.append({**query, **update.get("$setOnInsert", {}), **fields})
+                continue
+            assert fields.get("_id", match["_id"]) == match["_id"], "_id is immutable"
+            if "$set" not in update:
+                for key in set(match) - {"_id"}:
+                    del match[key]
+            match.update(fields)
+
+
+class FakeMigrationClient:
+    def __init__(self, buckets, logs=()):
+        self.buckets = buckets
+        self.db = {"daily_workout_logs": FakeLogsCollection(logs)}
+
+    def iter_many(self, collection_name, query, sort=None):
+        return iter(self.buckets)
+
+
+def test_to_daily_can_be_rerun_over_existing_logs():
+    user_id = ObjectId()
+    bucket = build_bucket(user_id, MONTH, [
+        {"_id": ObjectId(), "log_date": datetime(2024, 11, 3), **fields(300)},
+        {"_id": ObjectId(), "log_date": datetime(2024, 11, 4), **fields(400)},
+    ])
+    # A soft-deleted daily log left over for the 3rd, with another _id than the bucket entry
+    deleted = {"_id": ObjectId(), "user_id": user_id, "log_date": datetime(2024, 11, 3), "is_deleted": True,
+               **fields(100)}
+    client = FakeMigrationClient([bucket], [deleted])
+    assert migration.to_daily(client) == 2
+    assert migration.to_daily(client) == 2  # Re-run over its own output
+
+    logs = sorted(client.db["daily_workout_logs"].documents, key=lambda log: log["log_date"])
+    assert [log["_id"] for log in logs] == [deleted["_id"], bucket["days"][1]["_id"]]
+    assert [(log["total_calories_burnt"], log["is_deleted"]) for log in logs] == [(300, False), (400, False)]
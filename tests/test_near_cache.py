@@ -0,0 +1,68 @@
+"""
+Tests for the near cache read-through guards
+
+@Date: 2026-10-17
+"""
+import asyncio
+from bson.objectid import ObjectId
+from daos.user.users_dao import AsyncUserDAO
+from utils.cache import NearCache, TTLCache
+
+USER_ID = ObjectId()
+
+
+def test_set_after_invalidation_of_a_tag_is_skipped():
+    cache = TTLCache(maxsize=8)
+    generation = cache.generation
+    cache.invalidate_tag("user-1")
+    assert cache.set("id:user-1", {"role": "admin"}, tags=("user-1",), generation=generation) is False
+    assert cache.get("id:user-1") is None
+    # Other tags are not affected
+    assert cache.set("id:user-2", {"role": "user"}, tags=("user-2",), generation=generation) is True
+
+
+def test_clear_and_forgotten_markers_are_conservative():
+    cache = TTLCache(maxsize=2)
+    generation = cache.generation
+    cache.clear()
+    assert cache.set("a", {"v": 1}, tags=("a",), generation=generation) is False
+
+    generation = cache.generation
+    for tag in ("b", "c", "d"):  # More markers than maxsize: "b" is forgotten
+        cache.invalidate_tag(tag)
+    assert cache.set("b", {"v": 1}, tags=("b",), generation=generation) is False
+    assert cache.set("e", {"v": 1}, tags=("e",), generation=cache.generation) is True
+
+
+class RacingUsersClient:
+    """Returns the stored user, letting a concurrent write land while the query is in flight"""
+
+    def __init__(self, user):
+        self.user = user
+        self.during_query = None
+        self.queries = 0
+
+    async def find_many(self, collection_name, query, projection=None):
+        self.queries += 1
+        found = [dict(self.user)]
+        if self.during_query is not None:
+            during_query, self.during_query = self.during_query, None
+            await during_query()
+        return found
+
+
+def test_load_racing_with_a_write_does_not_cache_the_old_user():
+    client = RacingUsersClient({"_id": USER_ID, "email": "a@example.com", "role": "admin"})
+    dao = AsyncUserDAO(db_client=client, cache=NearCache("test_users_race"))
+
+    async def demote():
+        client.user = {**client.user, "role": "user"}
+        await dao.invalidate(USER_ID, "a@example.com")
+
+    async def run():
+        client.during_query = demote
+        assert (await dao.get_user_by_id(USER_ID))["role"] == "admin"  # Read before the write
+        return await dao.get_user_by_id(USER_ID)
+
+    assert asyncio.run(run())["role"] == "user"
+    assert client.queries == 2
@@ -0,0 +1,21 @@
+"""
+Tests for the keyset pagination cursor of the workout log listing
+
+@Date: 2026-10-17
+"""
+from datetime import datetime
+import pytest
+from services.workout.daily_workout_logs_service import decode_page_cursor, encode_page_cursor
+
+
+def test_cursor_roundtrip():
+    log_date = datetime(2024, 11, 25)
+    cursor = encode_page_cursor(log_date)
+    assert "=" not in cursor
+    assert decode_page_cursor(cursor) == log_date
+
+
+@pytest.mark.parametrize("cursor", ["", "junk!", "bm90IGpzb24", "eyJiZWZvcmUiOiAxfQ", "eyJhZnRlciI6ICJ4In0"])
+def test_malformed_cursor(cursor):
+    with pytest.raises(ValueError):
+        decode_page_cursor(cursor)
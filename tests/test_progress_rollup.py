@@ -0,0 +1,104 @@
+"""
+Tests for the progress rollup deltas
+
+@Date: 2026-10-17
+"""
+import asyncio
+from datetime import datetime
+from bson.objectid import ObjectId
+from daos.workout.user_progress_dao import (
+    AsyncUserProgressDAO, build_progress_inc, build_rollup, bucket_keys, merge_inc, parse_rollup
+)
+from services.workout.daily_workout_logs_service import DailyWorkoutLogsService
+from utils.cache import NearCache
+
+LOG_DATE = datetime(2024, 11, 27)  # A Wednesday
+DAY, WEEK, MONTH = "2024-11-27", "2024-11-25", "2024-11-01"
+USER_ID = ObjectId()
+
+
+def log(calories, duration=30, weight=0.5, **fields):
+    return {"log_date": LOG_DATE, "total_calories_burnt": calories, "avg_workout_duration": duration,
+            "total_weight_lost": weight, **fields}
+
+
+def test_bucket_keys():
+    assert bucket_keys(LOG_DATE) == (DAY, WEEK, MONTH)
+
+
+def test_created_log_adds_a_session():
+    inc = build_progress_inc(LOG_DATE, None, log(500))
+    assert inc["totals.total_calories_burnt"] == 500
+    assert inc[f"weeks.{WEEK}.total_workout_time"] == 30
+    assert inc[f"months.{MONTH}.sessions"] == 1
+    assert inc["totals.total_sessions"] == 1
+
+
+def test_updated_log_moves_by_the_difference_only():
+    inc = build_progress_inc(LOG_DATE, log(500), log(650))
+    assert inc == {"totals.total_calories_burnt": 150, f"days.{DAY}.total_calories_burnt": 150,
+                   f"weeks.{WEEK}.total_calories_burnt": 150, f"months.{MONTH}.total_calories_burnt": 150}
+
+
+def test_unchanged_log_is_empty():
+    assert build_progress_inc(LOG_DATE, log(500), log(500)) == {}
+
+
+def test_deleted_log_removes_its_values():
+    inc = build_progress_inc(LOG_DATE, log(500), log(500, is_deleted=True))
+    assert inc["totals.total_calories_burnt"] == -500
+    assert inc["totals.total_sessions"] == -1
+
+
+def test_missing_values_count_as_zero():
+    inc = build_progress_inc(LOG_DATE, None, {"log_date": LOG_DATE, "total_calories_burnt": None})
+    assert inc == {"totals.total_sessions": 1, f"days.{DAY}.sessions": 1, f"weeks.{WEEK}.sessions": 1,
+                   f"months.{MONTH}.sessions": 1}
+
+
+def test_merge_inc_adds_deltas_in_place():
+    target = {"totals.total_sessions": 1}
+    assert merge_inc(target, {"totals.total_sessions": 2, "totals.total_duration": 30}) is target
+    assert target == {"totals.total_sessions": 3, "totals.total_duration": 30}
+
+
+def test_rollup_matches_merged_deltas():
+    logs = [log(500), {**log(300), "log_date": datetime(2024, 12, 2)}]
+    rollup = build_rollup(logs)
+    assert rollup["totals"] == {"total_weight_lost": 1.0, "total_calories_burnt": 800, "total_duration": 60,
+                                "total_sessions": 2}
+    progress = parse_rollup(rollup, "month")
+    assert [bucket["total_calories_burnt"] for bucket in progress["buckets"]] == [500, 300]
+
+
+def test_day_buckets_are_kept():
+    inc = build_progress_inc(LOG_DATE, None, log(500))
+    assert inc[f"days.{DAY}.total_calories_burnt"] == 500
+    assert inc[f"days.{DAY}.sessions"] == 1
+    progress = parse_rollup(build_rollup([log(500), {**log(300), "log_date": datetime(2024, 12, 2)}]), "day")
+    assert [bucket["period_start"] for bucket in progress["buckets"]] == [LOG_DATE, datetime(2024, 12, 2)]
+
+
+class FakeRollupClient:
+    def __init__(self, document):
+        self.document = document
+
+    async def find_one(self, collection_name, query, include_deleted=False, projection=None):
+        return self.document
+
+
+class NoAggregationDAO:
+    async def calculate_progress(self, *args, **kwargs):
+        raise AssertionError("whole-history progress must be read from the rollup")
+
+
+def test_default_progress_reads_the_rollup_only():
+    document = {"user_id": USER_ID, **build_rollup([log(500), log(300, duration=40)])}
+    progress_dao = AsyncUserProgressDAO(db_client=FakeRollupClient(document), cache=NearCache("test_progress"))
+    service = DailyWorkoutLogsService(dao=NoAggregationDAO(), progress_dao=progress_dao)
+    result = asyncio.run(service.calculate_total_progress(str(USER_ID)))
+    assert result["key_statistics"]["total_calories_burnt"] == 800
+    assert result["key_statistics"]["avg_workout_duration_per_session"] == 35
+    assert result["daily_progress"] == [
+        {"log_date": "2024-11-27", "total_workout_time": 70, "total_calories_burnt": 800}
+    ]
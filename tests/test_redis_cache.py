@@ -0,0 +1,190 @@
+"""
+Tests for the Redis shared cache backend and the invalidation bus, against an
+in-memory stand-in for the redis.asyncio client
+
+@Date: 2026-10-17
+"""
+import asyncio
+from datetime import datetime
+import bson
+from bson.objectid import ObjectId
+import utils.cache as cache_module
+from utils.cache import CacheInvalidationBus, NearCache, RedisCacheBackend
+
+
+def _name(key):
+    return key.decode() if isinstance(key, bytes) else key
+
+
+class FakeRedis:
+    """The redis.asyncio client calls RedisCacheBackend makes, in memory (no expiry)"""
+
+    def __init__(self):
+        self.values = {}
+        self.sets = {}
+        self.subscribers = {}  # channel -> subscriber queues
+
+    async def get(self, key):
+        return self.values.get(_name(key))
+
+    async def mget(self, keys):
+        return [self.values.get(_name(key)) for key in keys]
+
+    async def set(self, key, value, ex=None):
+        self.values[_name(key)] = value if isinstance(value, bytes) else str(value).encode()
+
+    async def incr(self, key):
+        value = int(self.values.get(_name(key), b"0")) + 1
+        self.values[_name(key)] = str(value).encode()
+        return value
+
+    async def sadd(self, key, *members):
+        self.sets.setdefault(_name(key), set()).update(member.encode() for member in members)
+
+    async def expire(self, key, seconds):
+        pass
+
+    async def smembers(self, key):
+        return set(self.sets.get(_name(key), ()))
+
+    async def delete(self, *keys):
+        for key in map(_name, keys):
+            self.values.pop(key, None)
+            self.sets.pop(key, None)
+
+    async def publish(self, channel, message):
+        for queue in self.subscribers.get(channel, []):
+            queue.put_nowait({"type": "message", "channel": channel.encode(), "data": message.encode()})
+
+    def disconnect(self):
+        """Drop every pub/sub connection"""
+        for queues in self.subscribers.values():
+            for queue in queues:
+                queue.put_nowait(ConnectionError("connection lost"))
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def pubsub(self):
+        return FakePubSub(self)
+
+    async def aclose(self):
+        pass
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.calls = []
+
+    def __getattr__(self, name):
+        method = getattr(self.client, name)
+        return lambda *args, **kwargs: self.calls.append((method, args, kwargs))
+
+    async def execute(self):
+        return [await method(*args, **kwargs) for method, args, kwargs in self.calls]
+
+
+class FakePubSub:
+    def __init__(self, client):
+        self.client = client
+        self.queue = asyncio.Queue()
+        self.channels = []
+
+    async def subscribe(self, channel):
+        self.client.subscribers.setdefault(channel, []).append(self.queue)
+        self.channels.append(channel)
+
+    async def listen(self):
+        while True:
+            message = await self.queue.get()
+            if isinstance(message, Exception):
+                raise message
+            yield message
+
+    async def aclose(self):
+        for channel in self.channels:
+            self.client.subscribers[channel].remove(self.queue)
+
+
+async def settle():
+    for _ in range(20):
+        await asyncio.sleep(0)
+
+
+def test_documents_round_trip_bson_encoded():
+    redis = FakeRedis()
+    backend = RedisCacheBackend(client=redis)
+    document = {"_id": ObjectId(), "created_at": datetime(2024, 11, 27, 8, 30)}
+
+    async def run():
+        await backend.set("users:id:1", document, ttl=60, tags=["users:1"])
+        return await backend.get("users:id:1"), await backend.get("users:id:2")
+
+    assert asyncio.run(run()) == (document, None)
+    assert bson.decode(redis.values["cache:users:id:1"]) == document
+    assert (backend.hits, backend.misses) == (1, 1)
+
+
+def test_tag_invalidation_drops_every_tagged_key():
+    redis = FakeRedis()
+    backend = RedisCacheBackend(client=redis)
+
+    async def run():
+        await backend.set("id:1", {"v": 1}, tags=["user:1"])
+        await backend.set("email:a", {"v": 1}, tags=["user:1", "email:a"])
+        await backend.set("id:2", {"v": 2}, tags=["user:2"])
+        await backend.invalidate_tags(["user:1"])
+        return [await backend.get(key) for key in ("id:1", "email:a", "id:2")]
+
+    assert asyncio.run(run()) == [None, None, {"v": 2}]
+    assert "cache:tag:user:1" not in redis.sets
+
+
+def test_set_racing_with_an_invalidation_is_dropped():
+    backend = RedisCacheBackend(client=FakeRedis())
+
+    async def run():
+        generation = await backend.generation()
+        await backend.invalidate_tags(["user:1"])  # A write lands while the value is loaded
+        stale = await backend.set("id:1", {"role": "admin"}, tags=["user:1"], generation=generation)
+        fresh = await backend.set("id:2", {"role": "user"}, tags=["user:2"], generation=generation)
+        return stale, fresh, await backend.get("id:1"), await backend.get("id:2")
+
+    assert asyncio.run(run()) == (False, True, None, {"role": "user"})
+
+
+def test_invalidation_reaches_the_local_copy_of_another_worker(monkeypatch):
+    real_sleep = asyncio.sleep
+    monkeypatch.setattr(cache_module.asyncio, "sleep", lambda seconds: real_sleep(0))  # Reconnect at once
+    redis = FakeRedis()
+    worker_a = NearCache("tests_redis_workers", shared=RedisCacheBackend(client=redis))
+    worker_b = NearCache("tests_redis_workers", shared=RedisCacheBackend(client=redis))  # Registered last
+
+    async def run():
+        bus_b = CacheInvalidationBus()  # Worker B's listener, with its own origin
+        bus_b.start(worker_b.shared)
+        await settle()
+        await worker_a.set("id:1", {"role": "admin"}, tags=("1",))
+        assert await worker_b.get("id:1") == {"role": "admin"}  # Now also held in B's memory
+
+        await worker_a.invalidate("1")
+        await settle()
+        local_after_invalidation = await worker_b.local.get("id:1")
+        shared_after_invalidation = await worker_b.get("id:1")
+
+        await worker_b.local.set("id:2", {"role": "user"})
+        redis.disconnect()  # B may miss messages until it is subscribed again
+        await settle()
+        local_after_reconnect = await worker_b.local.get("id:2")
+        subscribers = len(redis.subscribers[cache_module.INVALIDATION_CHANNEL])
+        await bus_b.stop()
+        return local_after_invalidation, shared_after_invalidation, local_after_reconnect, subscribers
+
+    assert asyncio.run(run()) == (None, None, None, 1)
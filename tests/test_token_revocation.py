@@ -0,0 +1,68 @@
+"""
+Tests for user-wide token revocation at the millisecond boundary
+
+@Date: 2026-10-17
+"""
+import asyncio
+import time
+import pytest
+from bson.objectid import ObjectId
+from fastapi import HTTPException
+from jose import jwt
+from daos.user.token_denylist import AsyncTokenDenylist
+from services.user.auth_service import AuthService, epoch_millis
+
+SECRET_KEY = "test-secret"
+
+
+class FakeDenylistClient:
+    """Accepts writes; lookups find nothing, so decisions come from the in-memory entries"""
+
+    async def update_one(self, collection_name, query, update, upsert=False):
+        pass
+
+    async def find_many(self, collection_name, query, include_deleted=False):
+        return []
+
+
+@pytest.fixture
+def auth_service(monkeypatch):
+    monkeypatch.setenv("SECRET_KEY", SECRET_KEY)
+    return AuthService(user_service=object(), token_denylist=AsyncTokenDenylist(db_client=FakeDenylistClient()))
+
+
+def token(user_id, issued_at):
+    return jwt.encode({"user_id": user_id, "iat": issued_at, "exp": int(time.time()) + 3600}, SECRET_KEY)
+
+
+def test_epoch_millis_truncates():
+    assert epoch_millis(1700000000.1239) == 1700000000123
+
+
+def test_tokens_issued_before_the_revocation_millisecond_boundary(auth_service):
+    user_id = str(ObjectId())
+
+    async def run():
+        await auth_service.revoke_user_tokens(user_id)
+        revoked_before = auth_service.token_denylist.user_revocations[user_id][0]
+        last_revoked = token(user_id, (round(revoked_before * 1000) - 1) / 1000)  # The millisecond before
+        first_valid = token(user_id, revoked_before)
+        with pytest.raises(HTTPException):
+            await auth_service.authenticate(last_revoked)
+        return await auth_service.authenticate(first_valid)
+
+    assert asyncio.run(run()) == user_id
+
+
+def test_logins_right_after_a_revocation_stay_valid(auth_service):
+    async def run():
+        for _ in range(20):  # Most of these log in within the millisecond of the revocation
+            user_id = str(ObjectId())
+            revoked = auth_service._generate_tokens(user_id)
+            await auth_service.revoke_user_tokens(user_id)
+            after = auth_service._generate_tokens(user_id)
+            with pytest.raises(HTTPException):
+                await auth_service.authenticate(revoked)
+            assert await auth_service.authenticate(after) == user_id
+
+    asyncio.run(run())
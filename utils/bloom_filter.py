@@ -0,0 +1,67 @@
+"""
+Bloom Filter
+
+Compact probabilistic set: `item in bloom` is never wrong when it answers False, and
+answers True for an absent item with roughly the configured error rate.
+
+@Date: 2026-10-16
+"""
+import hashlib
+import math
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate=0.01, num_bits=None, num_hashes=None, bits=None, count=0):
+        """
+        :param capacity: Expected number of items
+        :param error_rate: Target false-positive rate at capacity
+        :param num_bits, num_hashes, bits, count: Restore a saved filter (see from_document)
+        """
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = num_bits or max(8, math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = num_hashes or max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray(bits) if bits is not None else bytearray((self.num_bits + 7) // 8)
+        self.count = count
+
+    def _positions(self, item):
+        """Bit positions of an item (Kirsch-Mitzenmacher double hashing over one digest)"""
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, item):
+        added = False
+        for position in self._positions(item):
+            mask = 1 << (position & 7)
+            if not self.bits[position >> 3] & mask:
+                self.bits[position >> 3] |= mask
+                added = True
+        if added:
+            self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    def to_document(self):
+        """Serializable form, restorable with from_document"""
+        return {
+            "capacity": self.capacity,
+            "error_rate": self.error_rate,
+            "num_bits": self.num_bits,
+            "num_hashes": self.num_hashes,
+            "count": self.count,
+            "bits": bytes(self.bits),
+        }
+
+    @classmethod
+    def from_document(cls, document):
+        return cls(
+            document["capacity"],
+            document["error_rate"],
+            num_bits=document["num_bits"],
+            num_hashes=document["num_hashes"],
+            bits=document["bits"],
+            count=document.get("count", 0),
+        )
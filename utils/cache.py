@@ -0,0 +1,524 @@
+"""
+Caching Utilities
+
+- TTLCache: bounded in-process LRU + TTL store with tag-based invalidation
+- MemoryCacheBackend / RedisCacheBackend: the per-process and the shared (Redis protocol)
+  cache backends
+- NearCache: what the DAOs use. It answers reads from process memory first, falls back
+  to the shared backend, and on writes drops the entry everywhere. Other workers are told
+  through a pub/sub channel to drop their local copies.
+
+Read-through loads take a generation() before querying the database and pass it to
+set(): a value loaded before an invalidation of any of its tags is not cached, so a
+load racing with a write cannot put the pre-write document back.
+
+Without CACHE_REDIS_URL only the in-process layer is used, which is only coherent with a
+single worker process.
+
+@Date: 2026-10-16
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+import bson
+from utils.env_loader import load_platform_specific_env
+from utils.logger import Logger
+from utils.metrics import metrics_registry
+
+load_platform_specific_env()
+logger = Logger(__name__)
+
+# Shared backend; unset means in-process caching only
+CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL')
+# Upper bound on how long a worker keeps a local copy when a shared backend is used,
+# in case an invalidation message is missed
+CACHE_NEAR_TTL_SECONDS = int(os.getenv('CACHE_NEAR_TTL_SECONDS', 60))
+# How long the shared backend remembers that a tag was invalidated (must exceed any load)
+CACHE_INVALIDATION_MARKER_SECONDS = int(os.getenv('CACHE_INVALIDATION_MARKER_SECONDS', 60))
+INVALIDATION_CHANNEL = "cache:invalidations"
+
+# Every NearCache created in this process, by name (the caches the invalidation bus reaches)
+_caches = {}
+# Every create_local_cache TTLCache, by name: stats only, never invalidated remotely
+_local_caches = {}
+_shared_backend = None
+
+
+class TTLCache:
+    def __init__(self, maxsize=1024, ttl=60):
+        """
+        :param maxsize: Maximum number of entries before LRU eviction
+        :param ttl: Default time-to-live in seconds
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, value, tags)
+        self._tags = {}  # tag -> set of keys
+        self.generation = 0  # Bumped by every invalidation
+        self._invalidated = OrderedDict()  # tag -> generation of its last invalidation (bounded)
+        self._forgotten = 0  # Loads from before this generation may be stale
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """Return the cached value, or None on a miss or an expired entry"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl=None, tags=(), generation=None):
+        """
+        Store a value (None values are not cached).
+        :param ttl: Override the default TTL for this entry
+        :param tags: Tags that invalidate_tag can later drop this entry by
+        :param generation: self.generation read before the value was loaded; the value is
+            not stored if one of its tags was invalidated since
+        :return: True if the value was stored
+        """
+        if value is None:
+            return False
+        with self._lock:
+            if generation is not None and self._invalidated_since(generation, tags):
+                return False
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + (ttl if ttl is not None else self.ttl), value, tuple(tags))
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+        return True
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+                self.invalidations += 1
+
+    def invalidate_tag(self, tag):
+        """Drop every entry stored with the given tag"""
+        with self._lock:
+            for key in list(self._tags.get(tag, ())):
+                self._remove(key)
+                self.invalidations += 1
+            self.generation += 1
+            self._invalidated[tag] = self.generation
+            self._invalidated.move_to_end(tag)
+            if len(self._invalidated) > self.maxsize:
+                _, forgotten = self._invalidated.popitem(last=False)
+                self._forgotten = max(self._forgotten, forgotten)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            # Whatever was loaded before may have missed an invalidation
+            self.generation += 1
+            self._invalidated.clear()
+            self._forgotten = self.generation
+
+    def _invalidated_since(self, generation, tags):
+        """Whether any of the tags may have been invalidated after generation (lock must be held)"""
+        if generation < self._forgotten:
+            return True
+        return any(self._invalidated.get(tag, 0) > generation for tag in tags)
+
+    def _remove(self, key):
+        """Remove an entry and its tag references (lock must be held)"""
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+class CacheBackend:
+    """Interface of a cache backend. Values are documents (dicts)."""
+    name = "base"
+
+    async def get(self, key):
+        raise NotImplementedError
+
+    async def generation(self):
+        """Current invalidation generation, to pass to set() after a load"""
+        raise NotImplementedError
+
+    async def set(self, key, value, ttl, tags=(), generation=None):
+        """
+        :param generation: generation() read before the value was loaded; the value is not
+            kept if one of its tags was invalidated since
+        :return: True if the value was stored
+        """
+        raise NotImplementedError
+
+    async def invalidate_tags(self, tags):
+        raise NotImplementedError
+
+    async def publish(self, message):
+        """Broadcast an invalidation message to every process"""
+        raise NotImplementedError
+
+    async def listen(self):
+        """Async iterator over invalidation messages published by any process"""
+        raise NotImplementedError
+        yield
+
+    async def close(self):
+        pass
+
+
+class MemoryCacheBackend(CacheBackend):
+    """In-process LRU backend. Nothing is shared, so publish/listen are no-ops."""
+    name = "memory"
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self.store = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def get(self, key):
+        return self.store.get(key)
+
+    async def generation(self):
+        return self.store.generation
+
+    async def set(self, key, value, ttl=None, tags=(), generation=None):
+        return self.store.set(key, value, ttl=ttl, tags=tags, generation=generation)
+
+    async def invalidate_tags(self, tags):
+        for tag in tags:
+            self.store.invalidate_tag(tag)
+
+    async def publish(self, message):
+        pass
+
+    async def listen(self):
+        return
+        yield
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Shared backend speaking the Redis protocol. Documents are stored BSON-encoded so
+    ObjectId and datetime values survive the round trip; tags are Redis sets of keys.
+
+    Invalidations increment a generation counter and leave a marker per tag holding it.
+    set() with a generation writes first and then checks the markers: if an invalidation
+    raced with the load it deletes its own entry, and an invalidation that comes later
+    finds the entry in the tag set and deletes it.
+    """
+    name = "redis"
+
+    def __init__(self, url=None, client=None, prefix="cache"):
+        """
+        :param url: redis:// URL (ignored when client is given)
+        :param client: Existing redis.asyncio-compatible client (e.g. a local stand-in in tests)
+        """
+        if client is None:
+            import redis.asyncio as redis_asyncio  # Only needed when a shared backend is configured
+            client = redis_asyncio.from_url(url)
+        self.client = client
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, key):
+        return f"{self.prefix}:{key}"
+
+    def _tag_key(self, tag):
+        return f"{self.prefix}:tag:{tag}"
+
+    def _marker_key(self, tag):
+        return f"{self.prefix}:invalidated:{tag}"
+
+    def _generation_key(self):
+        return f"{self.prefix}:generation"
+
+    async def get(self, key):
+        data = await self.client.get(self._key(key))
+        if data is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return bson.decode(data)
+
+    async def generation(self):
+        return int(await self.client.get(self._generation_key()) or 0)
+
+    async def set(self, key, value, ttl=None, tags=(), generation=None):
+        if value is None:
+            return False
+        redis_key = self._key(key)
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.set(redis_key, bson.encode(value), ex=ttl)
+            for tag in tags:
+                pipe.sadd(self._tag_key(tag), redis_key)
+                if ttl:
+                    pipe.expire(self._tag_key(tag), ttl)
+            await pipe.execute()
+        if generation is not None and tags:
+            markers = await self.client.mget([self._marker_key(tag) for tag in tags])
+            if any(int(marker) > generation for marker in markers if marker is not None):
+                await self.client.delete(redis_key)
+                return False
+        return True
+
+    async def invalidate_tags(self, tags):
+        if not tags:
+            return
+        # Markers first: a concurrent set() either sees them or is already in the tag sets
+        generation = await self.client.incr(self._generation_key())
+        async with self.client.pipeline(transaction=False) as pipe:
+            for tag in tags:
+                pipe.set(self._marker_key(tag), generation, ex=CACHE_INVALIDATION_MARKER_SECONDS)
+            await pipe.execute()
+        for tag in tags:
+            tag_key = self._tag_key(tag)
+            keys = await self.client.smembers(tag_key)
+            await self.client.delete(tag_key, *keys)
+
+    async def publish(self, message):
+        await self.client.publish(INVALIDATION_CHANNEL, json.dumps(message))
+
+    async def listen(self):
+        pubsub = self.client.pubsub()
+        await pubsub.subscribe(INVALIDATION_CHANNEL)
+        try:
+            async for message in pubsub.listen():
+                if message.get("type") == "message":
+                    yield json.loads(message["data"])
+        finally:
+            await pubsub.aclose()
+
+    async def close(self):
+        await self.client.aclose()
+
+
+class NearCache:
+    def __init__(self, name, maxsize=1024, ttl=60, shared=None):
+        """
+        :param name: Cache name (namespaces shared keys and invalidation messages)
+        :param maxsize: Maximum number of entries kept in this process
+        :param ttl: Time-to-live in seconds
+        :param shared: Optional shared CacheBackend behind the in-process layer
+        """
+        self.name = name
+        self.ttl = ttl
+        self.shared = shared
+        local_ttl = min(ttl, CACHE_NEAR_TTL_SECONDS) if shared else ttl
+        self.local = MemoryCacheBackend(maxsize=maxsize, ttl=local_ttl)
+        _caches[name] = self
+
+    def _shared_key(self, key):
+        return f"{self.name}:{key}"
+
+    def _shared_tags(self, tags):
+        return [f"{self.name}:{tag}" for tag in tags]
+
+    async def get(self, key):
+        value = await self.local.get(key)
+        if value is None and self.shared is not None:
+            generation = await self.local.generation()
+            try:
+                envelope = await self.shared.get(self._shared_key(key))
+            except Exception as e:
+                logger.warning(f"Shared cache read failed for '{self.name}': {e}")
+                return None
+            if envelope is not None:
+                # Keep the tags so invalidations from other workers also drop the local copy
+                value = envelope["value"]
+                await self.local.set(key, value, tags=envelope["tags"], generation=generation)
+        return value
+
+    async def generation(self):
+        """
+        Read before loading a value from the database, and pass to set(): the value is
+        then only cached if none of its tags was invalidated in the meantime.
+        :return: Opaque token
+        """
+        local = await self.local.generation()
+        if self.shared is None:
+            return local, None
+        try:
+            return local, await self.shared.generation()
+        except Exception as e:
+            # The shared copy can then not be checked, so set() only fills the local layer
+            logger.warning(f"Shared cache read failed for '{self.name}': {e}")
+            return local, None
+
+    async def set(self, key, value, tags=(), generation=None):
+        """
+        :param generation: generation() read before the value was loaded (None to store unconditionally)
+        """
+        local_generation, shared_generation = generation if generation is not None else (None, None)
+        if self.shared is not None and (generation is None or shared_generation is not None):
+            try:
+                if not await self.shared.set(self._shared_key(key), {"value": value, "tags": list(tags)},
+                                             ttl=self.ttl, tags=self._shared_tags(tags),
+                                             generation=shared_generation):
+                    return  # Invalidated while it was loaded
+            except Exception as e:
+                logger.warning(f"Shared cache write failed for '{self.name}': {e}")
+        await self.local.set(key, value, tags=tags, generation=local_generation)
+
+    async def invalidate(self, *tags):
+        """Drop entries with any of the tags in this process, the shared backend and every other worker"""
+        tags = [tag for tag in tags if tag is not None]
+        await self.local.invalidate_tags(tags)
+        if self.shared is not None:
+            try:
+                await self.shared.invalidate_tags(self._shared_tags(tags))
+                await self.shared.publish({"origin": invalidation_bus.origin, "cache": self.name, "tags": tags})
+            except Exception as e:
+                logger.warning(f"Shared cache invalidation failed for '{self.name}': {e}")
+
+    def stats(self):
+        stats = {"name": self.name, **self.local.store.stats(), "shared": self.shared.name if self.shared else None}
+        if isinstance(self.shared, RedisCacheBackend):
+            stats["shared_hits"] = self.shared.hits
+            stats["shared_misses"] = self.shared.misses
+        return stats
+
+
+class CacheInvalidationBus:
+    """Applies invalidations published by other workers to this process's near caches."""
+
+    def __init__(self):
+        self.origin = uuid.uuid4().hex  # Identifies this process's own messages
+        self._task = None
+
+    def start(self, backend):
+        """Subscribe to the invalidation channel (no-op without a shared backend)"""
+        if backend is None or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._run(backend))
+        logger.info(f"Cache invalidation listener started (origin {self.origin}).")
+
+    async def _run(self, backend):
+        while True:
+            try:
+                async for message in backend.listen():
+                    if message.get("origin") == self.origin:
+                        continue
+                    cache = _caches.get(message.get("cache"))
+                    if cache is not None:
+                        await cache.local.invalidate_tags(message.get("tags", []))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Cache invalidation listener failed, reconnecting: {e}")
+            # Messages may have been missed while disconnected
+            for cache in _caches.values():
+                cache.local.store.clear()
+            await asyncio.sleep(1)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+invalidation_bus = CacheInvalidationBus()
+
+
+def get_shared_backend():
+    """Return the process-wide shared backend, or None when CACHE_REDIS_URL is not set"""
+    global _shared_backend
+    if _shared_backend is None and CACHE_REDIS_URL:
+        _shared_backend = RedisCacheBackend(CACHE_REDIS_URL)
+        logger.info("Using Redis shared cache backend.")
+    return _shared_backend
+
+
+def set_shared_backend(backend):
+    """Use the given backend as the shared layer for caches created from now on"""
+    global _shared_backend
+    _shared_backend = backend
+
+
+def create_cache(name, maxsize=1024, ttl=60):
+    """Create a NearCache on top of the configured shared backend (if any)"""
+    return NearCache(name, maxsize=maxsize, ttl=ttl, shared=get_shared_backend())
+
+
+async def close_shared_backend():
+    global _shared_backend
+    if _shared_backend is not None:
+        await _shared_backend.close()
+    _shared_backend = None
+
+
+def create_local_cache(name, maxsize=1024, ttl=60):
+    """
+    In-process TTLCache with a synchronous API, for values that must never leave this
+    worker (no shared backend). It is listed in get_cache_stats like the NearCaches.
+    """
+    cache = TTLCache(maxsize=maxsize, ttl=ttl)
+    _local_caches[name] = cache
+    return cache
+
+
+def get_cache_stats():
+    """Stats of every cache in this process"""
+    return {name: cache.stats() for name, cache in (*_caches.items(), *_local_caches.items())}
+
+
+# Cache stat -> (metric name, help, type) exposed on /metrics
+CACHE_METRICS = {
+    "size": ("cache_entries", "Entries held in the local cache", "gauge"),
+    "hits": ("cache_hits_total", "Local cache hits", "counter"),
+    "misses": ("cache_misses_total", "Local cache misses", "counter"),
+    "evictions": ("cache_evictions_total", "Entries evicted to respect maxsize", "counter"),
+    "expirations": ("cache_expirations_total", "Entries dropped after their ttl", "counter"),
+    "invalidations": ("cache_invalidations_total", "Entries dropped by writes", "counter"),
+}
+
+
+def collect_cache_metrics():
+    """Metrics collector reading every cache's stats at scrape time"""
+    stats = get_cache_stats()
+    return [
+        (metric, documentation, kind, [({"cache": name}, cache_stats[stat]) for name, cache_stats in stats.items()])
+        for stat, (metric, documentation, kind) in CACHE_METRICS.items()
+    ]
+
+
+metrics_registry.register_collector(collect_cache_metrics)
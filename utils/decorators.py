@@ -6,12 +6,16 @@ Custom JSON Encoder and Response Handler
 """
 import os
 from functools import wraps
-from fastapi.responses import JSONResponse
+from decimal import Decimal
+import orjson
+from fastapi.responses import JSONResponse, Response
 from marshmallow import ValidationError
 from fastapi import HTTPException
 from bson import ObjectId  # Import ObjectId for MongoDB handling
-from datetime import datetime  # Import datetime for date serialization
+from bson.decimal128 import Decimal128
+from datetime import date, datetime  # Import datetime for date serialization
 from utils.env_loader import load_platform_specific_env
+from utils.tracing import span
 import json
 import logging
 
@@ -20,15 +24,42 @@ load_platform_specific_env()
 
 logger = logging.getLogger(__name__)
 
+# Non-string dict keys (e.g. ints) become strings, as with the json module
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def json_default(obj):
+    """Serialize the types json / orjson do not handle natively"""
+    if isinstance(obj, ObjectId):
+        return str(obj)  # Convert ObjectId to string for serialization
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()  # Convert datetime to ISO 8601 string (orjson does this itself)
+    if isinstance(obj, Decimal128):
+        obj = obj.to_decimal()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps_json(data):
+    """Serialize data to JSON bytes in a single pass"""
+    return orjson.dumps(data, default=json_default, option=ORJSON_OPTIONS)
+
 
 # Custom JSONEncoder to handle ObjectId and datetime serialization
 class CustomJSONEncoder(json.JSONEncoder):
     def default(self, obj):
-        if isinstance(obj, ObjectId):
-            return str(obj)  # Convert ObjectId to string for serialization
-        elif isinstance(obj, datetime):
-            return obj.isoformat()  # Convert datetime to ISO 8601 string
-        return super().default(obj)
+        try:
+            return json_default(obj)
+        except TypeError:
+            return super().default(obj)
+
+
+class DocumentJSONResponse(JSONResponse):
+    """JSONResponse rendering documents (ObjectId, datetime, Decimal, ...) straight to bytes with orjson"""
+
+    def render(self, content) -> bytes:
+        return dumps_json(content)
 
 
 def handle_response(f):
@@ -36,7 +67,7 @@ def handle_response(f):
     Decorator to handle and standardize API responses.
 
     It wraps the original function to:
-    - Serialize the response using a custom JSON encoder.
+    - Serialize the response with orjson (ObjectId, datetime, date and Decimal included).
     - Handle exceptions and return appropriate HTTP responses.
     """
     @wraps(f)
@@ -45,8 +76,8 @@ def handle_response(f):
             # Call the original function and get its return value
             result = await f(*args, **kwargs)
 
-            # If the return value is already a JSONResponse, return it as-is
-            if isinstance(result, JSONResponse):
+            # If the return value is already a Response (JSON, streaming, ...), return it as-is
+            if isinstance(result, Response):
                 return result
 
             # If the return value is a tuple, unpack it into data and status_code
@@ -56,9 +87,9 @@ def handle_response(f):
                 data = result
                 status_code = 200  # Default status code is 200
 
-            # Serialize the data using the custom JSONEncoder
-            serialized_data = json.loads(CustomJSONEncoder().encode(data))
-            return JSONResponse(content=serialized_data, status_code=status_code)
+            # Serialize the data once, straight into the response body
+            with span("serialize"):
+                return DocumentJSONResponse(content=data, status_code=status_code)
 
         except ValidationError as e:
             logger.warning(f"ValidationError: {e.messages}")
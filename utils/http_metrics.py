@@ -0,0 +1,112 @@
+"""
+HTTP Metrics
+
+- MetricsMiddleware: pure ASGI middleware counting requests and timing them per route
+  template (e.g. /api/v1/workout/logs/{log_id}), so ids in paths do not multiply the
+  label sets. Requests no route matched share the 'unmatched' label.
+- EventLoopLagMonitor: background task measuring how late the event loop wakes up a
+  sleeping coroutine; sustained lag means blocking code is running on the loop.
+
+Both record into utils.metrics.metrics_registry, rendered by GET /metrics.
+
+@Date: 2026-10-16
+"""
+import asyncio
+import os
+import time
+from utils.env_loader import load_platform_specific_env
+from utils.logger import Logger
+from utils.metrics import metrics_registry
+
+load_platform_specific_env()
+logger = Logger(__name__)
+
+# Seconds between two event loop lag probes
+EVENT_LOOP_LAG_INTERVAL_SECONDS = float(os.getenv('EVENT_LOOP_LAG_INTERVAL_SECONDS', 0.5))
+# Lag histogram bucket bounds (seconds)
+EVENT_LOOP_LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+UNMATCHED_ROUTE = "unmatched"
+
+http_requests_total = metrics_registry.counter(
+    "http_requests_total", "HTTP requests handled", ("method", "route", "status"))
+http_request_duration_seconds = metrics_registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "route"))
+http_requests_in_flight = metrics_registry.gauge(
+    "http_requests_in_flight", "HTTP requests being handled")
+event_loop_lag_seconds = metrics_registry.histogram(
+    "event_loop_lag_seconds", "Delay of the event loop in waking up a timer", buckets=EVENT_LOOP_LAG_BUCKETS)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording request count, status and latency per route"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500  # Reported if the app fails before starting a response
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration = time.perf_counter() - start
+            http_requests_in_flight.dec()
+            # The router stores the matched route in the (shared) scope
+            route = getattr(scope.get("route"), "path", None) or UNMATCHED_ROUTE
+            method = scope["method"]
+            http_request_duration_seconds.labels(method, route).observe(duration)
+            http_requests_total.labels(method, route, str(status)).inc()
+
+
+class EventLoopLagMonitor:
+    def __init__(self, interval=EVENT_LOOP_LAG_INTERVAL_SECONDS):
+        self.interval = interval
+        self.last_lag = 0.0
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(loop.time() - start - self.interval, 0.0)
+            self.last_lag = lag
+            event_loop_lag_seconds.observe(lag)
+            if lag >= 1:
+                logger.warning(f"Event loop blocked for {lag:.2f} s")
+
+
+event_loop_lag_monitor = EventLoopLagMonitor()
+
+
+def collect_event_loop_metrics():
+    return [("event_loop_lag_last_seconds", "Event loop lag measured by the latest probe", "gauge",
+             [({}, event_loop_lag_monitor.last_lag)])]
+
+
+metrics_registry.register_collector(collect_event_loop_metrics)
@@ -1,12 +1,34 @@
+import atexit
 import logging
 import os
+import queue
+import sys
+import threading
+import time
 import uuid
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 import json
 from utils.env_loader import load_platform_specific_env
 
 load_platform_specific_env()
 
+# Records waiting for the writer thread; beyond this the overflow policy applies
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+# 'drop': discard records that do not fit (and log how many were lost)
+# 'block': wait for the writer thread
+LOG_QUEUE_OVERFLOW = os.getenv('LOG_QUEUE_OVERFLOW', 'drop').lower()
+# Audit records have their own queue and writer thread, so a flood of application logs
+# never delays them; when it is full they are written on the caller's thread instead
+AUDIT_LOG_QUEUE_SIZE = int(os.getenv('AUDIT_LOG_QUEUE_SIZE', 10000))
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+
+# Structured field values are copied when emitted, down to this depth / this many items
+LOG_FIELD_MAX_DEPTH = 4
+LOG_FIELD_MAX_ITEMS = 50
+
+_exception_formatter = logging.Formatter()
+
 
 class JsonFormatter(logging.Formatter):
     def __init__(self, json_format=False):
@@ -29,19 +51,223 @@ class JsonFormatter(logging.Formatter):
             "line": record.lineno,  # Line number
             "message": record.getMessage(),  # Log message
         }
+        fields = getattr(record, "fields", None)  # Structured key/value fields (see Logger)
+        if fields:
+            log_record["fields"] = fields
 
         # Return JSON string if JSON format is enabled
         if self.json_format:
-            return json.dumps(log_record)
+            return json.dumps(log_record, default=str)
 
         # Return a detailed string for standard formatting
+        message = log_record['message']
+        if fields:
+            message += " " + " ".join(f"{key}={value}" for key, value in fields.items())
         return (
             f"[{log_record['timestamp']}] {log_record['log_level']} "
             f"[{log_record['file']}:{log_record['line']} - {log_record['function']}] "
-            f"{log_record['message']}"
+            f"{message}"
         )
 
 
+def snapshot_field(value, depth=0):
+    """
+    Copy a field value into plain JSON types. Runs only for emitted records, on the
+    caller's thread, so later changes to a logged document do not leak into the log.
+    """
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if depth < LOG_FIELD_MAX_DEPTH:
+        if isinstance(value, dict):
+            items = list(value.items())
+            snapshot = {str(key): snapshot_field(item, depth + 1) for key, item in items[:LOG_FIELD_MAX_ITEMS]}
+            if len(items) > LOG_FIELD_MAX_ITEMS:
+                snapshot["..."] = f"{len(items) - LOG_FIELD_MAX_ITEMS} more"
+            return snapshot
+        if isinstance(value, (list, tuple, set)):
+            items = list(value)
+            snapshot = [snapshot_field(item, depth + 1) for item in items[:LOG_FIELD_MAX_ITEMS]]
+            if len(items) > LOG_FIELD_MAX_ITEMS:
+                snapshot.append(f"... {len(items) - LOG_FIELD_MAX_ITEMS} more")
+            return snapshot
+    return str(value)
+
+
+class CallSiteSampler:
+    """Decides which calls of one log statement are emitted (1 in N, and / or at most R per second)"""
+
+    def __init__(self):
+        self.calls = 0
+        self.suppressed = 0  # Skipped since the last emitted record
+        self.window_start = 0.0
+        self.window_count = 0
+
+    def allow(self, sample_every=None, max_per_second=None):
+        self.calls += 1
+        if sample_every and (self.calls - 1) % sample_every:
+            self.suppressed += 1
+            return False
+        if max_per_second:
+            now = time.monotonic()
+            if now - self.window_start >= 1:
+                self.window_start, self.window_count = now, 0
+            if self.window_count >= max_per_second:
+                self.suppressed += 1
+                return False
+            self.window_count += 1
+        return True
+
+
+_samplers = {}  # (file, line) of the log call -> CallSiteSampler
+_audit_sink = None  # Receives audit_log() records when set (see Logger.set_audit_sink)
+
+
+class BoundedQueueHandler(QueueHandler):
+    """
+    QueueHandler feeding one queue of a LogPipeline. The caller only formats the message
+    and enqueues it; file and console I/O happen on the pipeline's writer threads.
+    """
+
+    def __init__(self, pipeline, log_queue, overflow, overflow_handler=None):
+        """
+        :param log_queue: Bounded queue read by a writer thread
+        :param overflow: What to do with a record when the queue is full: 'drop', 'block',
+                         or 'write' (hand it to overflow_handler on the caller's thread)
+        """
+        super().__init__(log_queue)
+        self.pipeline = pipeline
+        self.overflow = overflow
+        self.overflow_handler = overflow_handler
+
+    def prepare(self, record):
+        # Leaner than QueueHandler.prepare (no record copy, no Formatter): merge the
+        # arguments and render the traceback now, since they may not survive the queue
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info:
+            record.exc_text = _exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        fields = getattr(record, "fields", None)
+        if fields:
+            record.fields = {key: snapshot_field(value) for key, value in fields.items()}
+        return record
+
+    def enqueue(self, record):
+        pipeline = self.pipeline
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            if self.overflow == "block":
+                self.queue.put(record)
+            elif self.overflow == "write":
+                self.overflow_handler.handle(record)
+            else:
+                pipeline.dropped += 1
+            return
+        if pipeline.dropped:
+            pipeline.report_dropped()
+
+
+class LogPipeline:
+    """
+    The handlers shared by every Logger of the process (one set per log file), fed from
+    bounded queues by QueueListener threads, so rotation and writes never run on the
+    caller's thread. Application and audit records have separate queues and threads.
+    """
+
+    def __init__(self, log_dir, log_file, audit_log_file, queue_size=LOG_QUEUE_SIZE, overflow=LOG_QUEUE_OVERFLOW,
+                 audit_queue_size=AUDIT_LOG_QUEUE_SIZE):
+        if not os.path.exists(log_dir):
+            os.makedirs(log_dir, exist_ok=True)
+        self.queue_size = queue_size
+        self.audit_queue_size = audit_queue_size
+        self.dropped = 0
+
+        app_file_handler = RotatingFileHandler(os.path.join(log_dir, log_file), maxBytes=LOG_MAX_BYTES,
+                                               backupCount=LOG_BACKUP_COUNT)
+        app_file_handler.setFormatter(JsonFormatter(json_format=True))  # Use JSON format for file logs
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(JsonFormatter(json_format=False))  # Use standard format for console logs
+        audit_file_handler = RotatingFileHandler(os.path.join(log_dir, audit_log_file), maxBytes=LOG_MAX_BYTES,
+                                                 backupCount=LOG_BACKUP_COUNT)
+        audit_file_handler.setFormatter(JsonFormatter(json_format=True))  # Use JSON format for audit file logs
+        self.app_handlers = (app_file_handler, console_handler)
+        self.audit_file_handler = audit_file_handler
+
+        self._start()
+        self.app_handler = BoundedQueueHandler(self, self.queue, "block" if overflow == "block" else "drop")
+        # Audit records are never dropped, and never wait behind application logs
+        self.audit_handler = BoundedQueueHandler(self, self.audit_queue, "write", overflow_handler=audit_file_handler)
+
+    def _start(self):
+        self.queue = queue.Queue(maxsize=self.queue_size)
+        self.listener = QueueListener(self.queue, *self.app_handlers, respect_handler_level=True)
+        self.listener.start()
+        self.audit_queue = queue.Queue(maxsize=self.audit_queue_size)
+        self.audit_listener = QueueListener(self.audit_queue, self.audit_file_handler, respect_handler_level=True)
+        self.audit_listener.start()
+
+    def restart_after_fork(self):
+        """A forked child inherits the queues but not the writer threads; start fresh ones"""
+        self.dropped = 0
+        self._start()
+        self.app_handler.queue = self.queue
+        self.audit_handler.queue = self.audit_queue
+
+    def report_dropped(self):
+        """Log how many application records the full queue discarded since the last report"""
+        dropped, self.dropped = self.dropped, 0
+        record = logging.makeLogRecord({
+            "name": __name__, "levelno": logging.WARNING, "levelname": "WARNING",
+            "msg": f"Log queue full: dropped {dropped} record(s)", "funcName": "report_dropped",
+        })
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += dropped
+
+    def stop(self):
+        """Write out the queued records and stop the writer threads"""
+        for listener in (self.listener, self.audit_listener):
+            if listener._thread is not None:
+                listener.stop()
+        for handler in (*self.app_handlers, self.audit_file_handler):
+            handler.close()
+
+
+_pipelines = {}  # (log_dir, log_file, audit_log_file) -> LogPipeline
+_pipelines_lock = threading.Lock()
+
+
+def get_log_pipeline(log_dir="logs", log_file="application.log", audit_log_file="audit.log"):
+    """Return the process-wide pipeline writing to these files, creating it on first use"""
+    key = (log_dir, log_file, audit_log_file)
+    pipeline = _pipelines.get(key)
+    if pipeline is None:
+        with _pipelines_lock:
+            pipeline = _pipelines.get(key)
+            if pipeline is None:
+                pipeline = _pipelines[key] = LogPipeline(log_dir, log_file, audit_log_file)
+    return pipeline
+
+
+def shutdown_logging():
+    """Flush and stop every pipeline (registered to run at exit)"""
+    for pipeline in list(_pipelines.values()):
+        pipeline.stop()
+
+
+def _restart_pipelines_after_fork():
+    for pipeline in _pipelines.values():
+        pipeline.restart_after_fork()
+
+
+atexit.register(shutdown_logging)
+if hasattr(os, "register_at_fork"):  # POSIX only
+    os.register_at_fork(after_in_child=_restart_pipelines_after_fork)
+
+
 class Logger:
     def __init__(self, name, level=None, log_dir="logs", log_file="application.log", audit_log_file="audit.log"):
         """
@@ -56,44 +282,63 @@ class Logger:
         if level is None:
             level = logging.DEBUG if os.getenv('DEBUG', False) else logging.INFO
 
-        if not os.path.exists(log_dir):
-            os.makedirs(log_dir)
+        # Every Logger enqueues into the same pipeline; its writer thread owns the files
+        pipeline = get_log_pipeline(log_dir, log_file, audit_log_file)
 
         # Application logs
         self.logger = logging.getLogger(name)
         self.logger.setLevel(level)
-
-        app_log_path = os.path.join(log_dir, log_file)
-        app_file_handler = RotatingFileHandler(app_log_path, maxBytes=10 * 1024 * 1024, backupCount=5)
-        app_file_handler.setFormatter(JsonFormatter(json_format=True))  # Use JSON format for file logs
-        self.logger.addHandler(app_file_handler)
-
-        console_handler = logging.StreamHandler()
-        console_handler.setFormatter(JsonFormatter(json_format=False))  # Use standard format for console logs
-        self.logger.addHandler(console_handler)
+        if pipeline.app_handler not in self.logger.handlers:
+            self.logger.addHandler(pipeline.app_handler)
 
         # Audit logs
-        audit_log_path = os.path.join(log_dir, audit_log_file)
         self.audit_logger = logging.getLogger(f"{name}_audit")
         self.audit_logger.setLevel(level)
-        audit_file_handler = RotatingFileHandler(audit_log_path, maxBytes=10 * 1024 * 1024, backupCount=5)
-        audit_file_handler.setFormatter(JsonFormatter(json_format=True))  # Use JSON format for audit file logs
-        self.audit_logger.addHandler(audit_file_handler)
+        if pipeline.audit_handler not in self.audit_logger.handlers:
+            self.audit_logger.addHandler(pipeline.audit_handler)
+
+    # Log methods. The message is a %-style format whose args, like the keyword fields,
+    # are only formatted if the record is emitted, so pass documents as args / fields
+    # rather than interpolating them into an f-string:
+    #
+    #     logger.debug("Workout log found", log=log)
+    #     logger.info("Finding documents in %s", collection_name, query=query, max_per_second=20)
+    #
+    # sample_every=N emits one call in N of this statement; max_per_second=R emits at
+    # most R per second. The next emitted record carries the number skipped as `suppressed`.
 
-    def info(self, message):
-        self.logger.info(message, stacklevel=2)
+    def info(self, message, *args, sample_every=None, max_per_second=None, **fields):
+        self._log(logging.INFO, message, args, fields, sample_every, max_per_second)
 
-    def debug(self, message):
-        self.logger.debug(message, stacklevel=2)
+    def debug(self, message, *args, sample_every=None, max_per_second=None, **fields):
+        self._log(logging.DEBUG, message, args, fields, sample_every, max_per_second)
 
-    def warning(self, message):
-        self.logger.warning(message, stacklevel=2)
+    def warning(self, message, *args, sample_every=None, max_per_second=None, **fields):
+        self._log(logging.WARNING, message, args, fields, sample_every, max_per_second)
 
-    def error(self, message):
-        self.logger.error(message, stacklevel=2)
+    def error(self, message, *args, sample_every=None, max_per_second=None, **fields):
+        self._log(logging.ERROR, message, args, fields, sample_every, max_per_second)
 
-    def critical(self, message):
-        self.logger.critical(message, stacklevel=2)
+    def critical(self, message, *args, sample_every=None, max_per_second=None, **fields):
+        self._log(logging.CRITICAL, message, args, fields, sample_every, max_per_second)
+
+    def is_enabled_for(self, level):
+        """Guard for log statements whose arguments are expensive to compute"""
+        return self.logger.isEnabledFor(level)
+
+    def _log(self, level, message, args, fields, sample_every, max_per_second):
+        if not self.logger.isEnabledFor(level):
+            return
+        if sample_every or max_per_second:
+            caller = sys._getframe(2)
+            site = (caller.f_code.co_filename, caller.f_lineno)
+            sampler = _samplers.get(site) or _samplers.setdefault(site, CallSiteSampler())
+            if not sampler.allow(sample_every, max_per_second):
+                return
+            if sampler.suppressed:
+                fields["suppressed"], sampler.suppressed = sampler.suppressed, 0
+        # stacklevel=3: report the caller of info() / debug() / ..., not this method
+        self.logger.log(level, message, *args, extra={"fields": fields} if fields else None, stacklevel=3)
 
     def set_level(self, level):
         """Set the logging level for both application and audit loggers."""
@@ -118,7 +363,23 @@ class Logger:
             "status": status,
             "details": details,
         }
-        self.audit_logger.info(json.dumps(audit_record), stacklevel=2)
+        sink = _audit_sink
+        if sink is None or not sink.write(audit_record):
+            self.write_audit_file(audit_record)
+
+    def write_audit_file(self, audit_record):
+        """Append an audit record to the audit log file"""
+        self.audit_logger.info(json.dumps(audit_record, default=str), stacklevel=3)
+
+    @staticmethod
+    def set_audit_sink(sink):
+        """
+        Send every Logger's audit records to sink.write(record) instead of the audit file.
+        The file still gets the records the sink refuses (write() returning False).
+        :param sink: e.g. daos.audit.audit_logs_dao.AsyncAuditSink, or None to go back to the file
+        """
+        global _audit_sink
+        _audit_sink = sink
 
     @staticmethod
     def _get_current_time():
@@ -0,0 +1,226 @@
+"""
+Metrics
+
+- Counter / Gauge / Histogram: single metric values. Histogram buckets are allocated up
+  front, and updates take no lock: under the GIL an increment lost to a thread race is
+  rare and an acceptable error for monitoring data.
+- MetricFamily: a named metric with one child per label set
+- MetricsRegistry: renders every family, plus the values of collector callbacks
+  (gauges read at scrape time), in the Prometheus text format
+
+@Date: 2026-10-16
+"""
+import math
+from bisect import bisect_left
+from utils.logger import Logger
+
+logger = Logger(__name__)
+
+# Upper bounds (in milliseconds) of the default latency buckets
+DEFAULT_LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+# Same, in seconds (the Prometheus convention)
+DEFAULT_LATENCY_BUCKETS_SECONDS = tuple(bound / 1000 for bound in DEFAULT_LATENCY_BUCKETS_MS)
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+
+class Gauge:
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def dec(self, amount=1):
+        self.value -= amount
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_LATENCY_BUCKETS_MS):
+        """
+        :param buckets: Increasing bucket upper bounds; a final +Inf bucket is added
+        """
+        self.buckets = tuple(buckets) + (math.inf,)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, q):
+        """
+        Estimate the q-th percentile (0-100) by interpolating within its bucket.
+        :return: Estimated value, or 0.0 without observations
+        """
+        counts, total = list(self.counts), sum(self.counts)
+        if not total:
+            return 0.0
+        rank = q / 100 * total
+        seen = 0
+        for index, bucket_count in enumerate(counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = min(self.buckets[index], self.max)
+                return lower + (upper - lower) * max(rank - seen, 0) / bucket_count
+            seen += bucket_count
+        return self.max
+
+    def cumulative(self):
+        """(upper bound, observations <= bound) for every bucket, as Prometheus exposes them"""
+        running, result = 0, []
+        for bound, bucket_count in zip(self.buckets, list(self.counts)):
+            running += bucket_count
+            result.append((bound, running))
+        return result
+
+    def snapshot(self):
+        """Summary of the histogram, JSON-serializable"""
+        count, total, maximum = self.count, self.sum, self.max
+        return {
+            "count": count,
+            "mean": round(total / count, 3) if count else 0.0,
+            "p50": round(self.percentile(50), 3),
+            "p95": round(self.percentile(95), 3),
+            "p99": round(self.percentile(99), 3),
+            "max": round(maximum, 3),
+        }
+
+
+class MetricFamily:
+    def __init__(self, name, documentation, kind, labelnames=(), buckets=None):
+        """
+        :param kind: 'counter', 'gauge' or 'histogram'
+        :param labelnames: Label names, in the order labels() takes their values
+        :param buckets: Histogram bucket bounds
+        """
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self.buckets = buckets or DEFAULT_LATENCY_BUCKETS_SECONDS
+        self._children = {}
+
+    def _new_child(self):
+        if self.kind == "histogram":
+            return Histogram(self.buckets)
+        return Counter() if self.kind == "counter" else Gauge()
+
+    def labels(self, *values):
+        """Child metric for one label set (created on first use)"""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            child = self._children.setdefault(values, self._new_child())
+        return child
+
+    # Shortcuts for metrics without labels
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def dec(self, amount=1):
+        self.labels().dec(amount)
+
+    def set(self, value):
+        self.labels().set(value)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def samples(self):
+        """(labels dict, child) for every label set"""
+        return [(dict(zip(self.labelnames, values)), child) for values, child in list(self._children.items())]
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label(value)}"' for name, value in labels.items()) + "}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._families = {}
+        self._collectors = []
+
+    def _family(self, name, documentation, kind, labelnames=(), buckets=None):
+        family = self._families.get(name)
+        if family is None:
+            family = self._families.setdefault(name, MetricFamily(name, documentation, kind, labelnames, buckets))
+        elif family.kind != kind:
+            raise ValueError(f"Metric {name} is already registered as a {family.kind}")
+        return family
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._family(name, documentation, "counter", labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._family(name, documentation, "gauge", labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=None):
+        return self._family(name, documentation, "histogram", labelnames, buckets)
+
+    def register_collector(self, collector):
+        """
+        Add a callback read at every scrape.
+        :param collector: fn() -> iterable of (name, documentation, kind, [(labels dict, value), ...])
+        """
+        if collector not in self._collectors:
+            self._collectors.append(collector)
+
+    def render(self):
+        """Every metric in the Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        for family in list(self._families.values()):
+            lines += [f"# HELP {family.name} {family.documentation}", f"# TYPE {family.name} {family.kind}"]
+            for labels, child in family.samples():
+                if family.kind == "histogram":
+                    for bound, count in child.cumulative():
+                        bucket_labels = _format_labels({**labels, "le": _format_value(bound)})
+                        lines.append(f"{family.name}_bucket{bucket_labels} {count}")
+                    lines.append(f"{family.name}_sum{_format_labels(labels)} {_format_value(child.sum)}")
+                    lines.append(f"{family.name}_count{_format_labels(labels)} {child.count}")
+                else:
+                    lines.append(f"{family.name}{_format_labels(labels)} {_format_value(child.value)}")
+
+        for collector in list(self._collectors):
+            try:
+                collected = list(collector())
+            except Exception as e:
+                logger.error(f"Metrics collector {collector.__name__} failed: {e}")
+                continue
+            for name, documentation, kind, samples in collected:
+                lines += [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+                lines += [f"{name}{_format_labels(labels)} {_format_value(value)}" for labels, value in samples]
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry rendered by /metrics
+metrics_registry = MetricsRegistry()
@@ -0,0 +1,101 @@
+"""
+Request-Scoped Identity Map
+
+RequestContextMiddleware gives every HTTP request its own IdentityMap (held in a
+ContextVar). DAOs load documents through load_one(), so within one request:
+
+- the same (namespace, key) is fetched at most once, and later lookups reuse the result
+- lookups of the same namespace issued together (e.g. via asyncio.gather) are
+  coalesced into a single batch, which the DAO answers with one `$in` query
+
+Outside a request (scripts, background jobs) load_one() simply calls the loader.
+
+@Date: 2026-10-16
+"""
+import asyncio
+from contextvars import ContextVar
+
+_identity_map = ContextVar("identity_map", default=None)
+
+
+class IdentityMap:
+    def __init__(self):
+        self._results = {}  # (namespace, key) -> future resolving to a document or None
+        self._pending = {}  # namespace -> {key: future} waiting for the next batch
+
+    async def load(self, namespace, key, batch_loader):
+        """
+        Return the document for key, loading it at most once per request.
+        :param namespace: Identifies the collection, lookup field and projection (e.g. 'users:id')
+        :param key: Lookup value
+        :param batch_loader: async fn(list of keys) -> {key: document}; missing keys mean None
+        """
+        future = self._results.get((namespace, key))
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._results[(namespace, key)] = future
+            batch = self._pending.setdefault(namespace, {})
+            if not batch:
+                # Dispatch on the next loop iteration so concurrent lookups join this batch
+                loop.call_soon(self._dispatch, namespace, batch_loader)
+            batch[key] = future
+        return await future
+
+    def _dispatch(self, namespace, batch_loader):
+        batch = self._pending.pop(namespace, {})
+        if batch:
+            asyncio.ensure_future(self._run_batch(namespace, batch, batch_loader))
+
+    async def _run_batch(self, namespace, batch, batch_loader):
+        try:
+            documents = await batch_loader(list(batch))
+        except Exception as e:
+            for key, future in batch.items():
+                # Do not remember failures; a later lookup may retry
+                self._results.pop((namespace, key), None)
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for key, future in batch.items():
+            if not future.done():
+                future.set_result(documents.get(key))
+
+    def forget(self, collection):
+        """Drop remembered documents of a collection (call after writing to it)"""
+        prefix = f"{collection}:"
+        for result_key in [result_key for result_key in self._results if result_key[0].startswith(prefix)]:
+            if self._results[result_key].done():
+                del self._results[result_key]
+
+
+async def load_one(namespace, key, batch_loader):
+    """Load one document through the current request's identity map (if any)"""
+    identity_map = _identity_map.get()
+    if identity_map is None:
+        return (await batch_loader([key])).get(key)
+    return await identity_map.load(namespace, key, batch_loader)
+
+
+def forget(collection):
+    """Drop the current request's remembered documents of a collection"""
+    identity_map = _identity_map.get()
+    if identity_map is not None:
+        identity_map.forget(collection)
+
+
+class RequestContextMiddleware:
+    """Pure ASGI middleware giving each HTTP request a fresh IdentityMap"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = _identity_map.set(IdentityMap())
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _identity_map.reset(token)
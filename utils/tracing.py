@@ -0,0 +1,240 @@
+"""
+Request Tracing
+
+Lightweight spans with no collector or tracing library behind them:
+
+- TracingMiddleware starts a Trace for every HTTP request (held in a ContextVar, so it
+  follows the request into awaited code, asyncio.gather children and asyncio.to_thread)
+  and adds a Server-Timing header: the time spent per span name (inclusive of nested
+  spans), plus the total time until the response started.
+- span(name) times a block; outside a request it is a shared no-op.
+- A sampled fraction of traces (TRACE_SAMPLE_RATE), and every trace slower than
+  TRACE_SLOW_MS, is logged as one line of OTLP/JSON (the OpenTelemetry export format),
+  so it can be replayed into any OpenTelemetry backend later.
+
+An incoming W3C `traceparent` header is honoured, so spans join the caller's trace.
+
+@Date: 2026-10-16
+"""
+import json
+import os
+import random
+import re
+import time
+from contextvars import ContextVar
+from functools import wraps
+from inspect import iscoroutinefunction
+from utils.env_loader import load_platform_specific_env
+from utils.logger import Logger
+
+load_platform_specific_env()
+logger = Logger(__name__)
+
+# Set to false to skip tracing and the Server-Timing header entirely
+TRACING_ENABLED = os.getenv('TRACING_ENABLED', 'true').lower() == 'true'
+# Fraction of requests whose span tree is logged
+TRACE_SAMPLE_RATE = float(os.getenv('TRACE_SAMPLE_RATE', 0))
+# Requests slower than this (milliseconds) are always logged; 0 disables
+TRACE_SLOW_MS = float(os.getenv('TRACE_SLOW_MS', 0))
+# Span names listed in Server-Timing (the slowest ones), to bound the header size
+SERVER_TIMING_MAX_ENTRIES = 20
+SERVICE_NAME = os.getenv('SERVICE_NAME', 'gng-5300-backend')
+
+TRACEPARENT = re.compile(r"^[0-9a-f]{2}-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+# OTLP span kinds and status codes
+SPAN_KIND_INTERNAL, SPAN_KIND_SERVER = 1, 2
+STATUS_ERROR = 2
+
+_current_trace = ContextVar("trace", default=None)
+_current_span_id = ContextVar("span_id", default=None)
+
+
+def _new_id(bits):
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+
+def _otel_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class Span:
+    def __init__(self, trace, name, attributes=None, kind=SPAN_KIND_INTERNAL):
+        self.trace = trace
+        self.name = name
+        self.attributes = attributes or {}
+        self.kind = kind
+        self.span_id = _new_id(64)
+        self.parent_id = None
+        self.error = None
+        self.start_ns = self.end_ns = 0
+        self.duration_ms = 0.0
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def __enter__(self):
+        self.parent_id = _current_span_id.get() or self.trace.parent_span_id
+        self._token = _current_span_id.set(self.span_id)
+        self.start_ns = time.time_ns()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration_ms = (time.perf_counter() - self._start) * 1000
+        self.end_ns = self.start_ns + int(self.duration_ms * 1_000_000)
+        _current_span_id.reset(self._token)
+        if exc is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        self.trace.spans.append(self)
+        return False
+
+    def to_otel(self):
+        span = {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": key, "value": _otel_value(value)} for key, value in self.attributes.items()],
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        if self.error:
+            span["status"] = {"code": STATUS_ERROR, "message": self.error}
+        return span
+
+
+class _NoopSpan:
+    def set_attribute(self, key, value):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Trace:
+    def __init__(self, trace_id=None, parent_span_id=None):
+        self.trace_id = trace_id or _new_id(128)
+        self.parent_span_id = parent_span_id  # Span of the caller, from traceparent
+        self.spans = []  # Finished spans (appended from threads too; list.append is atomic)
+        self._start = time.perf_counter()
+
+    @classmethod
+    def from_traceparent(cls, header):
+        match = TRACEPARENT.match(header or "")
+        return cls(*match.groups()) if match else cls()
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self._start) * 1000
+
+    def server_timing(self, exclude=None):
+        """
+        Server-Timing header value: total duration per span name, slowest first.
+        :param exclude: Span to leave out (the request's root span)
+        """
+        totals = {}
+        for span in list(self.spans):
+            if span is not exclude:
+                duration, count = totals.get(span.name, (0.0, 0))
+                totals[span.name] = (duration + span.duration_ms, count + 1)
+        slowest = sorted(totals.items(), key=lambda item: item[1][0], reverse=True)[:SERVER_TIMING_MAX_ENTRIES]
+        entries = [f'{name};dur={duration:.1f}' + (f';desc="x{count}"' if count > 1 else "")
+                   for name, (duration, count) in slowest]
+        entries.append(f"total;dur={self.elapsed_ms():.1f}")
+        return ", ".join(entries)
+
+    def to_otel(self):
+        """The trace as an OTLP/JSON ExportTraceServiceRequest"""
+        return {"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+            "scopeSpans": [{"scope": {"name": __name__}, "spans": [span.to_otel() for span in list(self.spans)]}],
+        }]}
+
+
+def span(name, **attributes):
+    """
+    Time a block as a span of the current request's trace:
+
+        with span("ai.llm", model=model_name):
+            ...
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        return _NOOP_SPAN
+    return Span(trace, name, attributes)
+
+
+def traced(name):
+    """Decorator running a function (sync or async) inside span(name)"""
+    def decorator(f):
+        if iscoroutinefunction(f):
+            @wraps(f)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await f(*args, **kwargs)
+            return async_wrapper
+
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return f(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+class TracingMiddleware:
+    """Pure ASGI middleware tracing each HTTP request and adding the Server-Timing header"""
+
+    def __init__(self, app, sample_rate=TRACE_SAMPLE_RATE, slow_ms=TRACE_SLOW_MS):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not TRACING_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        trace = Trace.from_traceparent(headers.get(b"traceparent", b"").decode("latin-1"))
+        root = Span(trace, scope["method"], {"http.request.method": scope["method"], "url.path": scope["path"]},
+                    kind=SPAN_KIND_SERVER)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                root.set_attribute("http.response.status_code", message["status"])
+                timing = trace.server_timing(exclude=root).encode("latin-1")
+                message = {**message, "headers": [*message.get("headers", []), (b"server-timing", timing)]}
+            await send(message)
+
+        token = _current_trace.set(trace)
+        try:
+            with root:
+                await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_trace.reset(token)
+            # The router stores the matched route in the (shared) scope
+            route = getattr(scope.get("route"), "path", None)
+            if route:
+                root.name = f"{scope['method']} {route}"
+                root.set_attribute("http.route", route)
+            if random.random() < self.sample_rate or (self.slow_ms and root.duration_ms >= self.slow_ms):
+                logger.info(f"Trace {root.name} {root.duration_ms:.1f} ms: "
+                            f"{json.dumps(trace.to_otel(), separators=(',', ':'))}")